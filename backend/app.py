@@ -10,29 +10,18 @@
 # if __name__ == '__main__':
 #   app.run(host='0.0.0.0', port=5000)
 
-import os
 from dotenv import load_dotenv
-from flask import send_from_directory
 from cafe_fausse import create_app
+from cafe_fausse.static_assets import AssetServer
 
 load_dotenv()
 app = create_app()
 
-# Absolute path to dist folder
-DIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'dist')
-
-@app.route('/')
-def index():
-    return send_from_directory(DIST_DIR, 'index.html')
-
-@app.route('/<path:path>')
-def static_proxy(path):
-    return send_from_directory(DIST_DIR, path)
-
-@app.errorhandler(404)
-def not_found(e):
-    # SPA fallback: return index.html for unknown routes
-    return send_from_directory(DIST_DIR, 'index.html')
+# Serves the SPA build (FRONTEND_DIST, default ../frontend/dist) from a manifest built at startup;
+# unknown /api/ paths get a JSON 404 and every other unknown path gets index.html.
+AssetServer(app, app.config['FRONTEND_DIST'])
 
+# Werkzeug's single-process server, for development and Windows services. On Linux, production
+# runs this app under gunicorn: `gunicorn -c gunicorn.conf.py`.
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=80, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=80, debug=False)
@@ -0,0 +1,12 @@
+# ASGI entry point (optional; install requirements-asgi.txt). Run from the backend directory with
+#
+#     uvicorn asgi:app --host 0.0.0.0 --port 80 --workers 4 --no-access-log
+#
+# The Flask app from app.py is wrapped by cafe_fausse.asgi: health, the menu, availability and
+# newsletter signups are served by async handlers on the async engine, every other route by the
+# Flask app on a thread pool. Requests are logged by the app itself, hence --no-access-log.
+# The WSGI entry points (app.py, gunicorn.conf.py) keep working as before.
+from app import app as wsgi_app
+from cafe_fausse.asgi import create_asgi_app
+
+app = create_asgi_app(wsgi_app)
@@ -0,0 +1,197 @@
+"""
+Load test comparing how many concurrent connections the WSGI and the ASGI mode can serve.
+
+Each mode runs as one server process on a fresh SQLite database:
+
+- wsgi: gunicorn with gunicorn.conf.py, one worker of GUNICORN_THREADS threads (default 4),
+- asgi: uvicorn serving asgi.py, one process with the async engine.
+
+For every concurrency level, that many keep-alive connections send GET /api/availability for
+random days as fast as they get answers, for DURATION seconds. The availability cache is off, so
+every request runs its query. --db-latency-ms adds a wait to every SQL statement inside the
+database driver, standing in for the network round trip to a PostgreSQL server; the wait blocks
+only the connection that runs the statement, as a real round trip would. Reported per level:
+requests per second, median and p99 latency, and requests that failed or took over --timeout.
+A mode's capacity is the highest level whose p99 stays under --slo-ms.
+
+Run from the backend directory with requirements-asgi.txt installed:
+
+    python benchmarks/bench_asgi_concurrency.py [--levels 10,50,200,500] [--duration 5] [--db-latency-ms 20]
+"""
+import argparse
+import asyncio
+import os
+import random
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND)
+
+FIRST_DAY = date(2031, 1, 1)
+DAYS = 365
+MODES = ('wsgi', 'asgi')
+
+
+def add_statement_latency(seconds):
+    # Every new connection, sync (pysqlite) or async (aiosqlite), sleeps in its driver thread
+    # before each statement.
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'connect')
+    def _slow_statements(dbapi_connection, connection_record):
+        driver_connection = getattr(dbapi_connection, 'driver_connection', dbapi_connection)
+        sqlite_connection = getattr(driver_connection, '_connection', driver_connection)
+        sqlite_connection.set_trace_callback(lambda statement: time.sleep(seconds))
+
+
+def serve(mode, port, latency):
+    """Runs one server in this process (the --serve entry point of the subprocesses)."""
+    os.chdir(BACKEND)
+    if latency:
+        add_statement_latency(latency)
+    if mode == 'wsgi':
+        from gunicorn.app.wsgiapp import run
+
+        sys.argv = ['gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', '--workers', '1',
+                    '--backlog', '4096']
+        run()
+    else:
+        import uvicorn
+
+        uvicorn.run('asgi:app', host='127.0.0.1', port=port, workers=1, access_log=False,
+                    log_level='warning', backlog=4096)
+
+
+async def fetch(reader, writer, path):
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n'.encode())
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n'):
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':', 1)[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def client(port, deadline, timeout, rng, latencies, failures):
+    connection = None
+    while time.perf_counter() < deadline:
+        path = f'/api/availability?date={FIRST_DAY + timedelta(days=rng.randrange(DAYS))}'
+        started = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+            status = await asyncio.wait_for(fetch(*connection, path), timeout)
+            if status != 200:
+                failures.append(status)
+                continue
+            latencies.append(time.perf_counter() - started)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            failures.append(None)
+            if connection is not None:
+                connection[1].close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+
+async def load(port, connections, duration, timeout):
+    latencies, failures = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(
+        client(port, deadline, timeout, random.Random(index), latencies, failures) for index in range(connections)
+    ))
+    return latencies, failures
+
+
+def wait_until_up(port, process):
+    async def probe():
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        status = await fetch(reader, writer, '/api/health')
+        writer.close()
+        return status
+
+    for _ in range(200):
+        if process.poll() is not None:
+            raise RuntimeError('server exited during startup')
+        try:
+            if asyncio.run(probe()) == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError('server did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--levels', default='10,50,200,500')
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--db-latency-ms', type=float, default=20)
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--slo-ms', type=float, default=500)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--serve', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.db_latency_ms / 1000)
+        return
+
+    levels = [int(level) for level in args.levels.split(',')]
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            FLASK_SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(directory, 'bench.db')}",
+            FLASK_AVAILABILITY_CACHE_TTL='0',
+            FLASK_RATE_LIMIT_ENABLED='false',
+            FLASK_LOG_LEVEL='WARNING',
+            FLASK_ENV='production',
+            FLASK_ADMIN_PASSWORD=secrets.token_urlsafe(),
+            FLASK_ADMIN_TOKEN=secrets.token_urlsafe(),
+            FRONTEND_DIST=directory,
+        )
+        subprocess.run(
+            [sys.executable, '-c', 'from cafe_fausse import create_app; from cafe_fausse.extensions import db\n'
+             'app = create_app()\nwith app.app_context(): db.create_all()'],
+            cwd=BACKEND, env=env, check=True,
+        )
+
+        capacity = {}
+        for mode in MODES:
+            process = subprocess.Popen(
+                [sys.executable, __file__, '--serve', mode, '--port', str(args.port),
+                 '--db-latency-ms', str(args.db_latency_ms)],
+                env=env,
+            )
+            try:
+                wait_until_up(args.port, process)
+                capacity[mode] = 0
+                for connections in levels:
+                    latencies, failures = asyncio.run(load(args.port, connections, args.duration, args.timeout))
+                    latencies.sort()
+                    median = statistics.median(latencies) if latencies else 0
+                    p99 = latencies[int(len(latencies) * 0.99)] if latencies else float('inf')
+                    print(
+                        f'{mode} {connections:5} connections {len(latencies) / args.duration:8.0f} req/s'
+                        f'  p50 {median * 1000:8.1f} ms  p99 {p99 * 1000:8.1f} ms  failed {len(failures)}'
+                    )
+                    if p99 * 1000 <= args.slo_ms and not failures:
+                        capacity[mode] = connections
+            finally:
+                process.terminate()
+                process.wait()
+        for mode, connections in capacity.items():
+            print(f'{mode} capacity at p99 <= {args.slo_ms:.0f} ms: {connections} connections')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Compares importing reservations row by row with the chunked bulk importer.
+
+Generates ROWS reservations spread over the evening slots of several days and imports them into a
+fresh file-backed SQLite database twice:
+
+- per-row: book_reservation for each row, one transaction per reservation (what replaying the
+  rows through POST /api/reservations does),
+- bulk: bulk_import.import_reservations with the given chunk size.
+
+Run from the backend directory:
+
+    python benchmarks/bench_bulk_import.py [--rows 10000] [--chunk-size 500]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from cafe_fausse import create_app  # noqa: E402
+from cafe_fausse.booking import SlotFullError, book_reservation  # noqa: E402
+from cafe_fausse.bulk_import import import_reservations  # noqa: E402
+from cafe_fausse.extensions import db  # noqa: E402
+from cafe_fausse.floor_plan import current_floor_plan  # noqa: E402
+
+
+def make_rows(count, seed):
+    rng = random.Random(seed)
+    first = datetime(2031, 3, 1, 17, 0)
+    slots = [first + timedelta(days=day, minutes=30 * slot) for day in range(60) for slot in range(11)]
+    return [
+        (index + 1, {
+            'datetime': rng.choice(slots).isoformat(),
+            'guests': rng.choice([2, 2, 2, 3, 4, 4, 6]),
+            'name': f'Guest {index}',
+            'email': f'guest{index % (count // 2 or 1)}@example.com',
+        })
+        for index in range(count)
+    ]
+
+
+def run(rows, importer):
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        app = create_app('development')
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            created = importer(rows, current_floor_plan())
+            elapsed = time.perf_counter() - started
+            db.engine.dispose()
+    return created, elapsed
+
+
+def per_row(rows, floor_plan):
+    created = 0
+    for _, record in rows:
+        try:
+            start = datetime.fromisoformat(record['datetime'])
+            book_reservation(
+                start, start + timedelta(minutes=90), record['guests'],
+                record['name'], record['email'], None, floor_plan,
+            )
+            created += 1
+        except SlotFullError:
+            pass
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.seed)
+
+    def bulk(rows, floor_plan):
+        results = import_reservations(rows, floor_plan, args.chunk_size)
+        return sum(1 for result in results if result['status'] == 'created')
+
+    print(f'{args.rows} rows, chunk size {args.chunk_size}')
+    for name, importer in (('per-row', per_row), ('bulk', bulk)):
+        created, elapsed = run(rows, importer)
+        print(f'{name:<8} {created:>6} created in {elapsed:7.2f}s ({args.rows / elapsed:9.0f} rows/s)')
+
+
+if __name__ == '__main__':
+    main()
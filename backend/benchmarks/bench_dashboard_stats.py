@@ -0,0 +1,115 @@
+"""
+Measures the admin dashboard stats as the reservation history grows.
+
+Seeds DAYS days of evening bookings with the bulk importer (which keeps the rollups up to date),
+then times a 30-day dashboard range computed two ways:
+
+- aggregate: GROUP BY queries over the reservations table, as a dashboard without rollups would,
+- rollups: the reads of GET /api/admin/stats from daily_stats and slot_stats.
+
+The aggregate grows with the history scanned for repeat customers; the rollup reads stay flat.
+
+Run from the backend directory:
+
+    python benchmarks/bench_dashboard_stats.py [--days 365] [--samples 100]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import func, select, text  # noqa: E402
+
+from cafe_fausse import create_app, rollups  # noqa: E402
+from cafe_fausse.bulk_import import import_reservations  # noqa: E402
+from cafe_fausse.extensions import db  # noqa: E402
+from cafe_fausse.floor_plan import current_floor_plan  # noqa: E402
+from cafe_fausse.models import Reservation  # noqa: E402
+
+FIRST_DAY = datetime(2031, 1, 1)
+RANGE_DAYS = 30
+
+
+def seed(days, floor_plan, rng):
+    rows = (
+        (index + 1, {
+            'datetime': (FIRST_DAY + timedelta(days=day, hours=17, minutes=30 * rng.randrange(11))).isoformat(),
+            'guests': rng.choice([2, 2, 3, 4, 6]),
+            'name': 'Guest',
+            'email': f'guest{rng.randrange(5000)}@example.com',
+            'duration': rng.choice([60, 90, 120]),
+        })
+        for index, day in enumerate(day for day in range(days) for _ in range(3 * floor_plan.total_tables))
+    )
+    return sum(1 for result in import_reservations(rows, floor_plan, 2000) if result['status'] == 'created')
+
+
+def aggregate(start, end):
+    # Covers per day, plus bookings by customers with an earlier reservation anywhere in the history.
+    r = Reservation.__table__.alias('r')
+    p = Reservation.__table__.alias('p')
+    earlier = (
+        select(func.count()).select_from(p)
+        .where(p.c.customer_id == r.c.customer_id, p.c.id < r.c.id)
+        .scalar_subquery()
+    )
+    day = func.date(r.c.time_slot)
+    db.session.execute(
+        select(day, func.count(), func.sum(r.c.party_size), func.sum(func.min(earlier, 1)))
+        .where(r.c.time_slot >= start, r.c.time_slot < end)
+        .group_by(day)
+    ).all()
+    db.session.execute(
+        select(r.c.time_slot, func.count(), func.sum(r.c.party_size))
+        .where(r.c.time_slot >= start, r.c.time_slot < end)
+        .group_by(r.c.time_slot)
+    ).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--samples', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        app = create_app('development')
+        with app.app_context():
+            db.create_all()
+            floor_plan = current_floor_plan()
+            created = seed(args.days, floor_plan, rng)
+            db.session.execute(text('ANALYZE'))
+            print(f'{created} reservations over {args.days} days, {floor_plan.total_tables} tables')
+
+            starts = [
+                (FIRST_DAY + timedelta(days=rng.randrange(max(1, args.days - RANGE_DAYS)))).date()
+                for _ in range(args.samples)
+            ]
+
+            started = time.perf_counter()
+            for start in starts:
+                aggregate(start, start + timedelta(days=RANGE_DAYS))
+            aggregated = (time.perf_counter() - started) / args.samples
+
+            started = time.perf_counter()
+            for start in starts:
+                end = start + timedelta(days=RANGE_DAYS - 1)
+                rollups.daily_stats(start, end)
+                rollups.slot_stats(start, end)
+            rolled_up = (time.perf_counter() - started) / args.samples
+
+            print(f'aggregate {aggregated * 1000:8.2f} ms per {RANGE_DAYS}-day range')
+            print(f'rollups   {rolled_up * 1000:8.2f} ms per {RANGE_DAYS}-day range')
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
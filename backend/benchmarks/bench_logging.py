@@ -0,0 +1,94 @@
+"""
+Measures the per-request cost of logging.
+
+Sends REQUESTS GET /api/health requests through the test client with logging set up three ways:
+
+- off: LOG_LEVEL=WARNING, so no record is written per request (the baseline),
+- sync: the previous setup, a DEBUG root logger whose handler formats and writes every record
+  on the request thread,
+- queue: the current setup, the request thread only enqueues records and the QueueListener thread
+  formats and writes them.
+
+Records go to a log file in a temporary directory. --sink-latency-ms adds a blocking delay to every
+write, standing in for a slow disk or a stderr pipe to a busy log collector. Each setup is run
+ROUNDS times, interleaved, and the fastest round is reported.
+
+Run from the backend directory:
+
+    python benchmarks/bench_logging.py [--requests 5000] [--rounds 3] [--sink-latency-ms 0.2]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from cafe_fausse import create_app, log  # noqa: E402
+
+
+class SlowFileHandler(logging.FileHandler):
+    latency = 0.0
+
+    def emit(self, record):
+        super().emit(record)
+        time.sleep(self.latency)
+
+
+def run(mode, path, requests, latency):
+    os.environ['FLASK_LOG_LEVEL'] = 'WARNING' if mode == 'off' else 'DEBUG' if mode == 'sync' else 'INFO'
+    os.environ['FLASK_LOG_FILE'] = path
+    app = create_app('development')
+    SlowFileHandler.latency = latency
+    handler_class = SlowFileHandler if latency else logging.FileHandler
+    root = logging.getLogger()
+    if mode == 'sync':
+        # Bypass the queue: format and write on the request thread, as basicConfig did.
+        log.stop_listener()
+        root.handlers.clear()
+        handler = handler_class(path)
+        handler.addFilter(log.RequestIdFilter())
+        handler.setFormatter(logging.Formatter(log.TEXT_FORMAT))
+        root.addHandler(handler)
+    elif latency:
+        log.stop_listener()
+        log._outputs = (handler_class(path),)
+        log._outputs[0].setFormatter(logging.Formatter(log.TEXT_FORMAT))
+        log.start_listener()
+
+    client = app.test_client()
+    for _ in range(200):
+        client.get('/api/health')
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get('/api/health')
+    elapsed = time.perf_counter() - started
+    log.stop_listener()
+    if mode == 'sync':
+        root.handlers.clear()
+    return elapsed / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--sink-latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        results = {}
+        for _ in range(args.rounds):
+            for mode in ('off', 'sync', 'queue'):
+                seconds = run(mode, os.path.join(directory, f'{mode}.log'), args.requests, args.sink_latency_ms / 1000)
+                results[mode] = min(results.get(mode, seconds), seconds)
+        for mode, seconds in results.items():
+            overhead = (seconds - results['off']) * 1e6
+            print(f'{mode:5} {seconds * 1e6:8.1f} µs per request ({overhead:+7.1f} µs logging)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Measures the per-request cost of the Prometheus metrics.
+
+Sends REQUESTS GET /api/health requests through the test client in three setups, each in its own
+process:
+
+- off: METRICS_ENABLED=false, no request is measured,
+- memory: metrics kept in the process, as with a single server process,
+- multiprocess: PROMETHEUS_MULTIPROC_DIR set, as under gunicorn, so every value is written to a
+  memory-mapped file shared with the other workers.
+
+Each setup is run ROUNDS times and the fastest round is reported, with the time taken to render
+/api/metrics afterwards.
+
+Run from the backend directory:
+
+    python benchmarks/bench_metrics.py [--requests 5000] [--rounds 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+SETUPS = ('off', 'memory', 'multiprocess')
+
+
+def run(requests):
+    from cafe_fausse import create_app
+    from cafe_fausse.extensions import db
+
+    app = create_app('development')
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    for _ in range(200):
+        client.get('/api/health')
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get('/api/health')
+    elapsed = time.perf_counter() - started
+    started = time.perf_counter()
+    client.get('/api/metrics')
+    return elapsed / requests, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run(args.requests)))
+        return
+
+    results = {}
+    for _ in range(args.rounds):
+        for setup in SETUPS:
+            with tempfile.TemporaryDirectory() as directory:
+                env = dict(
+                    os.environ,
+                    FLASK_SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                    FLASK_LOG_LEVEL='WARNING',
+                    FLASK_METRICS_ENABLED='false' if setup == 'off' else 'true',
+                )
+                env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+                if setup == 'multiprocess':
+                    # Its own directory: the collector reads every *.db file in it.
+                    env['PROMETHEUS_MULTIPROC_DIR'] = os.path.join(directory, 'metrics')
+                    os.mkdir(env['PROMETHEUS_MULTIPROC_DIR'])
+                output = subprocess.run(
+                    [sys.executable, __file__, '--child', '--requests', str(args.requests)],
+                    env=env, check=True, capture_output=True, text=True,
+                ).stdout
+                seconds, render = json.loads(output.splitlines()[-1])
+                if setup not in results or seconds < results[setup][0]:
+                    results[setup] = (seconds, render)
+    for setup, (seconds, render) in results.items():
+        overhead = (seconds - results['off'][0]) * 1e6
+        print(f'{setup:12} {seconds * 1e6:8.1f} µs per request ({overhead:+6.1f} µs metrics)'
+              f'  /api/metrics {render * 1000:6.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Measures newsletter signup throughput on a file-backed SQLite database.
+
+Signs up ROWS addresses, half of them already customers, three ways:
+
+- select-then-write: the original handler, a SELECT followed by an INSERT or UPDATE through the
+  ORM and a commit per signup,
+- upsert: subscriptions.subscribe, one INSERT ... ON CONFLICT statement and a commit per signup,
+- bulk: subscriptions.subscribe_many for all addresses, batched executemany in one transaction.
+
+Run from the backend directory:
+
+    python benchmarks/bench_newsletter_signups.py [--rows 5000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from cafe_fausse import create_app  # noqa: E402
+from cafe_fausse.extensions import db  # noqa: E402
+from cafe_fausse.models import Customer  # noqa: E402
+from cafe_fausse.subscriptions import subscribe, subscribe_many  # noqa: E402
+
+
+def select_then_write(signups):
+    for email, name in signups:
+        customer = Customer.query.filter_by(email=email).first()
+        if not customer:
+            db.session.add(Customer(email=email, name=name, newsletter_opt_in=True))
+        else:
+            customer.newsletter_opt_in = True
+            if name:
+                customer.name = name
+        db.session.commit()
+
+
+def upsert(signups):
+    for email, name in signups:
+        subscribe(email, name)
+
+
+def bulk(signups):
+    subscribe_many(signups)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    signups = [(f'reader{index}@example.com', f'Reader {index}') for index in range(args.rows)]
+    existing = signups[::2]
+
+    print(f'{args.rows} signups, {len(existing)} for existing customers')
+    for name, run in (('select-then-write', select_then_write), ('upsert', upsert), ('bulk', bulk)):
+        with tempfile.TemporaryDirectory() as directory:
+            os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+            app = create_app('development')
+            with app.app_context():
+                db.create_all()
+                db.session.add_all(Customer(email=email, name=None) for email, _ in existing)
+                db.session.commit()
+                db.session.expunge_all()
+
+                started = time.perf_counter()
+                run(signups)
+                elapsed = time.perf_counter() - started
+                assert Customer.query.filter_by(newsletter_opt_in=True).count() == args.rows
+                db.engine.dispose()
+        print(f'{name:<18} {elapsed:7.2f}s ({args.rows / elapsed:9.0f} signups/s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Measures overlap checks for duration-aware reservations as the reservation table grows.
+
+Seeds DAYS days of evening bookings with the bulk importer, then for random days times:
+
+- per-slot queries: one overlap range query per slot of the day, as a naive availability check
+  would run,
+- interval index: one range query for the day loaded into TableIntervals, then a busy_mask per slot.
+
+It also prints SQLite's plan for the overlap range query, which should be an index search.
+
+Run from the backend directory:
+
+    python benchmarks/bench_overlap_checks.py [--days 365] [--samples 200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text  # noqa: E402
+
+from cafe_fausse import create_app  # noqa: E402
+from cafe_fausse.availability import day_slots  # noqa: E402
+from cafe_fausse.bulk_import import import_reservations  # noqa: E402
+from cafe_fausse.extensions import db  # noqa: E402
+from cafe_fausse.floor_plan import current_floor_plan  # noqa: E402
+from cafe_fausse.intervals import load_intervals, overlapping  # noqa: E402
+
+FIRST_DAY = datetime(2031, 1, 1)
+
+
+def seed(days, floor_plan, rng):
+    rows = (
+        (index + 1, {
+            'datetime': (FIRST_DAY + timedelta(days=day, hours=17, minutes=30 * rng.randrange(11))).isoformat(),
+            'guests': rng.choice([2, 2, 3, 4, 6]),
+            'name': 'Guest',
+            'email': f'guest{index % 5000}@example.com',
+            'duration': rng.choice([60, 90, 120]),
+        })
+        for index, day in enumerate(day for day in range(days) for _ in range(3 * floor_plan.total_tables))
+    )
+    return sum(1 for result in import_reservations(rows, floor_plan, 2000) if result['status'] == 'created')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        app = create_app('development')
+        with app.app_context():
+            db.create_all()
+            floor_plan = current_floor_plan()
+            created = seed(args.days, floor_plan, rng)
+            db.session.execute(text('ANALYZE'))
+            print(f'{created} reservations over {args.days} days, {floor_plan.total_tables} tables')
+
+            duration = timedelta(minutes=app.config['RESERVATION_DURATION_MINUTES'])
+            sample_days = [(FIRST_DAY + timedelta(days=rng.randrange(args.days))).date() for _ in range(args.samples)]
+
+            started = time.perf_counter()
+            for day in sample_days:
+                for slot in day_slots(day):
+                    db.session.execute(overlapping(slot, slot + duration)).all()
+            per_slot = (time.perf_counter() - started) / args.samples
+
+            started = time.perf_counter()
+            for day in sample_days:
+                slots = day_slots(day)
+                intervals = load_intervals(slots[0], slots[-1] + duration, floor_plan.total_tables)
+                for slot in slots:
+                    intervals.busy_mask(slot, slot + duration)
+            indexed = (time.perf_counter() - started) / args.samples
+
+            print(f'per-slot queries {per_slot * 1000:8.2f} ms per day')
+            print(f'interval index   {indexed * 1000:8.2f} ms per day')
+
+            slot = datetime.combine(sample_days[0], datetime.min.time()) + timedelta(hours=19)
+            statement = overlapping(slot, slot + duration).compile(
+                db.engine, compile_kwargs={'literal_binds': True}
+            )
+            for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {statement}')):
+                print('plan:', row[-1])
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
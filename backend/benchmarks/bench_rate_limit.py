@@ -0,0 +1,69 @@
+"""
+Measures the per-request overhead of the rate limiter.
+
+Times a no-op view called directly and wrapped in rate_limited, inside one request context, for
+the memory and the shared (memory-mapped file) backends. Requests rotate through CLIENTS client
+addresses so buckets are looked up, refilled and written as in production, and the limit is high
+enough that every request is allowed. The difference is the limiter's cost per request.
+
+Run from the backend directory:
+
+    python benchmarks/bench_rate_limit.py [--requests 200000] [--clients 1000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import request  # noqa: E402
+
+from cafe_fausse import create_app  # noqa: E402
+from cafe_fausse.rate_limit import rate_limited  # noqa: E402
+
+
+def view():
+    return None
+
+
+def run(app, requests, clients):
+    limited = rate_limited('RATE_LIMIT_RESERVATIONS')(view)
+    addresses = [f'10.0.{index // 256}.{index % 256}' for index in range(clients)]
+    with app.test_request_context('/api/reservations', method='POST'):
+        environ = request.environ
+        started = time.perf_counter()
+        for index in range(requests):
+            environ['REMOTE_ADDR'] = addresses[index % clients]
+            view()
+        bare = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for index in range(requests):
+            environ['REMOTE_ADDR'] = addresses[index % clients]
+            limited()
+        wrapped = time.perf_counter() - started
+    return (wrapped - bare) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200_000)
+    parser.add_argument('--clients', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for storage in ('memory', 'shared'):
+            app = create_app('development')
+            app.config.update({
+                'RATE_LIMIT_STORAGE': storage,
+                'RATE_LIMIT_SHARED_FILE': os.path.join(directory, 'buckets'),
+                'RATE_LIMIT_RESERVATIONS': '1000000/second',
+            })
+            overhead = run(app, args.requests, args.clients)
+            print(f'{storage:6} backend {overhead * 1e6:6.2f} µs per request')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Measures memory and time of reading a month of reservations for the admin listing.
+
+Seeds ROWS bookings over 30 days with the bulk importer, then reads the whole month:
+
+- list: every row loaded into a list before serializing (what a plain .all() does),
+- stream: reservation_repository.stream_reservations, serialized line by line as the NDJSON
+  response does.
+
+Peak Python memory is measured with tracemalloc.
+
+Run from the backend directory:
+
+    python benchmarks/bench_reservation_listing.py [--rows 40000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from cafe_fausse import create_app  # noqa: E402
+from cafe_fausse.bulk_import import import_reservations  # noqa: E402
+from cafe_fausse.extensions import db  # noqa: E402
+from cafe_fausse.floor_plan import FloorPlan  # noqa: E402
+from cafe_fausse.reservation_repository import _range_query, _reservation_dict, stream_reservations  # noqa: E402
+
+FIRST_DAY = datetime(2031, 1, 1)
+
+
+def measure(read):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = read()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=40000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        app = create_app('development')
+        with app.app_context():
+            db.create_all()
+            # Enough tables for every row: 30 days x 24 hourly slots x 60 tables.
+            floor_plan = FloorPlan([4] * 60)
+            rows = (
+                (index + 1, {
+                    'datetime': (FIRST_DAY + timedelta(hours=index // 60)).isoformat(),
+                    'guests': 2, 'name': f'Guest {index}', 'email': f'guest{index}@example.com', 'duration': 60,
+                })
+                for index in range(args.rows)
+            )
+            for _ in import_reservations(rows, floor_plan, 2000):
+                pass
+            start, end = FIRST_DAY, FIRST_DAY + timedelta(days=30)
+
+            def read_list():
+                items = [_reservation_dict(row) for row in db.session.execute(_range_query(start, end)).all()]
+                return sum(len(json.dumps(item)) + 1 for item in items)
+
+            def read_stream():
+                return sum(len(json.dumps(item)) + 1 for item in stream_reservations(start, end))
+
+            for name, read in (('list', read_list), ('stream', read_stream)):
+                size, elapsed, peak = measure(read)
+                print(f'{name:<7} {size / 1e6:6.1f} MB of NDJSON in {elapsed:5.2f}s, peak memory {peak / 1e6:7.2f} MB')
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
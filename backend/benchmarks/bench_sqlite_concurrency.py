@@ -0,0 +1,168 @@
+"""
+Measures SQLite read/write concurrency with the old and the new connection pragmas.
+
+For each setting a fresh database is seeded with SEED_ROWS bookings, then READERS processes list
+a random day's reservations (the admin listing query) while WRITERS processes book reservations
+through book_reservation, all for DURATION seconds. Reported per setting: reads and bookings per
+second, median and p95 read latency, and requests that failed.
+
+Settings:
+
+- rollback journal: journal_mode=DELETE, synchronous=FULL, SQLite's defaults before,
+- wal: the configured defaults, journal_mode=WAL with synchronous=NORMAL.
+
+Both use the same busy timeout and mmap size, so the journal mode is the only difference.
+
+Run from the backend directory:
+
+    python benchmarks/bench_sqlite_concurrency.py [--readers 8] [--writers 2] [--duration 5]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from cafe_fausse import create_app  # noqa: E402
+from cafe_fausse.booking import SlotFullError, book_reservation  # noqa: E402
+from cafe_fausse.bulk_import import import_reservations  # noqa: E402
+from cafe_fausse.extensions import db  # noqa: E402
+from cafe_fausse.floor_plan import current_floor_plan  # noqa: E402
+from cafe_fausse.reservation_repository import reservation_page  # noqa: E402
+
+FIRST_DAY = datetime(2031, 1, 1)
+DAYS = 365
+SETTINGS = {
+    'rollback journal': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL'},
+    'wal': {'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': 'NORMAL'},
+}
+
+
+def seed(count, floor_plan, rng):
+    rows = (
+        (index + 1, {
+            'datetime': (FIRST_DAY + timedelta(days=rng.randrange(DAYS), hours=17, minutes=30 * rng.randrange(11))).isoformat(),
+            'guests': rng.choice([2, 2, 3, 4, 6]),
+            'name': 'Guest',
+            'email': f'guest{index % 2000}@example.com',
+        })
+        for index in range(count)
+    )
+    for _ in import_reservations(rows, floor_plan, 2000):
+        pass
+
+
+def reader(seed_value, start, duration, results):
+    rng = random.Random(seed_value)
+    app = create_app('development')
+    latencies = []
+    errors = 0
+    with app.app_context():
+        start.wait()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            day = FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+            started = time.perf_counter()
+            try:
+                reservation_page(day, day + timedelta(days=1), limit=50)
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+            db.session.rollback()
+    results.put(('read', latencies, errors))
+
+
+def writer(seed_value, start, duration, results):
+    rng = random.Random(seed_value)
+    app = create_app('development')
+    written = errors = 0
+    with app.app_context():
+        floor_plan = current_floor_plan()
+        start.wait()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            slot = FIRST_DAY + timedelta(days=rng.randrange(DAYS), hours=17, minutes=30 * rng.randrange(11))
+            try:
+                book_reservation(
+                    slot, slot + timedelta(minutes=90), 2, 'Writer', f'writer{rng.randrange(500)}@example.com',
+                    None, floor_plan,
+                )
+                written += 1
+            except SlotFullError:
+                pass
+            except Exception:
+                db.session.rollback()
+                errors += 1
+    results.put(('write', written, errors))
+
+
+def run(readers, writers, duration):
+    # Separate processes, like gunicorn workers, so the GIL does not serialize the clients.
+    context = multiprocessing.get_context('spawn')
+    start = context.Event()
+    results = context.Queue()
+    processes = [context.Process(target=reader, args=(index, start, duration, results)) for index in range(readers)]
+    processes += [
+        context.Process(target=writer, args=(1000 + index, start, duration, results)) for index in range(writers)
+    ]
+    for process in processes:
+        process.start()
+    time.sleep(2)
+    start.set()
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    latencies = []
+    for _ in processes:
+        kind, value, errors = results.get()
+        counts['errors'] += errors
+        if kind == 'read':
+            latencies.extend(value)
+            counts['reads'] += len(value)
+        else:
+            counts['writes'] += value
+    for process in processes:
+        process.join()
+    return counts, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--seed-rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, pragmas in SETTINGS.items():
+            path = os.path.join(directory, f"{name.replace(' ', '-')}.db")
+            os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+            for key, value in pragmas.items():
+                os.environ[f'FLASK_{key}'] = value
+            os.environ['FLASK_LOG_LEVEL'] = 'WARNING'
+            os.environ['FLASK_RATE_LIMIT_ENABLED'] = 'false'
+            app = create_app('development')
+            with app.app_context():
+                db.create_all()
+                seed(args.seed_rows, current_floor_plan(), random.Random(7))
+
+                db.session.remove()
+                db.engine.dispose()
+
+            counts, latencies = run(args.readers, args.writers, args.duration)
+            latencies.sort()
+            median = statistics.median(latencies) if latencies else 0
+            p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+            print(
+                f"{name:16} {counts['reads'] / args.duration:8.0f} reads/s {counts['writes'] / args.duration:6.0f} bookings/s"
+                f"  read p50 {median * 1000:6.2f} ms  p95 {p95 * 1000:6.2f} ms  errors {counts['errors']}"
+            )
+
+
+if __name__ == '__main__':
+    main()
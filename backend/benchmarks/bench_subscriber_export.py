@@ -0,0 +1,70 @@
+"""
+Measures peak memory of the subscriber export as the list grows.
+
+Subscribes ROWS addresses with subscribe_many, then exports them as CSV through
+subscriber_export.export_lines (a streaming cursor, one line at a time) and, for comparison, by
+loading every row into a list first. Peak Python memory is measured with tracemalloc.
+
+Run from the backend directory:
+
+    python benchmarks/bench_subscriber_export.py [--rows 100000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select  # noqa: E402
+
+from cafe_fausse import create_app  # noqa: E402
+from cafe_fausse.extensions import db  # noqa: E402
+from cafe_fausse.models import Customer  # noqa: E402
+from cafe_fausse.subscriber_export import export_lines, new_watermark  # noqa: E402
+from cafe_fausse.subscriptions import subscribe_many  # noqa: E402
+
+
+def measure(export):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = export()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        app = create_app('development')
+        with app.app_context():
+            db.create_all()
+            subscribe_many((f'reader{index}@example.com', f'Reader {index}') for index in range(args.rows))
+
+            def loaded():
+                rows = db.session.execute(
+                    select(Customer.email, Customer.name, Customer.updated_at)
+                    .where(Customer.newsletter_opt_in.is_(True))
+                    .order_by(Customer.updated_at, Customer.id)
+                ).all()
+                return sum(len(f'{email},{name},{updated_at.isoformat()}\n') for email, name, updated_at in rows)
+
+            def streamed():
+                return sum(len(line) for line in export_lines('csv', new_watermark()))
+
+            for name, export in (('list', loaded), ('stream', streamed)):
+                size, elapsed, peak = measure(export)
+                print(f'{name:<7} {size / 1e6:6.1f} MB of CSV in {elapsed:5.2f}s, peak memory {peak / 1e6:7.2f} MB')
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Compares table allocation policies for a single reservation slot.
+
+Each run fills a slot with a stream of parties drawn from a typical party-size mix until
+REQUESTS parties have asked for a table, then reports:
+
+- seat utilization: seated guests / seats in the room,
+- parties seated and turned away,
+- mean allocation latency.
+
+Policies:
+
+- random-any: the original behaviour, a uniformly random free table whatever its size. Parties
+  placed at a table that is too small are counted as "misfit" and are not counted as seated.
+- random-fit: a uniformly random free table among those large enough.
+- best-fit: FloorPlan.best_fit, the smallest free table that fits.
+
+Run from the backend directory:
+
+    python benchmarks/bench_table_allocation.py [--floor-plan 2x8,4x14,6x6,8x2] [--runs 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from cafe_fausse.floor_plan import FloorPlan, parse_floor_plan  # noqa: E402
+
+# Party sizes 1..10 weighted towards couples and small groups.
+PARTY_SIZES = list(range(1, 11))
+PARTY_WEIGHTS = [6, 38, 12, 22, 6, 8, 2, 4, 1, 1]
+
+
+def random_any(plan, free_mask, party_size, rng):
+    free = [index + 1 for index in range(plan.total_tables) if free_mask >> index & 1]
+    return rng.choice(free) if free else None
+
+
+def random_fit(plan, free_mask, party_size, rng):
+    free = [
+        index + 1 for index in range(plan.total_tables)
+        if free_mask >> index & 1 and plan.seats[index] >= party_size
+    ]
+    return rng.choice(free) if free else None
+
+
+def best_fit(plan, free_mask, party_size, rng):
+    return plan.best_fit(free_mask, party_size)
+
+
+POLICIES = {'random-any': random_any, 'random-fit': random_fit, 'best-fit': best_fit}
+
+
+def simulate(plan, policy, parties, rng):
+    free_mask = (1 << plan.total_tables) - 1
+    seated_guests = seated = rejected = misfit = 0
+    elapsed = 0
+
+    for party_size in parties:
+        started = time.perf_counter_ns()
+        table_number = policy(plan, free_mask, party_size, rng)
+        elapsed += time.perf_counter_ns() - started
+
+        if table_number is None:
+            rejected += 1
+            continue
+        free_mask &= ~(1 << (table_number - 1))
+        if plan.seats[table_number - 1] < party_size:
+            misfit += 1
+            continue
+        seated += 1
+        seated_guests += party_size
+
+    return {
+        'utilization': seated_guests / plan.total_seats,
+        'seated': seated,
+        'rejected': rejected,
+        'misfit': misfit,
+        'latency_ns': elapsed / len(parties),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--floor-plan', default='2x8,4x14,6x6,8x2')
+    parser.add_argument('--runs', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    plan = FloorPlan(parse_floor_plan(args.floor_plan))
+    requests = plan.total_tables * 2
+    rng = random.Random(args.seed)
+    slots = [rng.choices(PARTY_SIZES, PARTY_WEIGHTS, k=requests) for _ in range(args.runs)]
+
+    print(f'floor plan {args.floor_plan}: {plan.total_tables} tables, {plan.total_seats} seats, '
+          f'{requests} requests per slot, {args.runs} slots')
+    print(f"{'policy':<12}{'utilization':>12}{'seated':>9}{'rejected':>10}{'misfit':>8}{'latency':>12}")
+    for name, policy in POLICIES.items():
+        runs = [simulate(plan, policy, parties, random.Random(index)) for index, parties in enumerate(slots)]
+        mean = {key: sum(run[key] for run in runs) / len(runs) for key in runs[0]}
+        print(f"{name:<12}{mean['utilization']:>11.1%}{mean['seated']:>9.1f}{mean['rejected']:>10.1f}"
+              f"{mean['misfit']:>8.1f}{mean['latency_ns'] / 1000:>9.2f} us")
+
+
+if __name__ == '__main__':
+    main()
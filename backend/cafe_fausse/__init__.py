@@ -1,16 +1,30 @@
+import logging
+
 from flask import Flask
 from flask_cors import CORS
+from sqlalchemy.engine import make_url
+from werkzeug.middleware.proxy_fix import ProxyFix
 
+from .commands import register_commands
 from .config import get_config
-from .extensions import db, migrate
+from .database import configure_engine, engine_options
+from .extensions import compress, db, migrate
+from .floor_plan import current_floor_plan
+from .log import configure_logging
+from .metrics import instrument_engine
 from .routes import api_bp
-import logging
+
+logger = logging.getLogger(__name__)
+
+# Origins allowed to call /api/* from a browser (also used by the ASGI app in asgi.py).
+CORS_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5173", "http://127.0.0.1:80","http://localhost:80","http://192.168.43.103"
+]
 
 
 
 # This factory function creates and configures the Flask application.
-# It loads configuration based on the environment, initializes extensions,
-# applies CORS settings for API routes, and registers the main API blueprint.
+# It loads configuration based on the environment, sets up logging, initializes extensions,
+# applies CORS settings for API routes, registers the main API blueprint and the CLI commands.
 # The resulting Flask app instance is returned for use by the server.
 
 def create_app(env_name: str | None = None):
@@ -18,7 +32,8 @@ def create_app(env_name: str | None = None):
   Application factory for Cafe Fausse backend.
 
   Creates and configures a Flask app instance using the given environment name. Loads configuration,
-  initializes extensions (database and migration), sets up CORS, and registers API routes.
+  initializes extensions (database with its pool, SQLite pragmas and query metrics, and migration), sets up CORS,
+  registers API routes and checks the floor plan.
 
   Args:
       env_name (str | None): The name of the environment to configure the app ('development', 'production', etc.).
@@ -26,19 +41,43 @@ def create_app(env_name: str | None = None):
 
   Returns:
       Flask: The fully configured Flask application instance.
+
+  Raises:
+      ValueError: ADMIN_PASSWORD or ADMIN_TOKEN is unset outside development, FLOOR_PLAN is malformed,
+        or the room has more than floor_plan.MAX_TABLES tables.
   """
   app = Flask(__name__)
-  app.config.from_object(get_config(env_name))
+  config = get_config(env_name)
+  app.config.from_object(config)
   app.config.from_prefixed_env()
-  logging.basicConfig(level=logging.DEBUG)
-  print("DB URI this is for RAS:", app.config.get("SQLALCHEMY_DATABASE_URI"))
+  for setting in ('ADMIN_PASSWORD', 'ADMIN_TOKEN'):
+    if not app.config.get(setting):
+      raise ValueError(f'{setting} must be set; the admin endpoints expose guests\' personal data.')
+  if app.config['TRUSTED_PROXIES']:
+    # request.remote_addr becomes the client address reported by the trusted proxies.
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+  configure_logging(app)
+  logger.info(
+    'Loaded %s; database %s', config.__name__,
+    make_url(app.config['SQLALCHEMY_DATABASE_URI']).render_as_string(hide_password=True),
+  )
+  app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
   db.init_app(app)
+  with app.app_context():
+    configure_engine(db.engine, app.config)
+    instrument_engine(db.engine)
   migrate.init_app(app, db)
+  compress.init_app(app)
   # CORS(app, resources={r'/api/*': {'origins': app.config['CORS_ALLOW_ORIGINS']}})
-  CORS(app, resources={r"/api/*": {"origins": ["http://localhost:5173", "http://127.0.0.1:5173", "http://127.0.0.1:80","http://localhost:80","http://192.168.43.103"
-]}})
+  CORS(app, resources={r"/api/*": {"origins": CORS_ORIGINS}})
 
   app.register_blueprint(api_bp)
+  register_commands(app)
+
+  # A malformed FLOOR_PLAN, or more tables than the occupancy masks hold, stops the app here
+  # rather than failing every booking.
+  with app.app_context():
+    current_floor_plan()
 
   return app
 
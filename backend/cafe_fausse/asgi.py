@@ -0,0 +1,240 @@
+import logging
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+
+import anyio
+from a2wsgi import WSGIMiddleware
+from flask import current_app, g
+from sqlalchemy import insert
+from starlette.applications import Starlette
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+
+from . import CORS_ORIGINS, availability, log, metrics, outbox
+from .compression import ENCODERS
+from .customer_repository import UPSERT_DIALECTS, upsert_customer_statement
+from .database import make_async_engine
+from .floor_plan import current_floor_plan
+from .intervals import TableIntervals, overlapping
+from .menu_cache import menu_cache, stat_signature
+from .models import OutboxMessage
+from .routes.newsletter import EMAIL_REGEX
+
+logger = logging.getLogger(__name__)
+
+# This file defines the optional ASGI mode of the application (requirements-asgi.txt).
+# create_asgi_app() wraps the Flask app: the I/O-bound read and signup endpoints (health, the
+# menu file, availability and newsletter signups) are served by native async handlers, which query
+# through SQLAlchemy's async engine and read the menu file without blocking the event loop, so one
+# process holds many more waiting connections than it has threads. Every other route (bookings with
+# their row locks, admin, menu edits, and the SPA) is passed to the Flask app unchanged and runs on
+# a pool of ASGI_WSGI_THREADS threads. The async handlers reuse the Flask app's config, caches and
+# statement builders inside its app context, are logged and measured like them, and answer exactly
+# like the Flask routes they replace.
+# The WSGI mode (app.py, gunicorn.conf.py) is unaffected.
+
+
+class AppContextMiddleware:
+    """
+    Runs the async handlers inside an app context of the Flask app, with the request id, the
+    "request" record and the metrics that log.py and metrics.py add to Flask requests.
+    """
+
+    def __init__(self, app, flask_app):
+        self.app = app
+        self.flask_app = flask_app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        with self.flask_app.app_context():
+            g.request_id = request_id = log.new_request_id(Headers(scope=scope).get(log.REQUEST_ID_HEADER))
+            measured = self.flask_app.config['METRICS_ENABLED']
+            if measured:
+                metrics.reset_request_totals()
+
+            async def send_with_id(message):
+                nonlocal status
+                if message['type'] == 'http.response.start':
+                    status = message['status']
+                    MutableHeaders(scope=message)[log.REQUEST_ID_HEADER] = request_id
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                log.log_request(scope['method'], scope['path'], status, started)
+                if measured:
+                    # The async routes have no path parameters, so the path is the route.
+                    metrics.record_request(scope['method'], scope['path'], status, started)
+
+
+def _encoded(request: Request, body: bytes, etag: str | None = None):
+    # Same rules and cache as compression.Compress, which only sees responses from the Flask app.
+    config = current_app.config
+    if len(body) < config['COMPRESS_MIN_SIZE']:
+        return body, None
+    encoding = parse_accept_header(request.headers.get('accept-encoding')).best_match(list(ENCODERS))
+    if encoding is None:
+        return body, None
+    cache = current_app.extensions['compress']
+    cached = cache.get((etag, encoding)) if etag else None
+    if cached is None:
+        cached = ENCODERS[encoding](body, config['COMPRESS_LEVEL'])
+        if etag:
+            cache.set((etag, encoding), cached)
+    return cached, encoding
+
+
+def _json_response(request: Request, data, status_code: int = 200):
+    response = JSONResponse(data, status_code)
+    body, encoding = _encoded(request, response.body)
+    if encoding:
+        response.body = body
+        response.headers['Content-Length'] = str(len(body))
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+async def health_check(request: Request):
+    """Async GET /api/health; see routes.health."""
+    return JSONResponse({'status': 'ok'})
+
+
+async def get_menu(request: Request):
+    """
+    Async GET /api/menu for MENU_SOURCE=file; see routes.menu.
+
+    The file is stat-ed and, when it changed, read in a worker thread, so the event loop never
+    waits on the disk. Its parsed copy is shared with the Flask route through menu_cache.
+    """
+    if any(param in request.query_params for param in ('section', 'limit', 'cursor')):
+        return JSONResponse({'error': 'Menu filtering requires MENU_SOURCE=database'}, 400)
+
+    path = anyio.Path(os.getcwd(), 'data', 'menu.json')
+    try:
+        signature = stat_signature(await path.stat())
+    except FileNotFoundError:
+        menu_cache.invalidate(str(path))
+        return JSONResponse({'error': 'menu.json not found'}, 404)
+    entry = menu_cache.cached(str(path), signature)
+    if entry is None:
+        entry = menu_cache.store(str(path), signature, await path.read_bytes())
+
+    headers = {'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if parse_etags(request.headers.get('if-none-match')).contains_weak(entry.etag):
+        headers['ETag'] = quote_etag(entry.etag)
+        return Response(status_code=304, headers=headers)
+
+    body, encoding = _encoded(request, entry.body, entry.etag)
+    # Like Compress, the encoded body carries a weak ETag.
+    headers['ETag'] = quote_etag(entry.etag, weak=encoding is not None)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(body, media_type='application/json', headers=headers)
+
+
+async def get_availability(request: Request):
+    """Async GET /api/availability; see routes.availability."""
+    try:
+        day = date.fromisoformat(request.query_params.get('date', ''))
+    except ValueError:
+        return JSONResponse({'message': 'A date in YYYY-MM-DD format is required.'}, 400)
+
+    slots = availability.cached_availability(day)
+    if slots is None:
+        start, end = availability.booking_window(day)
+        intervals = TableIntervals(current_floor_plan().total_tables)
+        async with current_app.extensions['async_engine'].connect() as connection:
+            for table_number, time_slot, end_time in await connection.execute(overlapping(start, end)):
+                intervals.add(table_number, time_slot, end_time)
+        slots = availability.availability_from(day, intervals)
+    return _json_response(request, {'date': day.isoformat(), 'slots': slots})
+
+
+async def subscribe_newsletter(request: Request):
+    """
+    Async POST /api/newsletter; see routes.newsletter.
+
+    The customer upsert and the welcome email's outbox row are written in one transaction.
+    """
+    if request.headers.get('content-type', '').split(';')[0].strip() != 'application/json':
+        return JSONResponse({'message': 'Request body must be JSON.'}, 415)
+    try:
+        payload = await request.json()
+    except ValueError:
+        return JSONResponse({'message': 'Request body must be JSON.'}, 400)
+    if not isinstance(payload, dict):
+        payload = {}
+    email = (payload.get('email') or '').strip().lower()
+    name = (payload.get('name') or '').strip() or None
+
+    if not email:
+        return JSONResponse({'message': 'Email is required.'}, 400)
+    if not re.match(EMAIL_REGEX, email):
+        return JSONResponse({'message': 'Invalid email format.'}, 422)
+
+    engine = current_app.extensions['async_engine']
+    try:
+        async with engine.begin() as connection:
+            statement, row = upsert_customer_statement(connection.dialect.name, email, name, newsletter_opt_in=True)
+            await connection.execute(statement, [row])
+            await connection.execute(
+                insert(OutboxMessage), [outbox.message_row('newsletter_welcome', email, {'name': name})]
+            )
+    except Exception:
+        logger.exception('Newsletter signup failed')
+        return JSONResponse({'message': 'Unable to subscribe right now.'}, 500)
+
+    return JSONResponse({'message': 'You are subscribed to the Café Fausse newsletter.'}, 201)
+
+
+def create_asgi_app(flask_app):
+    """
+    Creates the ASGI application serving ``flask_app``.
+
+    Args:
+        flask_app (Flask): The app from create_app (with the SPA, as in app.py).
+
+    Returns:
+        Starlette: The ASGI app; the async engine is disposed when it shuts down.
+    """
+    engine = make_async_engine(flask_app.config)
+    metrics.instrument_engine(engine.sync_engine)
+    flask_app.extensions['async_engine'] = engine
+
+    middleware = [
+        Middleware(AppContextMiddleware, flask_app=flask_app),
+        Middleware(CORSMiddleware, allow_origins=CORS_ORIGINS, allow_methods=['*'], allow_headers=['*']),
+    ]
+    routes = [
+        Route('/api/health', health_check, methods=['GET'], middleware=middleware),
+        Route('/api/availability', get_availability, methods=['GET'], middleware=middleware),
+    ]
+    # The database menu and dialects without ON CONFLICT keep their Flask routes.
+    if flask_app.config.get('MENU_SOURCE') != 'database':
+        routes.append(Route('/api/menu', get_menu, methods=['GET'], middleware=middleware))
+    if engine.dialect.name in UPSERT_DIALECTS:
+        routes.append(Route('/api/newsletter', subscribe_newsletter, methods=['POST'], middleware=middleware))
+    # Other methods (CORS preflights included) and every other path go to the Flask app.
+    routes.append(Mount('', app=WSGIMiddleware(flask_app, workers=flask_app.config['ASGI_WSGI_THREADS'])))
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await engine.dispose()
+
+    return Starlette(routes=routes, lifespan=lifespan)
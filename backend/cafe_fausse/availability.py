@@ -0,0 +1,119 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+
+from .floor_plan import current_floor_plan
+from .intervals import load_intervals
+from .occupancy import full_mask
+
+# This file computes how many tables are left for every reservation slot of a day.
+# The day's bookings are loaded with a single range query into an in-memory interval structure,
+# which then answers the overlap check of every slot. Results are kept in a short-lived per-app
+# cache that bookings invalidate once they commit.
+
+
+class AvailabilityCache:
+    """A per-day TTL cache of availability results."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, day: date):
+        entry = self._entries.get(day)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, day: date, value, ttl: float):
+        with self._lock:
+            self._entries[day] = (time.monotonic() + ttl, value)
+
+    def invalidate(self, day: date):
+        with self._lock:
+            self._entries.pop(day, None)
+
+
+def _cache():
+    return current_app.extensions.setdefault('availability', AvailabilityCache())
+
+
+def day_slots(day: date):
+    """Returns the bookable slot start times of ``day`` from the RESERVATION_SLOT_* settings."""
+    config = current_app.config
+    first = datetime.combine(day, datetime.strptime(config['RESERVATION_FIRST_SLOT'], '%H:%M').time())
+    last = datetime.combine(day, datetime.strptime(config['RESERVATION_LAST_SLOT'], '%H:%M').time())
+    step = timedelta(minutes=config['RESERVATION_SLOT_MINUTES'])
+
+    slots = []
+    slot = first
+    while slot <= last:
+        slots.append(slot)
+        slot += step
+    return slots
+
+
+def day_availability(day: date):
+    """
+    Returns, for every slot of ``day``, how many tables are free for a reservation of
+    RESERVATION_DURATION_MINUTES starting at that slot. Cached for AVAILABILITY_CACHE_TTL seconds.
+
+    Slots that are off the regular grid but already have bookings are included as well.
+    """
+    cached = cached_availability(day)
+    if cached is not None:
+        return cached
+
+    start, end = booking_window(day)
+    return availability_from(day, load_intervals(start, end, current_floor_plan().total_tables))
+
+
+def cached_availability(day: date):
+    """Returns the cached availability of ``day``, or None if it is not cached or expired."""
+    return _cache().get(day)
+
+
+def booking_window(day: date):
+    """Returns the [start, end) range of the bookings that can take tables from a slot of ``day``."""
+    duration = timedelta(minutes=current_app.config['RESERVATION_DURATION_MINUTES'])
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1) + duration
+
+
+def availability_from(day: date, intervals):
+    """
+    Computes the availability of ``day`` from its bookings (loaded over booking_window(day)),
+    caches it and returns it.
+    """
+    total_tables = intervals.total_tables
+    duration = timedelta(minutes=current_app.config['RESERVATION_DURATION_MINUTES'])
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    everything = full_mask(total_tables)
+
+    slots = sorted(set(day_slots(day)) | intervals.starts(start, end))
+    result = [
+        {
+            'timeSlot': slot.isoformat(),
+            'remaining': (everything & ~intervals.busy_mask(slot, slot + duration)).bit_count(),
+        }
+        for slot in slots
+    ]
+    _cache().set(day, result, current_app.config['AVAILABILITY_CACHE_TTL'])
+    return result
+
+
+def invalidate(day: date):
+    """Drops the cached availability of ``day``; called once a booking for that day commits."""
+    _cache().invalidate(day)
+
+
+def invalidate_range(start, end):
+    """Drops the cached availability of every day a booking from ``start`` to ``end`` can affect."""
+    # A booking also shortens the slots before it that would run into it.
+    day = (start - timedelta(minutes=current_app.config['RESERVATION_DURATION_MINUTES'])).date()
+    while day <= end.date():
+        invalidate(day)
+        day += timedelta(days=1)
@@ -0,0 +1,87 @@
+import random
+import time
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from . import availability, outbox, rollups
+from .customer_repository import upsert_booking_customer
+from .database import is_contention
+from .extensions import db
+from .floor_plan import FloorPlan
+from .models import Reservation
+from .occupancy import ClaimConflict, claim_table
+
+# This file holds the transactional part of creating a reservation.
+# A booking claims the best-fitting table that is free for its whole duration, locking the occupancy
+# rows of the cells it overlaps, upserts the customer and inserts the reservation in one
+# transaction. When a concurrent booking wins a race (a changed
+# occupancy row, a unique-constraint violation on the occupancy or reservation keys, a locked
+# SQLite database, or a PostgreSQL serialization/lock failure), the transaction is rolled back and
+# retried; any other database error is raised to the caller.
+# The confirmation email is queued in the outbox within the same transaction and sent by the outbox
+# worker, and the dashboard rollups are updated in the same transaction as well. A committed
+# booking drops the cached availability of the days it covers.
+
+MAX_ATTEMPTS = 5
+
+
+class SlotFullError(Exception):
+    """Raised when no table large enough for the party is free for the requested time."""
+
+
+class BookingContentionError(Exception):
+    """Raised when a booking keeps losing races and gives up after MAX_ATTEMPTS tries."""
+
+
+def book_reservation(
+    time_slot, end_time, party_size: int, name: str, email: str, phone: str | None, floor_plan: FloorPlan
+):
+    """
+    Books a table from ``time_slot`` until ``end_time`` and commits the reservation.
+
+    Returns:
+        Reservation: The committed reservation.
+
+    Raises:
+        SlotFullError: No table that can seat the party is free for the whole time.
+        BookingContentionError: Concurrent bookings kept conflicting with this one.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            table_number = claim_table(time_slot, end_time, floor_plan, party_size)
+            if table_number is None:
+                db.session.rollback()
+                raise SlotFullError(time_slot)
+
+            customer_id, reservation_count = upsert_booking_customer(email, name=name, phone=phone)
+            reservation = Reservation(
+                customer_id=customer_id,
+                time_slot=time_slot,
+                end_time=end_time,
+                party_size=party_size,
+                table_number=table_number,
+            )
+            db.session.add(reservation)
+            outbox.enqueue('reservation_confirmation', email, {
+                'name': name,
+                'guests': party_size,
+                'timeSlot': time_slot.isoformat(),
+                'tableNumber': table_number,
+            })
+            rollups.record([(time_slot, end_time, party_size, reservation_count > 1)])
+            # Detached after the flush, the reservation keeps its loaded values through the commit,
+            # so reading them afterwards does not cost a refresh SELECT.
+            db.session.flush()
+            db.session.expunge(reservation)
+            db.session.commit()
+            availability.invalidate_range(time_slot, end_time)
+            return reservation
+        except (ClaimConflict, IntegrityError, OperationalError) as error:
+            db.session.rollback()
+            # Only lost races are retried; other database errors reach the caller as they are.
+            if not isinstance(error, ClaimConflict) and not is_contention(error):
+                raise
+            # Randomized exponential backoff spreads out the retries of competing requests.
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+    raise BookingContentionError(time_slot)
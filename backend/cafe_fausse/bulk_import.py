@@ -0,0 +1,216 @@
+import csv
+import json
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from . import availability, rollups
+from .customer_repository import upsert_booking_customers
+from .database import is_contention
+from .extensions import db
+from .floor_plan import FloorPlan
+from .intervals import load_intervals, max_duration
+from .models import Reservation
+from .occupancy import cell_masks, full_mask, lock_slots, slot_cells, write_cells
+
+# This file imports reservations in bulk from CSV or NDJSON input (group events, partner sheets).
+# Rows are streamed and processed in chunks. For each chunk the occupancy rows of the covered cells
+# are locked, the overlapping bookings are loaded into an in-memory interval structure with one
+# range query, and tables are assigned against it with the floor plan's best-fit allocator.
+# Customers are upserted through the customer repository and reservations inserted with batched
+# executemany statements, the dashboard rollups get one batched update, and the chunk is committed
+# as one transaction. Every input row gets a result entry, in input order.
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_ATTEMPTS = 3
+
+
+def read_rows(stream, fmt: str):
+    """
+    Yields (row_number, record) pairs from a text stream in ``csv`` or ``ndjson`` format.
+
+    Records use the keys of the POST /api/reservations body: datetime, guests, name, email, phone
+    and an optional duration.
+
+    Row numbers start at 1 and count data rows. Lines that are not valid JSON objects are yielded
+    with a None record so they show up in the report.
+    """
+    if fmt == 'csv':
+        for row_number, record in enumerate(csv.DictReader(stream), start=1):
+            yield row_number, record
+        return
+
+    row_number = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield row_number, record if isinstance(record, dict) else None
+
+
+def _validate(record, floor_plan: FloorPlan):
+    if record is None:
+        return None, 'Row could not be parsed.'
+    try:
+        # Times are imported as wall-clock times; any UTC offset is dropped.
+        time_slot = datetime.fromisoformat((record.get('datetime') or '').strip()).replace(tzinfo=None)
+    except ValueError:
+        return None, 'Invalid or missing time slot.'
+
+    name = (record.get('name') or '').strip()
+    email = (record.get('email') or '').strip().lower()
+    if not name:
+        return None, 'Guest name is required.'
+    if not email:
+        return None, 'Email address is required.'
+
+    try:
+        party_size = int(record.get('guests'))
+    except (TypeError, ValueError):
+        return None, 'Number of guests must be numeric.'
+    if not 1 <= party_size <= floor_plan.largest_table:
+        return None, f'Number of guests must be between 1 and {floor_plan.largest_table}.'
+
+    longest = max_duration()
+    try:
+        duration = int(record.get('duration') or current_app.config['RESERVATION_DURATION_MINUTES'])
+    except (TypeError, ValueError):
+        return None, 'Duration must be a number of minutes.'
+    if not 1 <= duration <= longest:
+        return None, f'Duration must be between 1 and {longest} minutes.'
+
+    return {
+        'time_slot': time_slot,
+        'end_time': time_slot + timedelta(minutes=duration),
+        'party_size': party_size,
+        'name': name,
+        'email': email,
+        'phone': (record.get('phone') or '').strip() or None,
+    }, None
+
+
+def import_reservations(rows, floor_plan: FloorPlan, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Imports reservations from (row_number, record) pairs, committing every ``chunk_size`` rows.
+
+    Yields one result dict per row, in input order:
+    ``{"row": n, "status": "created", "reservationId": id, "tableNumber": t}`` or
+    ``{"row": n, "status": "error", "message": "..."}``.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from _import_chunk(chunk, floor_plan)
+            chunk = []
+    if chunk:
+        yield from _import_chunk(chunk, floor_plan)
+
+
+def _import_chunk(chunk, floor_plan: FloorPlan):
+    results = {}
+    valid = []
+    for row_number, record in chunk:
+        values, error = _validate(record, floor_plan)
+        if error:
+            results[row_number] = {'row': row_number, 'status': 'error', 'message': error}
+        else:
+            valid.append((row_number, values))
+
+    for _ in range(MAX_CHUNK_ATTEMPTS):
+        try:
+            results.update(_write_chunk(valid, floor_plan))
+            break
+        except (IntegrityError, OperationalError) as error:
+            db.session.rollback()
+            # A concurrent booking took a table first: redo the chunk. Other errors are real ones.
+            if not is_contention(error):
+                raise
+    else:
+        for row_number, _ in valid:
+            results[row_number] = {'row': row_number, 'status': 'error', 'message': 'Unable to import this row right now.'}
+
+    for row_number, _ in chunk:
+        yield results[row_number]
+
+
+def _write_chunk(valid, floor_plan: FloorPlan):
+    results = {}
+    if not valid:
+        return results
+
+    cells = {cell for _, values in valid for cell in slot_cells(values['time_slot'], values['end_time'])}
+    locked = lock_slots(cells)
+    cell_length = timedelta(minutes=current_app.config['RESERVATION_SLOT_MINUTES'])
+    intervals = load_intervals(min(cells), max(cells) + cell_length, floor_plan.total_tables)
+    everything = full_mask(floor_plan.total_tables)
+
+    assigned = []
+    for row_number, values in valid:
+        free_mask = everything & ~intervals.busy_mask(values['time_slot'], values['end_time'])
+        table_number = floor_plan.best_fit(free_mask, values['party_size'])
+        if table_number is None:
+            results[row_number] = {
+                'row': row_number,
+                'status': 'error',
+                'message': f"No free table for a party of {values['party_size']} at this time.",
+            }
+            continue
+        intervals.add(table_number, values['time_slot'], values['end_time'])
+        assigned.append((row_number, values, table_number))
+
+    if not assigned:
+        db.session.rollback()
+        return results
+
+    # One batched upsert for the chunk's customers; later rows of a guest win.
+    customers = upsert_booking_customers(
+        (values['email'], values['name'], values['phone'], False) for _, values, _ in assigned
+    )
+    customer_ids = {email: customer_id for email, (customer_id, _) in customers.items()}
+
+    touched = {cell for _, values, _ in assigned for cell in slot_cells(values['time_slot'], values['end_time'])}
+    write_cells(cell_masks(intervals, touched), locked)
+
+    reservation_ids = db.session.scalars(
+        insert(Reservation).returning(Reservation.id, sort_by_parameter_order=True),
+        [
+            {
+                'customer_id': customer_ids[values['email']],
+                'time_slot': values['time_slot'],
+                'end_time': values['end_time'],
+                'party_size': values['party_size'],
+                'table_number': table_number,
+            }
+            for _, values, table_number in assigned
+        ],
+    ).all()
+
+    # A guest's earlier bookings are those counted before this chunk plus their previous rows in it.
+    earlier = {email: count for email, (_, count) in customers.items()}
+    for _, values, _ in assigned:
+        earlier[values['email']] -= 1
+    bookings = []
+    for _, values, _ in assigned:
+        bookings.append((values['time_slot'], values['end_time'], values['party_size'], earlier[values['email']] > 0))
+        earlier[values['email']] += 1
+    rollups.record(bookings)
+    db.session.commit()
+
+    for _, values, _ in assigned:
+        availability.invalidate_range(values['time_slot'], values['end_time'])
+
+    for (row_number, _, table_number), reservation_id in zip(assigned, reservation_ids):
+        results[row_number] = {
+            'row': row_number,
+            'status': 'created',
+            'reservationId': reservation_id,
+            'tableNumber': table_number,
+        }
+    return results
@@ -0,0 +1,132 @@
+import json
+import os
+import signal
+import threading
+
+import click
+from flask import current_app
+
+from . import idempotency, menu_repository, outbox, rollups, static_assets, subscriber_export
+from .mail import make_sender
+from .bulk_import import DEFAULT_CHUNK_SIZE, import_reservations, read_rows
+from .floor_plan import current_floor_plan
+
+# This file defines the Flask CLI commands of the application (run with `flask <command>`).
+# Commands are registered on the app by create_app through register_commands.
+
+
+@click.command('import-menu')
+@click.argument('path', required=False, type=click.Path(exists=True, dir_okay=False))
+def import_menu_command(path):
+    """Import the menu from menu.json (default: data/menu.json) into the menu tables."""
+    path = path or os.path.join(os.getcwd(), 'data', 'menu.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        sections = json.load(f)
+    section_count, item_count = menu_repository.import_menu(sections)
+    click.echo(f'Imported {item_count} items in {section_count} sections from {path}.')
+
+
+@click.command('import-reservations')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+              help='Input format (default: from the file extension).')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True, type=click.IntRange(min=1),
+              help='Rows committed per transaction.')
+@click.option('--report', type=click.File('w', encoding='utf-8'),
+              help='Write one NDJSON result line per input row to this file.')
+def import_reservations_command(path, fmt, chunk_size, report):
+    """Import reservations from a CSV or NDJSON file (fields: datetime, guests, name, email, phone)."""
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    created = failed = 0
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for result in import_reservations(read_rows(f, fmt), current_floor_plan(), chunk_size):
+            if result['status'] == 'created':
+                created += 1
+            else:
+                failed += 1
+                click.echo(f"Row {result['row']}: {result['message']}", err=True)
+            if report:
+                report.write(json.dumps(result) + '\n')
+    click.echo(f'Imported {created} reservations from {path}; {failed} rows failed.')
+
+
+@click.command('prune-idempotency-keys')
+def prune_idempotency_keys_command():
+    """Delete stored Idempotency-Key responses older than IDEMPOTENCY_TTL."""
+    click.echo(f'Deleted {idempotency.prune_expired()} expired idempotency keys.')
+
+
+@click.command('export-subscribers')
+@click.option('--format', 'fmt', type=click.Choice(subscriber_export.FORMATS), default='csv', show_default=True)
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d']),
+              help='Only export subscribers updated after this time (the watermark of the previous export).')
+@click.option('--output', type=click.File('w', encoding='utf-8'), default='-',
+              help='File to write to (default: standard output).')
+def export_subscribers_command(fmt, since, output):
+    """Stream newsletter subscribers as CSV or NDJSON."""
+    until = subscriber_export.new_watermark()
+    count = 0
+    for line in subscriber_export.export_lines(fmt, until, since):
+        output.write(line)
+        count += 1
+    if fmt == 'csv':
+        count -= 1
+    # The summary goes to stderr so that stdout stays a clean export.
+    click.echo(f'Exported {count} subscribers. Next --since: {until.isoformat()}', err=True)
+
+
+@click.command('outbox-worker')
+@click.option('--batch-size', type=click.IntRange(min=1), help='Messages claimed per batch (default: OUTBOX_BATCH_SIZE).')
+@click.option('--once', is_flag=True, help='Deliver the messages due now and exit.')
+def outbox_worker_command(batch_size, once):
+    """Deliver queued outbox messages (confirmation and welcome emails) until stopped."""
+    config = current_app.config
+    sender = make_sender(config)
+    batch_size = batch_size or config['OUTBOX_BATCH_SIZE']
+
+    def report(counts):
+        click.echo(f"Sent {counts['sent']}, retrying {counts['retried']}, failed {counts['failed']}.")
+
+    if once:
+        while True:
+            counts = outbox.deliver_batch(sender, batch_size)
+            if not any(counts.values()):
+                break
+            report(counts)
+        return
+
+    # SIGTERM/SIGINT finish the current batch and exit.
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
+    click.echo(f"Outbox worker started (sender: {config['OUTBOX_SENDER']}).")
+    outbox.run_worker(sender, batch_size, config['OUTBOX_POLL_INTERVAL'], stop, on_batch=report)
+
+
+@click.command('backfill-rollups')
+def backfill_rollups_command():
+    """
+    Rebuild the reservation dashboard rollups from all existing reservations.
+
+    Run once after upgrading to the rollups migration. Bookings and signups wait until it is done.
+    """
+    click.echo(f'Rebuilt reservation rollups from {rollups.backfill()} reservations.')
+
+
+@click.command('precompress-assets')
+@click.argument('dist', required=False, type=click.Path(exists=True, file_okay=False))
+def precompress_assets_command(dist):
+    """Write .gz siblings of the frontend build's text files (default: FRONTEND_DIST) for the asset server."""
+    dist = dist or current_app.config['FRONTEND_DIST']
+    click.echo(f'Compressed {static_assets.precompress(dist)} files in {dist}.')
+
+
+def register_commands(app):
+    """Registers the application's CLI commands on ``app``."""
+    app.cli.add_command(import_menu_command)
+    app.cli.add_command(import_reservations_command)
+    app.cli.add_command(prune_idempotency_keys_command)
+    app.cli.add_command(export_subscribers_command)
+    app.cli.add_command(outbox_worker_command)
+    app.cli.add_command(backfill_rollups_command)
+    app.cli.add_command(precompress_assets_command)
@@ -0,0 +1,137 @@
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import current_app, request
+
+# This file defines the response compression stage of the application.
+# Compress registers an after-request hook that gzip- or deflate-encodes responses according to
+# the client's Accept-Encoding header. Responses carrying a strong ETag (the menu, files served
+# from the SPA build) are compressed once and the encoded bytes are reused on later hits.
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'image/svg+xml',
+    'text/css',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+    'text/xml',
+}
+
+
+def _gzip(data: bytes, level: int):
+    # A fixed mtime keeps the output, and therefore cached copies, deterministic.
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _deflate(data: bytes, level: int):
+    return zlib.compress(data, level)
+
+
+ENCODERS = {'gzip': _gzip, 'deflate': _deflate}
+
+
+class CompressedCache:
+    """A small thread-safe LRU of encoded bodies keyed by (ETag, encoding)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body: bytes):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class Compress:
+    """
+    Flask extension compressing responses after the request.
+
+    Configuration:
+        COMPRESS_MIN_SIZE: Responses smaller than this many bytes are sent as-is.
+        COMPRESS_LEVEL: gzip/zlib compression level.
+        COMPRESS_CACHE_SIZE: Number of encoded bodies kept for responses with a strong ETag.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_CACHE_SIZE', 256)
+        app.extensions['compress'] = CompressedCache(app.config['COMPRESS_CACHE_SIZE'])
+        app.after_request(self.compress_response)
+
+    @staticmethod
+    def compress_response(response):
+        """After-request hook encoding ``response`` if the client and the payload allow it."""
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        if (
+            request.method == 'HEAD'
+            or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or (response.is_streamed and not response.direct_passthrough)
+        ):
+            return response
+
+        config = current_app.config
+        length = response.content_length
+        if length is not None and length < config['COMPRESS_MIN_SIZE']:
+            return response
+
+        encoding = request.accept_encodings.best_match(list(ENCODERS))
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        cache_key = (etag, encoding) if etag and not weak else None
+        cache = current_app.extensions['compress']
+        body = cache.get(cache_key) if cache_key else None
+
+        if body is None:
+            # File responses from send_file stream from disk; read them into memory to encode.
+            response.direct_passthrough = False
+            data = response.get_data()
+            if len(data) < config['COMPRESS_MIN_SIZE']:
+                return response
+            body = ENCODERS[encoding](data, config['COMPRESS_LEVEL'])
+            if cache_key:
+                cache.set(cache_key, body)
+        else:
+            # Cache hit: the original body is never read, close the underlying file instead.
+            response.close()
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            # The encoded representation differs byte-wise; a weak ETag still validates
+            # If-None-Match because conditional GETs use the weak comparison.
+            response.set_etag(etag, weak=True)
+        return response
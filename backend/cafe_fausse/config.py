@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 load_dotenv()
 class BaseConfig:
@@ -9,25 +10,142 @@ class BaseConfig:
         f"sqlite:///{os.path.abspath(os.path.join(os.path.dirname(__file__), 'cafefausse.db'))}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool of the engine (see database.engine_options; unused for in-memory SQLite).
+    # DevelopmentConfig and ProductionConfig pick their own defaults; the environment overrides both.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', -1))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'false').lower() in ('1', 'true', 'yes')
+
+    # Pragmas set on every SQLite connection (see database.configure_engine).
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
     JSON_SORT_KEYS = False
 
+    # ASGI mode (asgi.py): the async engine's URL, derived from SQLALCHEMY_DATABASE_URI when unset
+    # (see database.async_database_url), and the threads running the routes served through WSGI.
+    ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URI') or None
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 10))
+
+    # Admin credentials checked by POST /api/admin and the bearer token it hands out, which every
+    # admin endpoint requires. The token guards guests' personal data: there is no default outside
+    # DevelopmentConfig, and create_app refuses to start without ADMIN_PASSWORD and ADMIN_TOKEN.
+    ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
+    ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD') or None
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') or None
+
     # Restrict CORS in production via env var
     CORS_ALLOW_ORIGINS = os.environ.get('CORS_ALLOW_ORIGINS', '*')
 
     TOTAL_TABLES = int(os.environ.get('TOTAL_TABLES', 30))
 
+    # Seat counts per table as "<seats>x<tables>,..." (e.g. "2x8,4x14,6x6,8x2"). When set, it
+    # replaces TOTAL_TABLES; otherwise every table seats DEFAULT_TABLE_SEATS guests. Either way
+    # the room has at most 63 tables (floor_plan.MAX_TABLES).
+    FLOOR_PLAN = os.environ.get('FLOOR_PLAN') or None
+    DEFAULT_TABLE_SEATS = int(os.environ.get('DEFAULT_TABLE_SEATS', 10))
+
+    # Reservation slot grid reported by /api/availability (first and last seating, HH:MM).
+    RESERVATION_FIRST_SLOT = os.environ.get('RESERVATION_FIRST_SLOT', '17:00')
+    RESERVATION_LAST_SLOT = os.environ.get('RESERVATION_LAST_SLOT', '22:00')
+    RESERVATION_SLOT_MINUTES = int(os.environ.get('RESERVATION_SLOT_MINUTES', 30))
+    AVAILABILITY_CACHE_TTL = float(os.environ.get('AVAILABILITY_CACHE_TTL', 5))
+
+    # How long a table is held for a reservation, in minutes. Requests may pass their own
+    # 'duration' up to RESERVATION_MAX_DURATION_MINUTES, which is capped at 24 hours
+    # (intervals.LONGEST_RESERVATION_MINUTES).
+    RESERVATION_DURATION_MINUTES = int(os.environ.get('RESERVATION_DURATION_MINUTES', 90))
+    RESERVATION_MAX_DURATION_MINUTES = int(os.environ.get('RESERVATION_MAX_DURATION_MINUTES', 240))
+
+    # Idempotency-Key support for POST /api/reservations: how long completed responses are
+    # replayed, how many are kept in memory, and how long a duplicate waits for the first request.
+    IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 24 * 60 * 60))
+    IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', 1024))
+    IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', 10))
+    # A pending key whose request is older than this is taken to be abandoned (its worker died)
+    # and may be claimed again. Keep it well above the longest a request can run (the server timeout).
+    IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', 300))
+
+    # Subscriber exports stop this many seconds before the time they run, so a signup stamped
+    # before the watermark but committed after the export is still picked up by the next one.
+    # Must exceed the longest signup transaction.
+    EXPORT_WATERMARK_LAG_SECONDS = float(os.environ.get('EXPORT_WATERMARK_LAG_SECONDS', 60))
+
+    # Outbox delivery (`flask outbox-worker`). OUTBOX_SENDER is "file" (append emails to
+    # OUTBOX_FILE), "smtp", or "package.module:factory" for a custom sender.
+    OUTBOX_SENDER = os.environ.get('OUTBOX_SENDER', 'file')
+    # The file holds guests' names and addresses, so it is kept out of the source tree.
+    OUTBOX_FILE = os.environ.get('OUTBOX_FILE', os.path.join(tempfile.gettempdir(), 'cafe-fausse-outbox-mail.ndjson'))
+    OUTBOX_SMTP_HOST = os.environ.get('OUTBOX_SMTP_HOST', 'localhost')
+    OUTBOX_SMTP_PORT = int(os.environ.get('OUTBOX_SMTP_PORT', 1025))
+    OUTBOX_FROM = os.environ.get('OUTBOX_FROM', 'Café Fausse <reservations@cafefausse.com>')
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 50))
+    OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 1))
+    OUTBOX_LEASE_SECONDS = int(os.environ.get('OUTBOX_LEASE_SECONDS', 300))
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 8))
+    OUTBOX_RETRY_BASE_SECONDS = float(os.environ.get('OUTBOX_RETRY_BASE_SECONDS', 30))
+    OUTBOX_RETRY_MAX_SECONDS = float(os.environ.get('OUTBOX_RETRY_MAX_SECONDS', 3600))
+
+    # Per-client rate limits ("<count>/<second|minute|hour>") of the login and booking endpoints.
+    # RATE_LIMIT_STORAGE is "memory" (per process), "shared" (a memory-mapped RATE_LIMIT_SHARED_FILE
+    # used by all workers on the host) or "package.module:factory" for a custom backend.
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE', 'memory')
+    RATE_LIMIT_SHARED_FILE = os.environ.get('RATE_LIMIT_SHARED_FILE', os.path.join(tempfile.gettempdir(), 'cafe-fausse-rate-limit'))
+    RATE_LIMIT_LOGIN = os.environ.get('RATE_LIMIT_LOGIN', '5/minute')
+    RATE_LIMIT_RESERVATIONS = os.environ.get('RATE_LIMIT_RESERVATIONS', '20/minute')
+
+    # Clients are told apart by their address. Behind a reverse proxy that is the proxy's, so every
+    # guest would share one bucket: set TRUSTED_PROXIES to the number of proxies in front of the
+    # app, and the client address is taken from that many X-Forwarded-For entries. Leave it at 0
+    # when clients connect directly, or they could pick their own address with the header.
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+
+    # Logging (see log.py): level of the root logger, "text" or "json" lines, and an optional
+    # file to write to instead of stderr.
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text').lower()
+    LOG_FILE = os.environ.get('LOG_FILE') or None
+
+    # Vite build of the frontend served by app.py (see static_assets.AssetServer).
+    FRONTEND_DIST = os.environ.get('FRONTEND_DIST', os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'frontend', 'dist')))
+
+    # Where the menu is read from and written to: 'file' (data/menu.json) or 'database'
+    # (menu_sections/menu_items, loaded once with `flask import-menu`).
+    MENU_SOURCE = os.environ.get('MENU_SOURCE', 'file').lower()
+
+    # Prometheus metrics at /api/metrics (see metrics.py). Workers of one server share them through
+    # the PROMETHEUS_MULTIPROC_DIR environment variable, not a config key: it must be set before import.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+    # Response compression: payloads below COMPRESS_MIN_SIZE bytes are sent uncompressed.
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_CACHE_SIZE = int(os.environ.get('COMPRESS_CACHE_SIZE', 256))
+
 
 class DevelopmentConfig(BaseConfig):
     DEBUG = True
+    ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin')
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', 'fake-jwt-token')
 
 
 class ProductionConfig(BaseConfig):
     DEBUG = False
+    # Several workers share the server: keep more connections, check them before use, and
+    # replace them before PostgreSQL or a proxy drops idle ones.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
 
 
 def get_config(env_name: str | None = None):
     env = (env_name or os.environ.get('FLASK_ENV', 'development')).lower()
-    print(f"Loading config: {env}")  # helpful for debugging
     mapping = {
         'development': DevelopmentConfig,
         'production': ProductionConfig,
@@ -0,0 +1,189 @@
+from datetime import UTC, datetime
+
+from flask import g, has_app_context
+from sqlalchemy import event, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .extensions import db
+from .models import Customer
+
+# This file is the one place customers are created or updated by email.
+# Writes are a single INSERT ... ON CONFLICT (email) DO UPDATE ... RETURNING id, so creating a
+# customer and updating an existing one take one round trip, and concurrent requests for the same
+# email (a booking and a signup, or two retries) cannot collide on the unique constraint.
+# Within an app context (one request) the ids and values written are remembered in flask.g, so a
+# repeated upsert that would change nothing issues no statement. The memo is dropped whenever
+# the session rolls back, since the rows it describes may have been rolled back too.
+# Bookings also count the customer's reservations in the same statement, which tells the reservation
+# rollups whether a booking comes from a repeat customer without another query.
+
+# Dialects whose insert() supports on_conflict_do_update.
+UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+# Rows sent per executemany batch by upsert_customers.
+BATCH_SIZE = 1000
+
+
+def _identity_cache():
+    if 'customer_ids' not in g:
+        g.customer_ids = {}
+    return g.customer_ids
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_on_rollback(session):
+    if has_app_context():
+        g.pop('customer_ids', None)
+
+
+def _upsert_statement(dialect_name: str):
+    insert = UPSERT_DIALECTS[dialect_name](Customer)
+    return insert.on_conflict_do_update(
+        index_elements=[Customer.email],
+        set_={
+            # Missing values keep what the customer already has; opting in is never undone here.
+            'name': func.coalesce(insert.excluded.name, Customer.name),
+            'phone': func.coalesce(insert.excluded.phone, Customer.phone),
+            'newsletter_opt_in': or_(insert.excluded.newsletter_opt_in, Customer.newsletter_opt_in),
+            'updated_at': insert.excluded.updated_at,
+            'reservation_count': Customer.reservation_count + insert.excluded.reservation_count,
+        },
+    ).returning(Customer.email, Customer.id, Customer.reservation_count)
+
+
+def _row(email: str, name: str | None, phone: str | None, newsletter_opt_in: bool, now: datetime,
+         reservation_count: int = 0):
+    return {
+        'email': email,
+        'name': name,
+        'phone': phone,
+        'newsletter_opt_in': newsletter_opt_in,
+        'reservation_count': reservation_count,
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+def _fallback_upsert(rows):
+    # Dialects without ON CONFLICT support take the slower read-then-write path.
+    written = {}
+    for row in rows:
+        customer = Customer.query.filter_by(email=row['email']).first()
+        if not customer:
+            customer = Customer(**row)
+            db.session.add(customer)
+        else:
+            customer.name = row['name'] or customer.name
+            customer.phone = row['phone'] or customer.phone
+            customer.newsletter_opt_in = row['newsletter_opt_in'] or customer.newsletter_opt_in
+            customer.reservation_count += row['reservation_count']
+        db.session.flush()
+        written[row['email']] = (customer.id, customer.reservation_count)
+    return written
+
+
+def _upsert(customers, count_reservations: bool):
+    now = datetime.now(UTC)
+    rows = {}
+    for email, name, phone, newsletter_opt_in in customers:
+        reservation_count = int(count_reservations)
+        previous = rows.get(email)
+        if previous:
+            name = name or previous['name']
+            phone = phone or previous['phone']
+            newsletter_opt_in = newsletter_opt_in or previous['newsletter_opt_in']
+            reservation_count += previous['reservation_count']
+        rows[email] = _row(email, name, phone, bool(newsletter_opt_in), now, reservation_count)
+    rows = list(rows.values())
+    if not rows:
+        return {}
+
+    dialect_name = db.session.get_bind().dialect.name
+    if dialect_name not in UPSERT_DIALECTS:
+        return _fallback_upsert(rows)
+    statement = _upsert_statement(dialect_name)
+    written = {}
+    for start in range(0, len(rows), BATCH_SIZE):
+        for email, customer_id, reservation_count in db.session.execute(statement, rows[start:start + BATCH_SIZE]):
+            written[email] = (customer_id, reservation_count)
+    return written
+
+
+def upsert_customers(customers):
+    """
+    Creates or updates customers from (email, name, phone, newsletter_opt_in) tuples, in the
+    current transaction.
+
+    Emails must already be normalized. A None name or phone keeps the stored value, and
+    newsletter_opt_in=False leaves an existing opt-in in place. When an email appears more than
+    once, its values are merged in order.
+
+    Returns:
+        dict: {email: customer id}.
+    """
+    return {email: customer_id for email, (customer_id, _) in _upsert(customers, False).items()}
+
+
+def upsert_booking_customers(customers):
+    """
+    Same as upsert_customers, for customers who are booking: every tuple counts one reservation.
+
+    Returns:
+        dict: {email: (customer id, reservation count including these bookings)}.
+    """
+    return _upsert(customers, True)
+
+
+def upsert_customer(email: str, name: str | None = None, phone: str | None = None, newsletter_opt_in: bool = False):
+    """
+    Creates or updates one customer in the current transaction and returns its id.
+
+    Same rules as upsert_customers. Nothing is sent to the database if this request already
+    wrote the same values for the email.
+    """
+    cache = _identity_cache()
+    cached = cache.get(email)
+    if cached is not None:
+        customer_id, written = cached
+        if (name in (None, written['name']) and phone in (None, written['phone'])
+                and (not newsletter_opt_in or written['newsletter_opt_in'])):
+            return customer_id
+
+    customer_id = upsert_customers([(email, name, phone, newsletter_opt_in)])[email]
+    _remember(cache, email, customer_id, name, phone, newsletter_opt_in)
+    return customer_id
+
+
+def upsert_customer_statement(dialect_name: str, email: str, name: str | None = None, phone: str | None = None,
+                              newsletter_opt_in: bool = False):
+    """
+    Returns the upsert statement for ``dialect_name`` and the parameters that write one customer,
+    for connections outside the session (the async engine of asgi.py). Same rules as upsert_customers.
+
+    Raises:
+        KeyError: The dialect has no ON CONFLICT support.
+    """
+    return _upsert_statement(dialect_name), _row(email, name, phone, newsletter_opt_in, datetime.now(UTC))
+
+def upsert_booking_customer(email: str, name: str | None = None, phone: str | None = None):
+    """
+    Creates or updates the customer making one booking, in the current transaction.
+
+    Returns:
+        tuple: (customer id, reservation count including this booking).
+    """
+    customer_id, reservation_count = upsert_booking_customers([(email, name, phone, False)])[email]
+    _remember(_identity_cache(), email, customer_id, name, phone, False)
+    return customer_id, reservation_count
+
+
+def _remember(cache, email, customer_id, name, phone, newsletter_opt_in):
+    cached = cache.get(email)
+    if cached is not None:
+        written = cached[1]
+        name = name or written['name']
+        phone = phone or written['phone']
+        newsletter_opt_in = newsletter_opt_in or written['newsletter_opt_in']
+    cache[email] = (customer_id, {'name': name, 'phone': phone, 'newsletter_opt_in': newsletter_opt_in})
+
@@ -0,0 +1,143 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from .extensions import db
+
+# This file tunes the database engine from the app config.
+# engine_options() turns the DB_POOL_* settings into SQLALCHEMY_ENGINE_OPTIONS for the configured
+# database, and configure_engine() sets SQLite's pragmas on every new connection: WAL journaling,
+# so readers no longer wait behind a writer, synchronous=NORMAL (durable at checkpoints, the usual
+# pairing with WAL), a busy timeout instead of immediate "database is locked" errors, and
+# memory-mapped reads. Servers that fork workers from a preloaded app call dispose_after_fork()
+# in each worker, so no two processes ever share a pooled connection.
+# make_async_engine() builds the asyncio engine of the ASGI mode (asgi.py) for the same database,
+# with the same pool settings and pragmas, through an async driver.
+
+# Tables whose unique keys concurrent bookings race for; a violation there means another booking won.
+CONTENDED_TABLES = ('slot_occupancy', 'reservations')
+
+# PostgreSQL SQLSTATEs of transactions that lost to a concurrent one: serialization_failure,
+# deadlock_detected and lock_not_available.
+CONTENTION_SQLSTATES = {'40001', '40P01', '55P03'}
+
+# Async driver used for each backend when ASYNC_DATABASE_URI is not set.
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'psycopg_async'}
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config):
+    """
+    Returns the SQLALCHEMY_ENGINE_OPTIONS for ``config``: pool settings for server databases and
+    file SQLite, none for in-memory SQLite (one shared connection).
+
+    Options already in config['SQLALCHEMY_ENGINE_OPTIONS'] take precedence.
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {}
+    if not _is_memory_sqlite(url):
+        options.update(
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+            pool_recycle=config['DB_POOL_RECYCLE'],
+            pool_pre_ping=config['DB_POOL_PRE_PING'],
+        )
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def sqlite_pragmas(config):
+    """Returns the PRAGMA statements run on every new SQLite connection."""
+    return [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+
+
+def configure_engine(engine, config):
+    """Registers the SQLite pragmas of ``config`` on ``engine``; other databases are left as they are."""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def dispose_after_fork(app):
+    """
+    Drops the pooled connections a forked worker inherited, leaving them open for the parent.
+
+    The worker's engine then opens its own connections on first use.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def is_contention(error):
+    """
+    Returns True if ``error`` means the transaction lost a race with a concurrent one and can be
+    retried: a unique violation on a CONTENDED_TABLES key, a locked SQLite database, or a
+    PostgreSQL serialization, deadlock or lock timeout failure. Anything else (a lost connection,
+    a NOT NULL violation, ...) is a real error.
+    """
+    orig = getattr(error, 'orig', None)
+    sqlstate = getattr(orig, 'sqlstate', None)
+    if sqlstate is not None:
+        if isinstance(error, IntegrityError):
+            table = getattr(getattr(orig, 'diag', None), 'table_name', None)
+            return sqlstate == '23505' and table in CONTENDED_TABLES
+        return sqlstate in CONTENTION_SQLSTATES
+    message = str(orig if orig is not None else error)
+    if isinstance(error, IntegrityError):
+        # SQLite: "UNIQUE constraint failed: slot_occupancy.time_slot, ..."
+        return message.startswith('UNIQUE constraint failed') and any(
+            f' {table}.' in message for table in CONTENDED_TABLES
+        )
+    if isinstance(error, OperationalError):
+        return 'database is locked' in message or 'database table is locked' in message
+    return False
+
+
+def async_database_url(config):
+    """
+    Returns the URL of the async engine: ASYNC_DATABASE_URI if set (e.g. postgresql+asyncpg://...),
+    otherwise SQLALCHEMY_DATABASE_URI with the backend's driver from ASYNC_DRIVERS.
+
+    Raises:
+        ValueError: No async driver is known for the database.
+    """
+    if config.get('ASYNC_DATABASE_URI'):
+        return make_url(config['ASYNC_DATABASE_URI'])
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver for {backend}; set ASYNC_DATABASE_URI')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def make_async_engine(config):
+    """
+    Creates the AsyncEngine for ``config``, with the pool options of engine_options() and the
+    SQLite pragmas of configure_engine().
+
+    Requires SQLAlchemy's asyncio extra and the async driver (requirements-asgi.txt).
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(async_database_url(config), **engine_options(config))
+    configure_engine(engine.sync_engine, config)
+    return engine
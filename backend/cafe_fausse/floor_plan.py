@@ -0,0 +1,98 @@
+from bisect import bisect_left
+from functools import lru_cache
+
+from flask import current_app
+
+# This file describes the dining room and picks tables for parties.
+# The floor plan lists the seat count of every table. Tables are grouped into buckets by seat
+# count, each bucket stored as a bitmask over table numbers, so the allocator finds the smallest
+# free table that fits a party with a binary search over the distinct sizes and a few bit
+# operations against the slot's free-table mask, without scanning tables one by one.
+
+# Table numbers map to bits of the signed 64-bit free-table masks stored in slot_occupancy.
+MAX_TABLES = 63
+
+
+class FloorPlan:
+    """
+    The tables of the restaurant and their seat counts.
+
+    Table ``n`` seats ``seats[n - 1]`` guests and maps to bit ``n - 1`` of occupancy masks.
+    """
+
+    def __init__(self, seats):
+        if not seats or any(count < 1 for count in seats):
+            raise ValueError('A floor plan needs at least one table and every table at least one seat.')
+        if len(seats) > MAX_TABLES:
+            raise ValueError(f'A floor plan has at most {MAX_TABLES} tables, got {len(seats)}.')
+        self.seats = tuple(seats)
+        self.capacities = sorted(set(self.seats))
+        self.bucket_masks = [0] * len(self.capacities)
+        for index, count in enumerate(self.seats):
+            self.bucket_masks[bisect_left(self.capacities, count)] |= 1 << index
+
+    @property
+    def total_tables(self):
+        return len(self.seats)
+
+    @property
+    def total_seats(self):
+        return sum(self.seats)
+
+    @property
+    def largest_table(self):
+        return self.capacities[-1]
+
+    def best_fit(self, free_mask: int, party_size: int):
+        """
+        Returns the number of the smallest free table seating ``party_size`` guests, preferring
+        the lowest table number among equally sized tables, or None if no free table fits.
+        """
+        for bucket_mask in self.bucket_masks[bisect_left(self.capacities, party_size):]:
+            candidates = free_mask & bucket_mask
+            if candidates:
+                return (candidates & -candidates).bit_length()
+        return None
+
+
+def parse_floor_plan(spec: str):
+    """
+    Parses a floor plan specification such as ``"2x8,4x14,6x6,8x2"`` (eight 2-seat tables,
+    fourteen 4-seat tables, ...) into a list of seat counts in table-number order. A bare number
+    stands for a single table with that many seats.
+
+    Raises:
+        ValueError: The specification is not a list of "<seats>x<tables>" parts.
+    """
+    seats = []
+    # A bare number in FLASK_FLOOR_PLAN arrives as an int from the JSON-parsed environment.
+    for part in str(spec).split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        size, _, count = part.partition('x')
+        try:
+            seats.extend([int(size)] * (int(count) if count else 1))
+        except ValueError:
+            raise ValueError(f'Invalid floor plan {spec!r}; expected e.g. "2x8,4x14,6x6,8x2".') from None
+    return seats
+
+
+@lru_cache(maxsize=8)
+def _build_floor_plan(spec: str | None, total_tables: int, default_seats: int):
+    if spec:
+        return FloorPlan(parse_floor_plan(spec))
+    return FloorPlan([default_seats] * total_tables)
+
+
+def current_floor_plan():
+    """
+    Returns the FloorPlan configured for the current app.
+
+    FLOOR_PLAN takes precedence; without it the room has TOTAL_TABLES tables of
+    DEFAULT_TABLE_SEATS seats each.
+    """
+    config = current_app.config
+    return _build_floor_plan(
+        config.get('FLOOR_PLAN'), config.get('TOTAL_TABLES', 30), config.get('DEFAULT_TABLE_SEATS', 10)
+    )
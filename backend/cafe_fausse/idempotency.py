@@ -0,0 +1,243 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import UTC, datetime, timedelta
+from functools import wraps
+from typing import NamedTuple
+
+from flask import Response, current_app, jsonify, make_response, request
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from .extensions import db
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# This file adds Idempotency-Key support to endpoints that create records.
+# The first request with a key inserts a pending idempotency_keys row, runs, and stores its
+# response on the row once it succeeds. Repeats of a completed request are answered from a
+# per-app in-memory LRU, or from the table when another worker handled the first request, without
+# running the endpoint again. A duplicate that arrives while the first request is still running
+# waits for it to finish, and gets a 409 while the first one may still be running. Failed
+# requests release their key so the client can retry with it. A pending row is only taken over
+# once it is older than IDEMPOTENCY_LEASE_SECONDS, far longer than any request runs, and a request
+# only stores or releases the row it inserted itself (same created_at), so a request that outlived
+# its lease can never overwrite the outcome of the one that took the key over.
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# How often a waiting duplicate re-reads the pending row, in seconds.
+POLL_INTERVAL = 0.05
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    status_code: int | None
+    body: str | None
+
+
+class IdempotencyCache:
+    """A thread-safe LRU of completed responses whose entries expire after a TTL."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value: StoredResponse, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def _cache():
+    return current_app.extensions.setdefault(
+        'idempotency', IdempotencyCache(current_app.config['IDEMPOTENCY_CACHE_SIZE'])
+    )
+
+
+def _now():
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def _fingerprint():
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _claim(key: str, fingerprint: str):
+    """
+    Inserts the pending row for ``key``.
+
+    Returns:
+        datetime | None: The row's created_at, which identifies this claim, or None if another
+        request holds the key.
+    """
+    ttl = current_app.config['IDEMPOTENCY_TTL']
+    lease = current_app.config['IDEMPOTENCY_LEASE_SECONDS']
+    for _ in range(2):
+        claimed_at = _now()
+        try:
+            db.session.add(IdempotencyKey(key=key, fingerprint=fingerprint, created_at=claimed_at))
+            db.session.commit()
+            return claimed_at
+        except IntegrityError:
+            db.session.rollback()
+        # Expired rows, and pending rows whose request died without releasing them, are dropped
+        # and the claim is tried once more.
+        now = _now()
+        result = db.session.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.key == key,
+                (IdempotencyKey.created_at < now - timedelta(seconds=ttl))
+                | (IdempotencyKey.status_code.is_(None) & (IdempotencyKey.created_at < now - timedelta(seconds=lease))),
+            )
+        )
+        db.session.commit()
+        if result.rowcount == 0:
+            return None
+    return None
+
+
+def _owned(key: str, claimed_at):
+    return (
+        (IdempotencyKey.key == key)
+        & IdempotencyKey.status_code.is_(None)
+        & (IdempotencyKey.created_at == claimed_at)
+    )
+
+
+def _store(key: str, claimed_at, stored: StoredResponse):
+    """
+    Stores the response on the row claimed at ``claimed_at`` and commits.
+
+    Returns False, changing nothing, if the row is no longer this request's claim.
+    """
+    result = db.session.execute(
+        update(IdempotencyKey)
+        .where(_owned(key, claimed_at))
+        .values(status_code=stored.status_code, response_body=stored.body)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _load(key: str):
+    row = db.session.execute(
+        select(IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.response_body)
+        .where(IdempotencyKey.key == key)
+    ).first()
+    # End the read so the next poll sees rows committed in the meantime.
+    db.session.rollback()
+    return StoredResponse(*row) if row else None
+
+
+def _acquire(key: str, fingerprint: str):
+    """
+    Claims ``key`` or waits for the request holding it.
+
+    Returns:
+        tuple: (claim time, None) once claimed; (None, StoredResponse) when the key belongs to a
+        completed or different request; (None, None) if the holder did not finish in time.
+    """
+    deadline = time.monotonic() + current_app.config['IDEMPOTENCY_WAIT_SECONDS']
+    while True:
+        claimed_at = _claim(key, fingerprint)
+        if claimed_at is not None:
+            return claimed_at, None
+        stored = _load(key)
+        if stored is not None and (stored.status_code is not None or stored.fingerprint != fingerprint):
+            return None, stored
+        if time.monotonic() >= deadline:
+            return None, None
+        if stored is not None:
+            time.sleep(POLL_INTERVAL)
+
+
+def _release(key: str, claimed_at):
+    db.session.rollback()
+    db.session.execute(delete(IdempotencyKey).where(_owned(key, claimed_at)))
+    db.session.commit()
+
+
+def _replay(stored: StoredResponse):
+    return Response(
+        stored.body, status=stored.status_code, mimetype='application/json', headers={'Idempotent-Replayed': 'true'}
+    )
+
+
+def idempotent(view):
+    """
+    Makes a JSON endpoint honour the Idempotency-Key request header.
+
+    Requests without the header run as usual. A repeat of a request that succeeded gets the
+    original response back with an 'Idempotent-Replayed: true' header; reusing a key for a
+    different body is a 422, and a duplicate still waiting after IDEMPOTENCY_WAIT_SECONDS is a 409.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if not 1 <= len(key) <= MAX_KEY_LENGTH:
+            return jsonify({'message': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters long.'}), 400
+
+        fingerprint = _fingerprint()
+        cache = _cache()
+        ttl = current_app.config['IDEMPOTENCY_TTL']
+        stored = cache.get(key)
+        claimed_at = None
+        if stored is None:
+            claimed_at, stored = _acquire(key, fingerprint)
+
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                return jsonify({'message': f'This {HEADER} was already used for a different request.'}), 422
+            cache.set(key, stored, ttl)
+            return _replay(stored)
+        if claimed_at is None:
+            return jsonify({'message': f'A request with this {HEADER} is still in progress.'}), 409
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            _release(key, claimed_at)
+            raise
+
+        if not 200 <= response.status_code < 300:
+            _release(key, claimed_at)
+            return response
+
+        stored = StoredResponse(fingerprint, response.status_code, response.get_data(as_text=True))
+        if _store(key, claimed_at, stored):
+            cache.set(key, stored, ttl)
+        else:
+            logger.warning('%s %s outlived its lease; its response was not stored', HEADER, key)
+        return response
+    return wrapper
+
+
+def prune_expired():
+    """Deletes the rows of keys older than IDEMPOTENCY_TTL and returns how many were removed."""
+    cutoff = _now() - timedelta(seconds=current_app.config['IDEMPOTENCY_TTL'])
+    result = db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff))
+    db.session.commit()
+    return result.rowcount
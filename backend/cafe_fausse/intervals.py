@@ -0,0 +1,91 @@
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import select
+
+from .extensions import db
+from .models import Reservation
+
+# This file answers "which tables are taken between two times" for reservations with a duration.
+# A reservation [time_slot, end_time) overlaps [start, end) when time_slot < end and
+# end_time > start. overlapping() turns that into an indexed range query; the start is also
+# bounded below by LONGEST_RESERVATION_MINUTES so the scan stays within a day of rows. That bound
+# is a fixed cap rather than RESERVATION_MAX_DURATION_MINUTES: lowering the setting must not hide
+# longer bookings made before, so the setting only ever applies up to the cap (max_duration()).
+# TableIntervals loads the result once and answers many overlap checks from memory, which is how
+# per-day questions (availability of every slot, bulk imports) avoid one query per slot.
+
+
+# No reservation holds a table longer than this, whatever RESERVATION_MAX_DURATION_MINUTES says.
+LONGEST_RESERVATION_MINUTES = 24 * 60
+
+
+def max_duration():
+    """Returns the longest duration, in minutes, that a new reservation may ask for."""
+    return min(current_app.config['RESERVATION_MAX_DURATION_MINUTES'], LONGEST_RESERVATION_MINUTES)
+
+
+def overlapping(start, end):
+    """Returns a select of (table_number, time_slot, end_time) for reservations overlapping [start, end)."""
+    longest = timedelta(minutes=LONGEST_RESERVATION_MINUTES)
+    return (
+        select(Reservation.table_number, Reservation.time_slot, Reservation.end_time)
+        .where(
+            Reservation.time_slot > start - longest,
+            Reservation.time_slot < end,
+            Reservation.end_time > start,
+        )
+    )
+
+
+class TableIntervals:
+    """
+    The booked intervals of every table, kept as sorted start and end lists per table.
+
+    Bookings of one table never overlap, so both lists are sorted and an overlap check is one
+    binary search per table.
+    """
+
+    def __init__(self, total_tables: int):
+        self.total_tables = total_tables
+        self._starts = [[] for _ in range(total_tables)]
+        self._ends = [[] for _ in range(total_tables)]
+
+    def add(self, table_number: int, start, end):
+        """Records a booking of ``table_number``; tables outside the floor plan are ignored."""
+        if not 1 <= table_number <= self.total_tables:
+            return
+        insort(self._starts[table_number - 1], start)
+        insort(self._ends[table_number - 1], end)
+
+    def is_free(self, table_number: int, start, end):
+        """Returns True if ``table_number`` has no booking overlapping [start, end)."""
+        starts = self._starts[table_number - 1]
+        # Bookings starting before ``end`` are starts[:index]; only the latest can still be running.
+        index = bisect_left(starts, end)
+        return index == 0 or self._ends[table_number - 1][index - 1] <= start
+
+    def busy_mask(self, start, end):
+        """Returns the bitmask of tables with a booking overlapping [start, end)."""
+        mask = 0
+        for index in range(self.total_tables):
+            if not self.is_free(index + 1, start, end):
+                mask |= 1 << index
+        return mask
+
+    def starts(self, start, end):
+        """Returns the distinct booking start times in [start, end)."""
+        return {
+            value
+            for starts in self._starts
+            for value in starts[bisect_left(starts, start):bisect_left(starts, end)]
+        }
+
+
+def load_intervals(start, end, total_tables: int):
+    """Loads the bookings overlapping [start, end) with one range query."""
+    intervals = TableIntervals(total_tables)
+    for table_number, time_slot, end_time in db.session.execute(overlapping(start, end)):
+        intervals.add(table_number, time_slot, end_time)
+    return intervals
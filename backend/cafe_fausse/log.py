@@ -0,0 +1,218 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+
+from flask import g, has_app_context, request
+
+# This file sets up the application's logging.
+# Records from every logger go to one QueueHandler on the root logger, which only puts them on an
+# in-memory queue; a listener thread formats them and writes them in batches to stderr (or
+# LOG_FILE), so a slow terminal or disk never blocks a request. Records are stamped with the id of the
+# request that logged them (the client's X-Request-ID header, or a new one), which is echoed in
+# the response, and every request ends with one "request" record carrying method, path, status
+# and duration. LOG_LEVEL sets the level and LOG_FORMAT picks "text" or "json" lines.
+# The listener thread does not survive fork(); servers that fork workers call after_fork() in
+# each worker.
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+MAX_REQUEST_ID_LENGTH = 128
+
+# How long the listener waits after a record arrives to collect more before writing them.
+BATCH_LINGER = 0.01
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+_STANDARD_ATTRIBUTES = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'request_id'}
+
+_handler = None
+_outputs = ()
+_listener = None
+
+logger = logging.getLogger('cafe_fausse.requests')
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request id ('-' outside requests)."""
+
+    def filter(self, record):
+        # The id lives on g, so the app context is enough (the ASGI handlers have no request context).
+        record.request_id = g.get('request_id', '-') if has_app_context() else '-'
+        return True
+
+
+class StderrHandler(logging.StreamHandler):
+    """StreamHandler writing to sys.stderr as it is at the time of each record, even if replaced."""
+
+    def __init__(self):
+        super().__init__(sys.stderr)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler for a listener in the same process.
+
+    The stock handler formats every record on the calling thread to make it picklable; here only
+    the message is merged with its arguments, and all formatting is left to the listener thread.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that writes records in batches.
+
+    Waking the listener thread for every record makes it compete with request threads for the
+    GIL once per record; lingering briefly after the first record lets it write every record
+    queued in the meantime in one go.
+    """
+
+    def _monitor(self):
+        while True:
+            records = [self.queue.get()]
+            time.sleep(BATCH_LINGER)
+            try:
+                while True:
+                    records.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            for record in records:
+                if record is self._sentinel:
+                    return
+                self.handle(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including the fields passed through ``extra``."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+        }
+        entry.update(
+            (key, value) for key, value in record.__dict__.items() if key not in _STANDARD_ATTRIBUTES
+        )
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _output_handler(config):
+    path = config.get('LOG_FILE')
+    # WatchedFileHandler reopens the file after logrotate moves it.
+    handler = logging.handlers.WatchedFileHandler(path) if path else StderrHandler()
+    if config['LOG_FORMAT'] == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+def start_listener():
+    """Starts the thread writing queued records."""
+    global _listener
+    if _handler is None:
+        return
+    stop_listener()
+    _listener = BatchingQueueListener(_handler.queue, *_outputs, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_listener():
+    """Writes the records still queued and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        # The thread of a listener started before a fork does not exist in the child.
+        if _listener._thread is not None and _listener._thread.is_alive():
+            _listener.stop()
+        _listener = None
+
+
+def after_fork():
+    """Gives a forked worker its own queue and listener thread; the parent's thread is not copied."""
+    global _listener
+    if _handler is None:
+        return
+    _listener = None
+    _handler.queue = queue.SimpleQueue()
+    start_listener()
+
+
+def configure_logging(app):
+    """
+    Routes all logging through the queue configured from ``app.config`` and adds the request id
+    and request records to ``app``.
+
+    Logging is process-wide, so the last app configured decides the level and output.
+    """
+    global _handler, _outputs
+    root = logging.getLogger()
+    if _handler is not None:
+        stop_listener()
+        root.removeHandler(_handler)
+
+    _handler = LocalQueueHandler(queue.SimpleQueue())
+    _handler.addFilter(RequestIdFilter())
+    _outputs = (_output_handler(app.config),)
+    root.addHandler(_handler)
+    root.setLevel(app.config['LOG_LEVEL'].upper())
+    start_listener()
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def new_request_id(header_value: str | None):
+    """Returns the client's X-Request-ID value if it is usable, otherwise a new random id."""
+    if header_value and len(header_value) <= MAX_REQUEST_ID_LENGTH:
+        return header_value
+    # Not a uuid4: os.urandom is a system call per request, and the id needs no secrecy.
+    return f'{random.getrandbits(128):032x}'
+
+
+def log_request(method: str, path: str, status: int, started: float):
+    """Writes the "request" record of a request that started at perf_counter() ``started``."""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info('%s %s %s', method, path, status, extra={
+            'method': method,
+            'path': path,
+            'status': status,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        })
+
+
+def _start_request():
+    g.request_id = new_request_id(request.headers.get(REQUEST_ID_HEADER))
+    g.request_started = time.perf_counter()
+
+
+def _finish_request(response):
+    if 'request_id' not in g:
+        return response
+    response.headers[REQUEST_ID_HEADER] = g.request_id
+    log_request(request.method, request.path, response.status_code, g.request_started)
+    return response
+
+
+atexit.register(stop_listener)
@@ -0,0 +1,90 @@
+import json
+import smtplib
+import threading
+from email.message import EmailMessage
+from importlib import import_module
+
+# This file turns outbox messages into emails and delivers them.
+# A sender is any callable taking (recipient, subject, body). OUTBOX_SENDER picks one: "file"
+# appends each email to OUTBOX_FILE as a JSON line (local development and tests), "smtp" sends
+# through OUTBOX_SMTP_HOST:OUTBOX_SMTP_PORT (e.g. `python -m aiosmtpd -n -l localhost:1025`
+# locally), and "package.module:name" loads a custom sender factory taking the app config.
+
+
+def _reservation_confirmation(payload):
+    return (
+        'Your Café Fausse reservation',
+        f"Dear {payload['name']},\n\n"
+        f"your table for {payload['guests']} is booked for {payload['timeSlot']}"
+        f" (table {payload['tableNumber']}).\n\nWe look forward to welcoming you.\nCafé Fausse\n",
+    )
+
+
+def _newsletter_welcome(payload):
+    return (
+        'Welcome to the Café Fausse newsletter',
+        f"Hello {payload.get('name') or 'there'},\n\n"
+        'you are subscribed to the Café Fausse newsletter. Expect news about seasonal menus and events.\n'
+        'Café Fausse\n',
+    )
+
+
+TEMPLATES = {
+    'reservation_confirmation': _reservation_confirmation,
+    'newsletter_welcome': _newsletter_welcome,
+}
+
+
+def render(kind: str, payload: dict):
+    """Returns the (subject, body) of an outbox message of ``kind``."""
+    return TEMPLATES[kind](payload)
+
+
+class FileSender:
+    """Appends every email to a file as one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, recipient: str, subject: str, body: str):
+        line = json.dumps({'to': recipient, 'subject': subject, 'body': body}, ensure_ascii=False)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+class SmtpSender:
+    """Sends every email through an SMTP server, opening one connection per email."""
+
+    def __init__(self, host: str, port: int, sender: str, timeout: float = 10):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.timeout = timeout
+
+    def __call__(self, recipient: str, subject: str, body: str):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = recipient
+        message['Subject'] = subject
+        message.set_content(body)
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            smtp.send_message(message)
+
+
+def make_sender(config):
+    """
+    Builds the sender named by OUTBOX_SENDER.
+
+    Raises:
+        ValueError: OUTBOX_SENDER is neither a built-in sender nor a "module:name" path.
+    """
+    name = config['OUTBOX_SENDER']
+    if name == 'file':
+        return FileSender(config['OUTBOX_FILE'])
+    if name == 'smtp':
+        return SmtpSender(config['OUTBOX_SMTP_HOST'], config['OUTBOX_SMTP_PORT'], config['OUTBOX_FROM'])
+    if ':' in name:
+        module, attribute = name.split(':', 1)
+        return getattr(import_module(module), attribute)(config)
+    raise ValueError(f'Unknown OUTBOX_SENDER {name!r}.')
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import threading
+from typing import NamedTuple
+
+# This file defines the in-process cache used by the menu endpoint.
+# The cache keeps the serialized menu bytes and a content hash (used as the ETag) per file path,
+# and only re-reads the file when its mtime, size or inode changes, or when it is invalidated
+# explicitly after a write through /api/menuchange.
+
+
+class MenuEntry(NamedTuple):
+    """A cached, ready-to-send copy of a menu file."""
+
+    signature: tuple
+    body: bytes
+    etag: str
+
+
+def file_signature(path: str):
+    """
+    Returns a (mtime_ns, size, inode) tuple identifying the current version of a file,
+    or None if the file does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat_signature(stat)
+
+
+def stat_signature(stat):
+    """Returns the signature of a file from its ``os.stat`` result."""
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+class MenuCache:
+    """
+    Caches the serialized contents of menu files keyed by path.
+
+    Each lookup costs one ``os.stat`` and a dict lookup. The file is only read, parsed and
+    re-serialized when its signature differs from the cached one.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str):
+        """
+        Returns the cached MenuEntry for ``path``, rebuilding it if the file changed.
+        Returns None if the file does not exist.
+        """
+        signature = file_signature(path)
+        if signature is None:
+            self._entries.pop(path, None)
+            return None
+
+        entry = self.cached(path, signature)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            # Another thread may have rebuilt the entry while we waited for the lock.
+            entry = self.cached(path, signature)
+            if entry is not None:
+                return entry
+            with open(path, 'rb') as f:
+                return self.store(path, signature, f.read())
+
+    def cached(self, path: str, signature: tuple):
+        """Returns the entry for ``path`` if it was built from the file version ``signature``, else None."""
+        entry = self._entries.get(path)
+        if entry is not None and entry.signature == signature:
+            return entry
+        return None
+
+    def store(self, path: str, signature: tuple, raw: bytes):
+        """
+        Builds and caches the entry for ``path`` from its raw contents, read at ``signature``.
+
+        Used by callers that read the file themselves, such as the async menu handler.
+        """
+        entry = self._build(raw, signature)
+        self._entries[path] = entry
+        return entry
+
+    def invalidate(self, path: str | None = None):
+        """Drops the cached entry for ``path``, or every entry if no path is given."""
+        if path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(path, None)
+
+    @staticmethod
+    def _build(raw: bytes, signature: tuple):
+        menu_data = json.loads(raw.decode('utf-8'))
+        body = json.dumps(menu_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        etag = hashlib.sha256(body).hexdigest()
+        return MenuEntry(signature=signature, body=body, etag=etag)
+
+
+menu_cache = MenuCache()
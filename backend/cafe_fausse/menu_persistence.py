@@ -0,0 +1,80 @@
+import contextlib
+import json
+import os
+import stat
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# This file defines how the menu file is written to disk.
+# Writers serialize on an inter-process lock file next to the menu, and every write goes to a
+# temporary file that is fsynced and then atomically renamed over the menu. Readers therefore
+# always see either the previous or the new menu, never a truncated one.
+
+
+@contextlib.contextmanager
+def file_lock(path: str):
+    """
+    Holds an exclusive inter-process lock on ``<path>.lock`` for the duration of the block.
+
+    Uses ``fcntl.flock`` on POSIX systems and ``msvcrt.locking`` on Windows, so every worker
+    process on the host is serialized, not only the threads of this one.
+    """
+    with open(f'{path}.lock', 'a+b') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        else:
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ~10 seconds; keep waiting.
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write_json(path: str, data):
+    """
+    Writes ``data`` as JSON to ``path`` atomically.
+
+    The JSON is written to a temporary file in the same directory, flushed and fsynced, then
+    renamed over ``path`` with ``os.replace``. The caller is expected to hold ``file_lock(path)``.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.menu-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            with contextlib.suppress(FileNotFoundError):
+                # mkstemp creates the file as 0600; keep the permissions of the menu being replaced.
+                os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+
+    # Persist the rename itself; directories cannot be opened this way on Windows.
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
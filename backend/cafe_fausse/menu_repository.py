@@ -0,0 +1,203 @@
+from datetime import UTC, datetime
+
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.orm import selectinload
+
+from .extensions import db
+from .menu_store import name_key
+from .models import MenuItem, MenuSection
+
+# This file defines the database-backed menu used when MENU_SOURCE is set to "database".
+# Reads are served by indexed queries on menu_items, filtered by section and paginated with a
+# keyset cursor over (section position, section_id, item position, id), which is menu order. Edits are single-row UPDATEs matched on the
+# case-folded item name instead of whole-file rewrites.
+
+# Item fields that can be changed through the menu update endpoints.
+EDITABLE_FIELDS = ('description', 'price', 'image')
+
+MAX_PAGE_SIZE = 100
+
+
+def _item_dict(item):
+    return {
+        'name': item.name,
+        'description': item.description,
+        'price': item.price,
+        'image': item.image,
+    }
+
+
+def encode_cursor(section_position: int, section_id: int, position: int, item_id: int):
+    """Returns the opaque cursor pointing just after the given item."""
+    return f'{section_position}.{section_id}.{position}.{item_id}'
+
+
+def decode_cursor(raw_value: str):
+    """
+    Parses a cursor produced by encode_cursor into a (section position, section_id, position, id) tuple.
+
+    Raises:
+        ValueError: The cursor is malformed.
+    """
+    parts = tuple(int(part) for part in raw_value.split('.'))
+    if len(parts) != 4:
+        raise ValueError(raw_value)
+    return parts
+
+
+def menu_sections():
+    """Returns the whole menu in the same shape as menu.json."""
+    sections = db.session.scalars(
+        select(MenuSection)
+        .options(selectinload(MenuSection.items))
+        .order_by(MenuSection.position, MenuSection.id)
+    ).all()
+    return [
+        {
+            'title': section.title,
+            'description': section.description,
+            'items': [_item_dict(item) for item in section.items],
+        }
+        for section in sections
+    ]
+
+
+def menu_page(section: str | None = None, limit: int = MAX_PAGE_SIZE, cursor: tuple | None = None):
+    """
+    Returns one page of menu items in menu order and the cursor of the next page.
+
+    Args:
+        section (str | None): Section title to filter on (case-insensitive).
+        limit (int): Maximum number of items to return.
+        cursor (tuple | None): Decoded cursor of the previous page.
+
+    Returns:
+        tuple: (list of item dicts, next cursor string or None). An unknown section yields an
+        empty page.
+    """
+    query = (
+        select(
+            MenuItem.id, MenuItem.section_id, MenuItem.position, MenuItem.name,
+            MenuItem.description, MenuItem.price, MenuItem.image, MenuSection.title,
+            MenuSection.position.label('section_position'),
+        )
+        .join(MenuSection, MenuSection.id == MenuItem.section_id)
+    )
+
+    if section:
+        # Sections are few; resolving the id first keeps the item query on the composite index.
+        section_id = db.session.scalar(
+            select(MenuSection.id).where(func.lower(MenuSection.title) == section.strip().lower())
+        )
+        if section_id is None:
+            return [], None
+        query = query.where(MenuItem.section_id == section_id)
+
+    # Sections are listed by their position, like menu_sections(); section_id breaks ties.
+    key = (MenuSection.position, MenuItem.section_id, MenuItem.position, MenuItem.id)
+    if cursor:
+        query = query.where(tuple_(*key) > tuple_(*cursor))
+
+    rows = db.session.execute(query.order_by(*key).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.section_position, last.section_id, last.position, last.id)
+
+    items = [
+        {
+            'section': row.title,
+            'name': row.name,
+            'description': row.description,
+            'price': row.price,
+            'image': row.image,
+        }
+        for row in rows
+    ]
+    return items, next_cursor
+
+
+def apply_patches(patches: list):
+    """
+    Applies a list of item patches with one UPDATE per item and a single commit.
+
+    Each patch is a dict holding the item ``name`` and the fields to update; only
+    EDITABLE_FIELDS are written. Returns one result dict per patch, in order, with a ``status``
+    of 200, 400 or 404, like MenuStore.apply_patches.
+    """
+    results = []
+    try:
+        for patch in patches:
+            name = patch.get('name') if isinstance(patch, dict) else None
+            if not isinstance(name, str) or not name.strip():
+                results.append({'name': name, 'status': 400, 'error': 'Missing item name'})
+                continue
+
+            values = {field: patch[field] for field in EDITABLE_FIELDS if field in patch}
+            if values.get('price') is not None:
+                values['price'] = str(values['price'])
+            returning = (MenuItem.name, MenuItem.description, MenuItem.price, MenuItem.image)
+            if values:
+                row = db.session.execute(
+                    update(MenuItem)
+                    .where(MenuItem.name_key == name_key(name))
+                    .values(**values, updated_at=datetime.now(UTC))
+                    .returning(*returning)
+                ).first()
+            else:
+                row = db.session.execute(select(*returning).where(MenuItem.name_key == name_key(name))).first()
+
+            if row is None:
+                results.append({'name': name, 'status': 404, 'error': f"Item '{name}' not found"})
+            else:
+                results.append({'name': name, 'status': 200, 'item': _item_dict(row)})
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return results
+
+
+def import_menu(sections: list):
+    """
+    Loads menu sections in the menu.json format into the database.
+
+    Sections are matched by title and items by case-folded name, so running the import again
+    updates the existing rows instead of duplicating them.
+
+    Returns:
+        tuple: (number of sections, number of items) imported.
+    """
+    existing_sections = {section.title: section for section in db.session.scalars(select(MenuSection))}
+    existing_items = {item.name_key: item for item in db.session.scalars(select(MenuItem))}
+    item_count = 0
+
+    for section_position, section_data in enumerate(sections):
+        section = existing_sections.get(section_data['title'])
+        if section is None:
+            section = MenuSection(title=section_data['title'])
+            db.session.add(section)
+        section.description = section_data.get('description')
+        section.position = section_position
+
+        for item_position, item_data in enumerate(section_data.get('items', [])):
+            key = name_key(item_data['name'])
+            item = existing_items.get(key)
+            if item is None:
+                item = MenuItem(name_key=key)
+                db.session.add(item)
+                existing_items[key] = item
+            item.section = section
+            item.name = item_data['name']
+            item.description = item_data.get('description')
+            price = item_data.get('price')
+            item.price = None if price is None else str(price)
+            item.image = item_data.get('image')
+            item.position = item_position
+            item_count += 1
+
+    db.session.commit()
+    return len(sections), item_count
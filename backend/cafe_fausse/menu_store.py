@@ -0,0 +1,169 @@
+import json
+import threading
+import time
+
+from .menu_cache import file_signature, menu_cache
+from .menu_persistence import atomic_write_json, file_lock
+
+# This file defines the in-process menu store used by the menu update endpoints.
+# The store keeps the parsed menu in memory together with an index from the case-folded item
+# name to its (section, item) pair, so a lookup no longer scans every section. Patches are
+# applied in batches and the file is written once per batch, whatever the number of items.
+# Batches submitted close together are merged into a single locked, atomic rewrite.
+
+
+def name_key(name: str):
+    """Returns the key used to index a menu item name."""
+    return name.strip().casefold()
+
+
+class _MenuState:
+    """The parsed menu, its item index, and the file signature it was loaded from."""
+
+    def __init__(self, sections: list, signature: tuple | None):
+        self.sections = sections
+        self.signature = signature
+        self.index = {}
+        for section in sections:
+            for item in section.get('items', []):
+                self.index[name_key(item['name'])] = (section, item)
+
+
+class _PendingBatch:
+    """A list of patches waiting to be written, and the outcome once it has been."""
+
+    def __init__(self, patches: list):
+        self.patches = patches
+        self.results = None
+        self.error = None
+        self.done = False
+
+
+class MenuStore:
+    """
+    Holds the parsed contents of menu files keyed by path.
+
+    The state of a file is reloaded when its signature differs from the one last seen by the
+    store, so edits made outside the store (or by another process) are picked up.
+
+    Writes use group commit: the first caller for a path becomes the leader, waits
+    ``coalesce_window`` seconds for other batches to queue up, then applies every queued batch
+    under the inter-process file lock and rewrites the file once. Callers that arrive while a
+    write is in flight are picked up by the next one.
+    """
+
+    def __init__(self, coalesce_window: float = 0.005):
+        self.coalesce_window = coalesce_window
+        self._states = {}
+        self._lock = threading.RLock()
+        self._pending = {}
+        self._flushing = set()
+        self._flushed = threading.Condition()
+
+    def _state(self, path: str):
+        signature = file_signature(path)
+        if signature is None:
+            self._states.pop(path, None)
+            raise FileNotFoundError(path)
+
+        state = self._states.get(path)
+        if state is None or state.signature != signature:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = _MenuState(json.load(f), signature)
+            self._states[path] = state
+        return state
+
+    def apply_patches(self, path: str, patches: list):
+        """
+        Applies a list of item patches to the menu at ``path`` and persists the file once.
+
+        Each patch is a dict holding the item ``name`` and the fields to update. Returns one
+        result dict per patch, in order, with a ``status`` of 200, 400 or 404.
+
+        Raises:
+            FileNotFoundError: The menu file does not exist.
+            OSError: The updated menu could not be written.
+        """
+        batch = _PendingBatch(patches)
+        with self._flushed:
+            self._pending.setdefault(path, []).append(batch)
+            while not batch.done and path in self._flushing:
+                self._flushed.wait()
+            if not batch.done:
+                self._flushing.add(path)
+
+        if not batch.done:
+            self._flush(path)
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results
+
+    def _flush(self, path: str):
+        if self.coalesce_window:
+            time.sleep(self.coalesce_window)
+        with self._flushed:
+            batches = self._pending.pop(path, [])
+
+        try:
+            with self._lock, file_lock(path):
+                # Holding the file lock, the signature check also picks up other processes' writes.
+                state = self._state(path)
+                changed = False
+                for batch in batches:
+                    batch.results = self._apply(state, batch.patches)
+                    changed = changed or any(result['status'] == 200 for result in batch.results)
+                if changed:
+                    try:
+                        self._persist(path, state)
+                    finally:
+                        menu_cache.invalidate(path)
+        except Exception as e:
+            for batch in batches:
+                batch.error = e
+        finally:
+            with self._flushed:
+                for batch in batches:
+                    batch.done = True
+                self._flushing.discard(path)
+                self._flushed.notify_all()
+
+    @staticmethod
+    def _apply(state: _MenuState, patches: list):
+        results = []
+        for patch in patches:
+            name = patch.get('name') if isinstance(patch, dict) else None
+            if not isinstance(name, str) or not name.strip():
+                results.append({'name': name, 'status': 400, 'error': 'Missing item name'})
+                continue
+
+            match = state.index.get(name_key(name))
+            if match is None:
+                results.append({'name': name, 'status': 404, 'error': f"Item '{name}' not found"})
+                continue
+
+            # The patch name matches the item case-insensitively, so the index key is unchanged.
+            item = match[1]
+            item.update(patch)
+            results.append({'name': name, 'status': 200, 'item': dict(item)})
+        return results
+
+    def _persist(self, path: str, state: _MenuState):
+        try:
+            atomic_write_json(path, state.sections)
+        except Exception:
+            # The in-memory copy no longer matches the file; reload it on next use.
+            self._states.pop(path, None)
+            raise
+        state.signature = file_signature(path)
+
+    def invalidate(self, path: str | None = None):
+        """Drops the loaded state for ``path``, or for every file if no path is given."""
+        with self._lock:
+            if path is None:
+                self._states.clear()
+            else:
+                self._states.pop(path, None)
+
+
+menu_store = MenuStore()
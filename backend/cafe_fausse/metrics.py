@@ -0,0 +1,109 @@
+import os
+import time
+
+from flask import current_app, g, has_app_context, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+# This file defines the application's Prometheus metrics.
+# API requests are timed by before/after-request hooks on the api blueprint (routes/metrics.py) and
+# counted per route template, method and status; route templates rather than paths keep the number
+# of series bounded. Listeners on the engine time every SQL statement and add it to the running
+# request's query count and database time, which are recorded per route when the request ends.
+# When PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py sets it), every worker process writes its
+# values to memory-mapped files in that directory and /api/metrics adds up the files of all
+# workers, so any worker answers for the whole server. The variable must be set before the
+# process imports prometheus_client.
+
+MULTIPROC_DIR_VARIABLE = 'PROMETHEUS_MULTIPROC_DIR'
+
+REQUEST_DURATION = Histogram(
+    'cafe_fausse_http_request_duration_seconds', 'Time spent handling API requests.', ['method', 'route'],
+)
+REQUESTS = Counter(
+    'cafe_fausse_http_requests', 'API requests handled, by response status.', ['method', 'route', 'status'],
+)
+REQUEST_QUERIES = Histogram(
+    'cafe_fausse_db_queries_per_request', 'SQL statements run while handling an API request.', ['route'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, float('inf')),
+)
+REQUEST_DB_TIME = Histogram(
+    'cafe_fausse_db_time_per_request_seconds', 'Time spent in SQL statements while handling an API request.',
+    ['route'],
+)
+QUERY_DURATION = Histogram(
+    'cafe_fausse_db_query_duration_seconds', 'Time taken by SQL statements, in and outside requests.',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, float('inf')),
+)
+
+
+def instrument_engine(engine):
+    """Times every statement run on ``engine``, adding it to the current request's totals."""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _start_query(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _finish_query(connection, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - connection.info['query_started'].pop()
+        QUERY_DURATION.observe(elapsed)
+        if has_app_context() and 'db_queries' in g:
+            g.db_queries += 1
+            g.db_seconds += elapsed
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+
+
+def start_request():
+    """Before-request hook: starts the request's timer and database totals."""
+    if not current_app.config['METRICS_ENABLED'] or request.endpoint == 'api.get_metrics':
+        return
+    g.metrics_started = time.perf_counter()
+    reset_request_totals()
+
+
+def reset_request_totals():
+    """Starts counting the statements of the current request (on g) from zero."""
+    g.db_queries = 0
+    g.db_seconds = 0.0
+
+
+def finish_request(response):
+    """After-request hook: records the request's latency, status and database totals."""
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    record_request(request.method, _route(), response.status_code, started)
+    return response
+
+
+def record_request(method: str, route: str, status: int, started: float):
+    """
+    Records a request that started at perf_counter() ``started`` and ends now, with the database
+    totals collected on g since start_request (also used by the async handlers of asgi.py).
+    """
+    REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - started)
+    REQUESTS.labels(method, route, str(status)).inc()
+    # Popped: statements run later (e.g. by a streamed body) are not attributed to the request.
+    REQUEST_QUERIES.labels(route).observe(g.pop('db_queries'))
+    REQUEST_DB_TIME.labels(route).observe(g.pop('db_seconds'))
+
+
+def exposition():
+    """
+    Returns the current metrics in the Prometheus text format, summed over all worker processes
+    in multi-process mode.
+
+    Returns:
+        tuple: (body bytes, content type).
+    """
+    if os.environ.get(MULTIPROC_DIR_VARIABLE):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
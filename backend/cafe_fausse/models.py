@@ -20,9 +20,12 @@ class Customer(db.Model):
   email = db.Column(db.String(255), unique=True, nullable=False)
   phone = db.Column(db.String(40), nullable=True)
   newsletter_opt_in = db.Column(db.Boolean, default=False)
+  # Reservations made so far, maintained by the customer upsert; more than one means a repeat guest.
+  reservation_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
   created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+  # Indexed for incremental subscriber exports, which select rows updated after a watermark.
   updated_at = db.Column(
-    db.DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC)
+    db.DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC), index=True
   )
 
   reservations = db.relationship('Reservation', back_populates='customer', cascade='all, delete-orphan')
@@ -36,21 +39,26 @@ class Reservation(db.Model):
   Represents a table reservation in the cafe.
 
   Each reservation is linked to a customer and includes information
-  about the reservation time, party size, and assigned table.
+  about the reservation time, party size, and assigned table. The table
+  is held from ``time_slot`` until ``end_time``.
 
   Relationships:
     - customer: The customer who created the reservation.
   Constraints:
     - Unique together: (time_slot, table_number) ensures a table can't be double-booked at the same time.
+  Indexes:
+    - (table_number, time_slot) serves overlap range queries on a table's bookings.
   """
   __tablename__ = 'reservations'
   __table_args__ = (
     db.UniqueConstraint('time_slot', 'table_number', name='unique_table_slot'),
+    db.Index('ix_reservations_table_start', 'table_number', 'time_slot'),
   )
 
   id = db.Column(db.Integer, primary_key=True)
   customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
   time_slot = db.Column(db.DateTime, nullable=False)
+  end_time = db.Column(db.DateTime, nullable=False)
   party_size = db.Column(db.Integer, nullable=False)
   table_number = db.Column(db.Integer, nullable=False)
   created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
@@ -60,3 +68,174 @@ class Reservation(db.Model):
   def __repr__(self):
     return f'<Reservation {self.id} table {self.table_number}>'
 
+
+
+class MenuSection(db.Model):
+  """
+  Represents a section of the menu (e.g. Starters, Main Courses).
+
+  Sections are listed in ascending ``position`` order, which follows their order in the
+  original menu.json.
+
+  Relationships:
+    - items: The menu items in this section, ordered by position.
+  """
+  __tablename__ = 'menu_sections'
+
+  id = db.Column(db.Integer, primary_key=True)
+  title = db.Column(db.String(120), unique=True, nullable=False)
+  description = db.Column(db.Text, nullable=True)
+  position = db.Column(db.Integer, nullable=False, default=0)
+
+  items = db.relationship(
+    'MenuItem', back_populates='section', cascade='all, delete-orphan', order_by='MenuItem.position'
+  )
+
+  def __repr__(self):
+    return f'<MenuSection {self.title}>'
+
+
+class MenuItem(db.Model):
+  """
+  Represents a dish or drink listed in a menu section.
+
+  Items are looked up by ``name_key``, the case-folded name, so updates by name are a single
+  indexed UPDATE.
+
+  Relationships:
+    - section: The menu section the item belongs to.
+  Indexes:
+    - (section_id, position, id) serves section filters and keyset pagination within a section.
+  """
+  __tablename__ = 'menu_items'
+  __table_args__ = (
+    db.Index('ix_menu_items_section_position', 'section_id', 'position', 'id'),
+  )
+
+  id = db.Column(db.Integer, primary_key=True)
+  section_id = db.Column(db.Integer, db.ForeignKey('menu_sections.id'), nullable=False)
+  name = db.Column(db.String(150), nullable=False)
+  name_key = db.Column(db.String(150), unique=True, nullable=False)
+  description = db.Column(db.Text, nullable=True)
+  price = db.Column(db.String(40), nullable=True)
+  image = db.Column(db.String(500), nullable=True)
+  position = db.Column(db.Integer, nullable=False, default=0)
+  updated_at = db.Column(
+    db.DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC)
+  )
+
+  section = db.relationship('MenuSection', back_populates='items')
+
+  def __repr__(self):
+    return f'<MenuItem {self.name}>'
+
+
+class SlotOccupancy(db.Model):
+  """
+  Tracks which tables are free during one cell of the reservation slot grid.
+
+  ``time_slot`` is the start of a RESERVATION_SLOT_MINUTES long cell. Bit ``n - 1`` of
+  ``free_mask`` is set while table ``n`` has no booking overlapping the cell, and ``remaining``
+  holds the number of set bits. A booking locks and updates the rows of every cell it overlaps in
+  the same transaction as the Reservation insert, so overlapping bookings are serialized.
+  BigInteger storage limits the bitmask to 63 tables.
+  """
+  __tablename__ = 'slot_occupancy'
+
+  time_slot = db.Column(db.DateTime, primary_key=True)
+  remaining = db.Column(db.Integer, nullable=False)
+  free_mask = db.Column(db.BigInteger, nullable=False)
+
+  def __repr__(self):
+    return f'<SlotOccupancy {self.time_slot} remaining {self.remaining}>'
+
+
+class IdempotencyKey(db.Model):
+  """
+  Remembers the outcome of a request sent with an Idempotency-Key header.
+
+  A row is inserted, without a status, when the first request with the key starts; its insert is
+  what makes concurrent duplicates wait. Once the request succeeds the response status and body
+  are stored, and repeats of the request replay them instead of running it again.
+  ``fingerprint`` is a hash of the method, path and body, so a key cannot be reused for a
+  different request.
+  """
+  __tablename__ = 'idempotency_keys'
+
+  key = db.Column(db.String(255), primary_key=True)
+  fingerprint = db.Column(db.String(64), nullable=False)
+  status_code = db.Column(db.Integer, nullable=True)
+  response_body = db.Column(db.Text, nullable=True)
+  created_at = db.Column(db.DateTime, nullable=False, index=True)
+
+  def __repr__(self):
+    return f'<IdempotencyKey {self.key} status {self.status_code}>'
+
+
+class OutboxMessage(db.Model):
+  """
+  A side effect (e.g. an email) to perform after the transaction that requested it commits.
+
+  Messages are inserted in the same transaction as the change they are about, so they exist if
+  and only if that change was committed. The outbox worker delivers ``pending`` messages whose
+  ``available_at`` has passed, marking them ``sent``, or scheduling a retry with backoff until
+  OUTBOX_MAX_ATTEMPTS is reached and they become ``failed``.
+
+  Indexes:
+    - (status, available_at) serves the worker's query for due messages.
+  """
+  __tablename__ = 'outbox'
+  __table_args__ = (
+    db.Index('ix_outbox_status_available_at', 'status', 'available_at'),
+  )
+
+  id = db.Column(db.Integer, primary_key=True)
+  kind = db.Column(db.String(50), nullable=False)
+  recipient = db.Column(db.String(255), nullable=False)
+  payload = db.Column(db.Text, nullable=False)
+  status = db.Column(db.String(20), nullable=False, default='pending')
+  attempts = db.Column(db.Integer, nullable=False, default=0)
+  available_at = db.Column(db.DateTime, nullable=False)
+  last_error = db.Column(db.Text, nullable=True)
+  created_at = db.Column(db.DateTime, nullable=False)
+  sent_at = db.Column(db.DateTime, nullable=True)
+
+  def __repr__(self):
+    return f'<OutboxMessage {self.id} {self.kind} {self.status}>'
+
+
+class DailyStats(db.Model):
+  """
+  Reservation totals of one dining day, maintained incrementally for the admin dashboard.
+
+  Every committed reservation adds to the row of its day in the same transaction, so the
+  dashboard reads one row per day instead of aggregating the reservations table.
+  ``repeat_reservations`` counts reservations made by customers who had booked before.
+  """
+  __tablename__ = 'daily_stats'
+
+  day = db.Column(db.Date, primary_key=True)
+  reservations = db.Column(db.Integer, nullable=False, default=0)
+  covers = db.Column(db.Integer, nullable=False, default=0)
+  repeat_reservations = db.Column(db.Integer, nullable=False, default=0)
+
+  def __repr__(self):
+    return f'<DailyStats {self.day} reservations {self.reservations}>'
+
+
+class SlotStats(db.Model):
+  """
+  Reservation totals of one cell of the reservation slot grid, maintained incrementally.
+
+  ``reservations`` and ``covers`` count the bookings starting in the cell; ``tables_in_use``
+  counts the bookings overlapping it, which gives the cell's occupancy rate.
+  """
+  __tablename__ = 'slot_stats'
+
+  time_slot = db.Column(db.DateTime, primary_key=True)
+  reservations = db.Column(db.Integer, nullable=False, default=0)
+  covers = db.Column(db.Integer, nullable=False, default=0)
+  tables_in_use = db.Column(db.Integer, nullable=False, default=0)
+
+  def __repr__(self):
+    return f'<SlotStats {self.time_slot} tables in use {self.tables_in_use}>'
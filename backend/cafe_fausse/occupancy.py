@@ -0,0 +1,133 @@
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import insert, select, update
+
+from .extensions import db
+from .floor_plan import MAX_TABLES, FloorPlan
+from .intervals import load_intervals
+from .models import SlotOccupancy
+
+# This file manages the occupancy rows used to assign tables.
+# The day is cut into cells of RESERVATION_SLOT_MINUTES. Each slot_occupancy row holds the
+# free-table bitmask of one cell and a remaining count. A booking from start to end locks the
+# rows of every cell it overlaps, so two overlapping bookings always share at least one locked
+# row and are serialized. Which tables are actually free is answered by an indexed range query
+# over the overlapping reservations, and the floor plan's best-fit allocator picks among them.
+# Rows are created lazily the first time a cell is booked and written with a compare-and-set
+# UPDATE, so two concurrent bookings can never be handed the same table.
+
+
+class ClaimConflict(Exception):
+    """Raised when a cell row changed between reading and claiming; the caller should retry."""
+
+
+def full_mask(total_tables: int):
+    """Returns the bitmask with one bit set for each of tables 1..total_tables."""
+    if total_tables > MAX_TABLES:
+        raise ValueError(f'At most {MAX_TABLES} tables are supported, got {total_tables}.')
+    return (1 << total_tables) - 1
+
+
+def _cell_length():
+    return timedelta(minutes=current_app.config['RESERVATION_SLOT_MINUTES'])
+
+
+def slot_cells(start, end):
+    """Returns the start of every slot-grid cell overlapping [start, end), in order."""
+    step = _cell_length()
+    midnight = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    cell = midnight + (start - midnight) // step * step
+    cells = []
+    while cell < end:
+        cells.append(cell)
+        cell += step
+    return cells
+
+
+def lock_slots(time_slots):
+    """
+    Locks the occupancy rows of the given cells until the end of the transaction.
+
+    PostgreSQL takes row locks with SELECT ... FOR UPDATE, in time order so concurrent bookings
+    cannot deadlock. SQLite has no row locks, so a no-op UPDATE is issued first to take the
+    database write lock before the rows are read.
+
+    Returns:
+        dict: {time_slot: free_mask} for the cells that already have a row.
+    """
+    time_slots = sorted(time_slots)
+    if db.session.get_bind().dialect.name == 'sqlite':
+        db.session.execute(
+            update(SlotOccupancy)
+            .where(SlotOccupancy.time_slot.in_(time_slots))
+            .values(remaining=SlotOccupancy.remaining)
+        )
+    rows = db.session.execute(
+        select(SlotOccupancy.time_slot, SlotOccupancy.free_mask)
+        .where(SlotOccupancy.time_slot.in_(time_slots))
+        .order_by(SlotOccupancy.time_slot)
+        .with_for_update()
+    )
+    return {time_slot: free_mask for time_slot, free_mask in rows}
+
+
+def cell_masks(intervals, time_slots):
+    """Returns {time_slot: free_mask} of the given cells from a TableIntervals."""
+    step = _cell_length()
+    everything = full_mask(intervals.total_tables)
+    return {cell: everything & ~intervals.busy_mask(cell, cell + step) for cell in time_slots}
+
+
+def write_cells(masks, existing):
+    """Inserts or updates occupancy rows from {time_slot: free_mask}; ``existing`` are the locked rows."""
+    rows = [
+        {'time_slot': time_slot, 'free_mask': mask, 'remaining': mask.bit_count()}
+        for time_slot, mask in masks.items()
+    ]
+    new_rows = [row for row in rows if row['time_slot'] not in existing]
+    updated_rows = [row for row in rows if row['time_slot'] in existing]
+    if new_rows:
+        db.session.execute(insert(SlotOccupancy), new_rows)
+    if updated_rows:
+        db.session.execute(update(SlotOccupancy), updated_rows)
+
+
+def claim_table(start, end, floor_plan: FloorPlan, party_size: int):
+    """
+    Reserves the smallest table of ``floor_plan`` that seats ``party_size`` and is free from
+    ``start`` to ``end``.
+
+    Marks the table as taken on the occupancy rows of every cell the booking overlaps, in the
+    current transaction; the caller commits it together with the Reservation.
+
+    Returns:
+        int | None: The table number, or None if no free table fits the party.
+
+    Raises:
+        ClaimConflict: A cell row was changed by a concurrent booking.
+        sqlalchemy.exc.IntegrityError: A concurrent booking created a cell row first.
+    """
+    cells = slot_cells(start, end)
+    locked = lock_slots(cells)
+
+    # The range query runs after the cell locks are held, so it sees every committed booking
+    # that overlaps this one.
+    intervals = load_intervals(cells[0], cells[-1] + _cell_length(), floor_plan.total_tables)
+    free_mask = full_mask(floor_plan.total_tables) & ~intervals.busy_mask(start, end)
+    table_number = floor_plan.best_fit(free_mask, party_size)
+    if table_number is None:
+        return None
+    claimed_bit = 1 << (table_number - 1)
+
+    missing = cell_masks(intervals, [cell for cell in cells if cell not in locked])
+    write_cells({time_slot: mask & ~claimed_bit for time_slot, mask in missing.items()}, locked)
+    for time_slot, mask in locked.items():
+        result = db.session.execute(
+            update(SlotOccupancy)
+            .where(SlotOccupancy.time_slot == time_slot, SlotOccupancy.free_mask == mask)
+            .values(free_mask=mask & ~claimed_bit, remaining=(mask & ~claimed_bit).bit_count())
+        )
+        if result.rowcount != 1:
+            raise ClaimConflict(time_slot)
+    return table_number
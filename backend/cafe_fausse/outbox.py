@@ -0,0 +1,157 @@
+import json
+import random
+import threading
+import time
+from datetime import UTC, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from .extensions import db
+from .mail import render
+from .models import OutboxMessage
+
+# This file implements the transactional outbox.
+# Request handlers call enqueue() before committing, so a message row is written in the same
+# transaction as the reservation or signup it is about, and the request never waits on email I/O.
+# A separate worker process (`flask outbox-worker`) claims due messages in batches, delivers them
+# through the configured sender, and reschedules failures with exponential backoff and jitter.
+# Claiming pushes available_at forward by a lease instead of holding row locks during delivery,
+# so several workers can drain the table and a crashed worker's messages come back after the lease.
+# Outcomes are committed one message at a time, and a worker stops trying its batch halfway
+# through the lease, so a message is never sent by two workers because a slow batch outlived it.
+
+
+def _now():
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def enqueue(kind: str, recipient: str, payload: dict):
+    """Adds a message to the current transaction; it is delivered after the transaction commits."""
+    db.session.add(OutboxMessage(**message_row(kind, recipient, payload)))
+
+
+def message_row(kind: str, recipient: str, payload: dict):
+    """Returns the column values of a new pending message, for inserts outside the session."""
+    now = _now()
+    return {
+        'kind': kind,
+        'recipient': recipient,
+        'payload': json.dumps(payload),
+        'status': 'pending',
+        'attempts': 0,
+        'available_at': now,
+        'created_at': now,
+    }
+
+
+def retry_delay(attempts: int):
+    """Returns the wait before the next try of a message that failed ``attempts`` times."""
+    config = current_app.config
+    delay = min(config['OUTBOX_RETRY_MAX_SECONDS'], config['OUTBOX_RETRY_BASE_SECONDS'] * 2 ** (attempts - 1))
+    # Jitter keeps messages that failed together (e.g. an SMTP outage) from retrying together.
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def claim_batch(limit: int):
+    """
+    Claims up to ``limit`` due messages for delivery and commits the claim.
+
+    Returns:
+        list: Rows of (id, kind, recipient, payload, attempts) with attempts already counting this try.
+    """
+    now = _now()
+    due = (
+        select(OutboxMessage.id)
+        .where(OutboxMessage.status == 'pending', OutboxMessage.available_at <= now)
+        .order_by(OutboxMessage.available_at, OutboxMessage.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    rows = db.session.execute(
+        update(OutboxMessage)
+        .where(
+            OutboxMessage.id.in_(due.scalar_subquery()),
+            OutboxMessage.status == 'pending',
+            OutboxMessage.available_at <= now,
+        )
+        .values(
+            available_at=now + timedelta(seconds=current_app.config['OUTBOX_LEASE_SECONDS']),
+            attempts=OutboxMessage.attempts + 1,
+        )
+        .returning(
+            OutboxMessage.id, OutboxMessage.kind, OutboxMessage.recipient, OutboxMessage.payload,
+            OutboxMessage.attempts,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.session.commit()
+    return sorted(rows)
+
+
+def deliver_batch(sender, limit: int):
+    """
+    Claims and delivers one batch of due messages.
+
+    Each outcome is committed as soon as its message is sent or fails, so a worker that dies in the
+    middle of a batch never sends again what it already sent. Once half of the lease has gone by,
+    the messages not tried yet are given back instead of being sent after another worker may have
+    claimed them.
+
+    Returns:
+        dict: Counts of messages 'sent', 'retried' and 'failed' (out of attempts).
+    """
+    counts = {'sent': 0, 'retried': 0, 'failed': 0}
+    config = current_app.config
+    deadline = time.monotonic() + config['OUTBOX_LEASE_SECONDS'] / 2
+    batch = claim_batch(limit)
+    for index, (message_id, kind, recipient, payload, attempts) in enumerate(batch):
+        if time.monotonic() > deadline:
+            _release([row[0] for row in batch[index:]])
+            break
+        try:
+            sender(recipient, *render(kind, json.loads(payload)))
+        except Exception as error:
+            if attempts >= config['OUTBOX_MAX_ATTEMPTS']:
+                values = {'status': 'failed', 'last_error': repr(error)}
+                counts['failed'] += 1
+            else:
+                values = {'available_at': _now() + retry_delay(attempts), 'last_error': repr(error)}
+                counts['retried'] += 1
+        else:
+            values = {'status': 'sent', 'sent_at': _now()}
+            counts['sent'] += 1
+        db.session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id == message_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    return counts
+
+
+def _release(message_ids: list):
+    # Makes claimed but untried messages due again, without counting the claim as an attempt.
+    db.session.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(message_ids), OutboxMessage.status == 'pending')
+        .values(available_at=_now(), attempts=OutboxMessage.attempts - 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def run_worker(sender, batch_size: int, poll_interval: float, stop: threading.Event, on_batch=None):
+    """
+    Delivers messages until ``stop`` is set, sleeping ``poll_interval`` seconds when none are due.
+
+    ``on_batch`` is called with the counts of every non-empty batch.
+    """
+    while not stop.is_set():
+        counts = deliver_batch(sender, batch_size)
+        if any(counts.values()):
+            if on_batch:
+                on_batch(counts)
+        else:
+            stop.wait(poll_interval)
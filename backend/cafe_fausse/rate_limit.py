@@ -0,0 +1,201 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from functools import wraps
+from importlib import import_module
+
+from flask import current_app, jsonify, request
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# This file throttles endpoints per client with token buckets.
+# Every (endpoint, client IP) pair has a bucket holding up to N tokens that refills at N per
+# period ("N/minute"); a request takes one token or is answered 429 with a Retry-After header,
+# before the endpoint touches the database. RATE_LIMIT_STORAGE picks where buckets live: "memory"
+# keeps them in a dict of the process (one worker, development), "shared" keeps them in a
+# memory-mapped file guarded by a file lock, so all workers on the host draw from the same buckets,
+# and "package.module:factory" loads a custom backend taking the app config.
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+# Buckets kept by MemoryBackend before idle (full) buckets are dropped.
+MAX_MEMORY_BUCKETS = 100_000
+
+# Bucket slots in the shared file: 64-bit key hash, tokens, last refill time.
+SLOT = struct.Struct('<Qdd')
+SHARED_SLOTS = 65_536
+
+
+def parse_limit(value: str):
+    """
+    Parses a limit such as "20/minute".
+
+    Returns:
+        tuple: (capacity, tokens refilled per second).
+
+    Raises:
+        ValueError: The limit is not "<count>/<second|minute|hour>".
+    """
+    count, _, period = value.partition('/')
+    if period not in PERIODS or not count.isdigit() or int(count) < 1:
+        raise ValueError(f'Invalid rate limit {value!r}; expected e.g. "20/minute".')
+    return int(count), int(count) / PERIODS[period]
+
+
+def _take(tokens: float, updated: float, now: float, capacity: int, rate: float):
+    # Refills the bucket up to now and takes a token. Returns (tokens left, seconds to wait).
+    # A refill time after now (the clock went back) refills nothing rather than draining the bucket.
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryBackend:
+    """Token buckets in a dict of this process."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float):
+        """Takes a token from the bucket of ``key``. Returns 0 if allowed, else the seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens, wait = _take(tokens, updated, now, capacity, rate)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > MAX_MEMORY_BUCKETS:
+                self._prune(now, capacity, rate)
+        return wait
+
+    def _prune(self, now, capacity, rate):
+        # Buckets that have refilled completely behave exactly like missing ones.
+        for key, (tokens, updated) in list(self._buckets.items()):
+            if tokens + (now - updated) * rate >= capacity:
+                del self._buckets[key]
+
+
+def _lock_range(fd: int, offset: int, length: int):
+    # Exclusive lock on bytes [offset, offset + length) of the file, as in menu_persistence.
+    if fcntl is not None:
+        fcntl.lockf(fd, fcntl.LOCK_EX, length, offset)
+        return
+    os.lseek(fd, offset, os.SEEK_SET)
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, length)
+            return
+        except OSError:
+            # LK_LOCK gives up after ~10 seconds; keep waiting.
+            time.sleep(0.05)
+
+
+def _unlock_range(fd: int, offset: int, length: int):
+    if fcntl is not None:
+        fcntl.lockf(fd, fcntl.LOCK_UN, length, offset)
+        return
+    os.lseek(fd, offset, os.SEEK_SET)
+    msvcrt.locking(fd, msvcrt.LK_UNLCK, length)
+
+
+class SharedBackend:
+    """
+    Token buckets in a memory-mapped file shared by every process that opens it.
+
+    Keys are hashed to one of SHARED_SLOTS slots. A key landing on a slot held by another key
+    starts with a full bucket, so a collision can only make the limit more lenient. Refill times
+    are wall-clock (time.time()): the file outlives reboots, which restart the monotonic clock.
+    """
+
+    def __init__(self, path: str, slots: int = SHARED_SLOTS):
+        self.slots = slots
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o600)
+        size = slots * SLOT.size
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        # Byte-range file locks exclude other processes; the thread lock excludes threads of this
+        # one (and, on Windows, keeps the file position used by msvcrt.locking to one thread).
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float):
+        """Takes a token from the bucket of ``key``. Returns 0 if allowed, else the seconds to wait."""
+        digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+        offset = digest % self.slots * SLOT.size
+        now = time.time()
+        with self._lock:
+            _lock_range(self._fd, offset, SLOT.size)
+            try:
+                stored, tokens, updated = SLOT.unpack_from(self._map, offset)
+                if stored != digest:
+                    tokens, updated = capacity, now
+                tokens, wait = _take(tokens, updated, now, capacity, rate)
+                SLOT.pack_into(self._map, offset, digest, tokens, now)
+            finally:
+                _unlock_range(self._fd, offset, SLOT.size)
+        return wait
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+def make_backend(config):
+    """
+    Builds the backend named by RATE_LIMIT_STORAGE.
+
+    Raises:
+        ValueError: RATE_LIMIT_STORAGE is neither a built-in backend nor a "module:name" path.
+    """
+    name = config['RATE_LIMIT_STORAGE']
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'shared':
+        return SharedBackend(config['RATE_LIMIT_SHARED_FILE'])
+    if ':' in name:
+        module, attribute = name.split(':', 1)
+        return getattr(import_module(module), attribute)(config)
+    raise ValueError(f'Unknown RATE_LIMIT_STORAGE {name!r}.')
+
+
+def _limiter(setting: str):
+    # The backend and the parsed limits are built once per app.
+    state = current_app.extensions.get('rate_limit')
+    if state is None:
+        state = current_app.extensions['rate_limit'] = {'backend': make_backend(current_app.config), 'limits': {}}
+    limit = state['limits'].get(setting)
+    if limit is None:
+        limit = state['limits'][setting] = parse_limit(current_app.config[setting])
+    return state['backend'], limit
+
+
+def rate_limited(setting: str):
+    """
+    Limits an endpoint per client IP to the rate in the config value named ``setting``.
+
+    Requests over the limit get a 429 with a Retry-After header (whole seconds). Nothing is
+    limited while RATE_LIMIT_ENABLED is false.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config['RATE_LIMIT_ENABLED']:
+                return view(*args, **kwargs)
+            backend, (capacity, rate) = _limiter(setting)
+            wait = backend.take(f'{request.endpoint}|{request.remote_addr}', capacity, rate)
+            if wait:
+                response = jsonify({'message': 'Too many requests. Please try again later.'})
+                response.headers['Retry-After'] = str(math.ceil(wait))
+                return response, 429
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
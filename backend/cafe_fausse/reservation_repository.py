@@ -0,0 +1,91 @@
+from datetime import datetime
+
+from sqlalchemy import select, tuple_
+
+from .extensions import db
+from .models import Customer, Reservation
+
+# This file reads reservations back out for the admin listing.
+# Reservations are selected together with their customer in one joined query, ordered by
+# (time_slot, id). Pages continue from a keyset cursor on that pair instead of an OFFSET, and
+# whole ranges are streamed row by row with yield_per so memory stays flat however many
+# bookings the range holds.
+
+MAX_PAGE_SIZE = 100
+
+# Rows fetched from the database per round trip while streaming.
+STREAM_BATCH_SIZE = 1000
+
+
+def encode_cursor(time_slot: datetime, reservation_id: int):
+    """Returns the opaque cursor pointing just after the given reservation."""
+    return f'{time_slot.isoformat()},{reservation_id}'
+
+
+def decode_cursor(raw_value: str):
+    """
+    Parses a cursor produced by encode_cursor into a (time_slot, id) tuple.
+
+    Raises:
+        ValueError: The cursor is malformed.
+    """
+    time_slot, reservation_id = raw_value.rsplit(',', 1)
+    return datetime.fromisoformat(time_slot), int(reservation_id)
+
+
+def _range_query(start: datetime, end: datetime):
+    return (
+        select(
+            Reservation.id, Reservation.time_slot, Reservation.end_time, Reservation.party_size,
+            Reservation.table_number, Customer.name, Customer.email, Customer.phone,
+        )
+        .join(Reservation.customer)
+        .where(Reservation.time_slot >= start, Reservation.time_slot < end)
+        .order_by(Reservation.time_slot, Reservation.id)
+    )
+
+
+def _reservation_dict(row):
+    return {
+        'reservationId': row.id,
+        'timeSlot': row.time_slot.isoformat(),
+        'endTime': row.end_time.isoformat(),
+        'guests': row.party_size,
+        'tableNumber': row.table_number,
+        'name': row.name,
+        'email': row.email,
+        'phone': row.phone,
+    }
+
+
+def reservation_page(start: datetime, end: datetime, limit: int = MAX_PAGE_SIZE, cursor: tuple | None = None):
+    """
+    Returns one page of the reservations starting in [start, end) and the cursor of the next page.
+
+    Args:
+        start (datetime): Earliest time slot, inclusive.
+        end (datetime): Latest time slot, exclusive.
+        limit (int): Maximum number of reservations to return.
+        cursor (tuple | None): Decoded cursor of the previous page.
+
+    Returns:
+        tuple: (list of reservation dicts, next cursor string or None).
+    """
+    query = _range_query(start, end)
+    if cursor is not None:
+        query = query.where(tuple_(Reservation.time_slot, Reservation.id) > tuple_(*cursor))
+
+    # One extra row tells whether another page follows.
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].time_slot, rows[-1].id)
+    return [_reservation_dict(row) for row in rows], next_cursor
+
+
+def stream_reservations(start: datetime, end: datetime):
+    """Yields every reservation starting in [start, end) as a dict, fetching STREAM_BATCH_SIZE rows at a time."""
+    result = db.session.execute(_range_query(start, end).execution_options(yield_per=STREAM_BATCH_SIZE))
+    for row in result:
+        yield _reservation_dict(row)
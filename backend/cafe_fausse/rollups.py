@@ -0,0 +1,162 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import delete, func, insert, select, text, update
+
+from .customer_repository import UPSERT_DIALECTS
+from .extensions import db
+from .models import Customer, DailyStats, Reservation, SlotStats
+from .occupancy import slot_cells
+
+# This file maintains the reservation rollups behind the admin dashboard.
+# daily_stats holds reservations, covers and repeat-customer reservations per dining day, and
+# slot_stats holds bookings starting in and tables in use during each slot-grid cell. Bookings add
+# their counts with INSERT ... ON CONFLICT DO UPDATE SET n = n + excluded.n in the transaction that
+# inserts them, so the rollups commit or roll back together with the reservations and concurrent
+# bookings add up instead of overwriting each other. The dashboard reads only these tables, so its
+# cost depends on the range shown, not on how many reservations exist.
+# `flask backfill-rollups` rebuilds them (and the customers' reservation counts) from scratch. It
+# must be run once after the migration that adds them (0a6b5e2f9c31), which leaves them empty and
+# every existing customer's count at 0. It locks out bookings and signups while it runs, so a
+# booking committed during the rebuild is neither missed nor counted twice.
+
+# Reservations read per round trip by backfill.
+STREAM_BATCH_SIZE = 1000
+
+
+def _counts(bookings):
+    # Sums (time_slot, end_time, party_size, repeat) bookings into per-day and per-cell deltas.
+    days = defaultdict(lambda: [0, 0, 0])
+    cells = defaultdict(lambda: [0, 0, 0])
+    for time_slot, end_time, party_size, repeat in bookings:
+        day = days[time_slot.date()]
+        day[0] += 1
+        day[1] += party_size
+        day[2] += int(repeat)
+        covered = slot_cells(time_slot, end_time)
+        cells[covered[0]][0] += 1
+        cells[covered[0]][1] += party_size
+        for cell in covered:
+            cells[cell][2] += 1
+    return days, cells
+
+
+def _day_rows(days):
+    return [
+        {'day': day, 'reservations': reservations, 'covers': covers, 'repeat_reservations': repeat}
+        for day, (reservations, covers, repeat) in sorted(days.items())
+    ]
+
+
+def _cell_rows(cells):
+    return [
+        {'time_slot': cell, 'reservations': reservations, 'covers': covers, 'tables_in_use': tables}
+        for cell, (reservations, covers, tables) in sorted(cells.items())
+    ]
+
+
+def _add(model, key, rows):
+    counters = [column.name for column in model.__table__.columns if column.name != key]
+    dialect_name = db.session.get_bind().dialect.name
+    if dialect_name in UPSERT_DIALECTS:
+        statement = UPSERT_DIALECTS[dialect_name](model)
+        db.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[key],
+                set_={name: getattr(model, name) + statement.excluded[name] for name in counters},
+            ),
+            rows,
+        )
+        return
+    # Dialects without ON CONFLICT support: update, and insert where there was no row yet.
+    for row in rows:
+        updated = db.session.execute(
+            update(model)
+            .where(getattr(model, key) == row[key])
+            .values({name: getattr(model, name) + row[name] for name in counters})
+        ).rowcount
+        if not updated:
+            db.session.execute(insert(model), [row])
+
+
+def record(bookings):
+    """
+    Adds bookings to the rollups in the current transaction.
+
+    Args:
+        bookings: (time_slot, end_time, party_size, repeat) tuples, where ``repeat`` tells whether
+            the customer had booked before.
+    """
+    days, cells = _counts(bookings)
+    if days:
+        _add(DailyStats, 'day', _day_rows(days))
+        _add(SlotStats, 'time_slot', _cell_rows(cells))
+
+
+def _lock_bookings():
+    # PostgreSQL: SHARE ROW EXCLUSIVE blocks inserts and updates but not reads, and conflicts with
+    # itself so two backfills cannot run together. Tables are locked in the order bookings write
+    # them, so a booking already running finishes first instead of deadlocking. SQLite: the first
+    # write takes the database write lock, so the rollups are cleared before anything is read.
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(text('LOCK TABLE customers, reservations IN SHARE ROW EXCLUSIVE MODE'))
+    db.session.execute(delete(DailyStats))
+    db.session.execute(delete(SlotStats))
+
+
+def backfill():
+    """
+    Rebuilds the rollups and the customers' reservation counts from the reservations table and commits.
+
+    A reservation counts as a repeat when its customer has a reservation with a lower id. Writes to
+    customers and reservations wait until it commits; reads do not.
+
+    Returns:
+        int: The number of reservations counted.
+    """
+    _lock_bookings()
+    seen = set()
+
+    def bookings():
+        rows = db.session.execute(
+            select(Reservation.customer_id, Reservation.time_slot, Reservation.end_time, Reservation.party_size)
+            .order_by(Reservation.id)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        for customer_id, time_slot, end_time, party_size in rows:
+            yield time_slot, end_time, party_size, customer_id in seen
+            seen.add(customer_id)
+
+    days, cells = _counts(bookings())
+    if days:
+        db.session.execute(insert(DailyStats), _day_rows(days))
+        db.session.execute(insert(SlotStats), _cell_rows(cells))
+    reservation_count = (
+        select(func.count(Reservation.id))
+        .where(Reservation.customer_id == Customer.id)
+        .scalar_subquery()
+    )
+    db.session.execute(
+        update(Customer).values(reservation_count=reservation_count).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return sum(reservations for reservations, _, _ in days.values())
+
+
+def daily_stats(start: date, end: date):
+    """Returns the DailyStats rows of days from ``start`` to ``end`` inclusive, in order."""
+    return db.session.scalars(
+        select(DailyStats).where(DailyStats.day.between(start, end)).order_by(DailyStats.day)
+    ).all()
+
+
+def slot_stats(start: date, end: date):
+    """Returns the SlotStats rows of cells on days from ``start`` to ``end`` inclusive, in order."""
+    return db.session.scalars(
+        select(SlotStats)
+        .where(
+            SlotStats.time_slot >= datetime.combine(start, time()),
+            SlotStats.time_slot < datetime.combine(end + timedelta(days=1), time()),
+        )
+        .order_by(SlotStats.time_slot)
+    ).all()
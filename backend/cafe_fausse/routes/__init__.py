@@ -3,5 +3,5 @@ from flask import Blueprint
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
-from . import health, newsletter, reservations, admin, menu, menuchange  # noqa: E402,F401
+from . import health, newsletter, reservations, admin, menu, menuchange, availability, metrics  # noqa: E402,F401
 
@@ -1,20 +1,49 @@
-from flask import jsonify, request
+import hmac
+import io
+from datetime import date, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
 from . import api_bp
+from .. import rollups
+from ..bulk_import import import_reservations, read_rows
+from ..floor_plan import current_floor_plan
+from ..rate_limit import rate_limited
+
+IMPORT_FORMATS = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson'}
+
+# Longest range, in days, the stats endpoint returns at once.
+MAX_STATS_DAYS = 366
+
+
+# This decorator protects admin-only endpoints. Requests must carry the token returned by
+# admin_login (ADMIN_TOKEN) as an 'Authorization: Bearer <token>' header; otherwise a 401 is returned.
+
+def require_admin(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        expected = f"Bearer {current_app.config['ADMIN_TOKEN']}"
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode()):
+            return jsonify({'message': 'Admin authorization required.'}), 401
+        return view(*args, **kwargs)
+    return wrapper
 
 
 # This endpoint handles admin login requests. It expects a JSON payload with 'username' and 'password'.
-# Credentials are currently hardcoded for this project. On success, it returns a fake JWT token;
+# Credentials come from ADMIN_USERNAME and ADMIN_PASSWORD. On success, it returns the ADMIN_TOKEN;
 # otherwise, it returns an error message.
 
 @api_bp.post('/admin')
+@rate_limited('RATE_LIMIT_LOGIN')
 def admin_login():
     
     """
     Admin Login Endpoint
 
     Receives a JSON payload containing 'username' and 'password'. Checks the supplied credentials
-    against hardcoded admin values. If authentication is successful, returns a fake JWT token.
-    Otherwise, responds with an error message.
+    against ADMIN_USERNAME and ADMIN_PASSWORD. If authentication is successful, returns the
+    ADMIN_TOKEN. Otherwise, responds with an error message.
 
     **Request:**
 
@@ -29,9 +58,10 @@ def admin_login():
 
     **Responses:**
 
-    - 200: Login successful, returns a fake JWT token.
+    - 200: Login successful, returns the admin token.
     - 400: Missing username or password.
     - 401: Invalid credentials.
+    - 429: Too many attempts from this client (RATE_LIMIT_LOGIN); see the Retry-After header.
     """
     payload = request.get_json() or {}
     username = (payload.get('username') or '').strip()
@@ -40,12 +70,143 @@ def admin_login():
     if not username or not password:
         return jsonify({'message': 'Username and password are required.'}), 400
 
-    # Hardcoded credentials for now
-    if username == "admin" and password == "admin":
+    config = current_app.config
+    valid_username = hmac.compare_digest(username.encode(), config['ADMIN_USERNAME'].encode())
+    if hmac.compare_digest(password.encode(), config['ADMIN_PASSWORD'].encode()) and valid_username:
         return jsonify({
             'message': 'Login successful.',
-            'token': 'fake-jwt-token'
+            'token': config['ADMIN_TOKEN']
         }), 200
     else:
         return jsonify({'message': 'Invalid credentials.'}), 401
 
+
+# This endpoint imports reservations in bulk from a CSV or NDJSON upload (group events, partner
+# sheets). The body is streamed and written in chunked transactions, and every row gets a result
+# entry so partial failures can be fixed and re-submitted.
+
+@api_bp.post('/admin/reservations/import')
+@require_admin
+def import_reservations_endpoint():
+    """
+    Bulk Reservation Import Endpoint
+
+    Reads reservations from the request body, one per CSV row or NDJSON line, with the fields of
+    POST /api/reservations (datetime, guests, name, email, phone). Each row is assigned the
+    best-fitting free table of its slot. Rows that fail validation or find no free table are
+    reported and skipped; the other rows are committed.
+
+    **Request:**
+
+    POST /api/admin/reservations/import?format=csv|ndjson  
+    Authorization: Bearer <admin token>  
+    Content-Type: text/csv or application/x-ndjson  
+    Body:
+
+    datetime,guests,name,email,phone
+    2025-12-24T19:00:00,4,Jane Doe,jane@example.com,202-555-0100
+
+    The format is taken from the 'format' query parameter, or else from the Content-Type.
+
+    **Responses:**
+
+    - 200: Import finished; returns counts and per-row results.
+
+    {
+        "created": 1,
+        "failed": 0,
+        "results": [
+            {"row": 1, "status": "created", "reservationId": 12, "tableNumber": 3}
+        ]
+    }
+
+    - 400: Unknown or missing format.
+    - 401: Missing or invalid admin token.
+    """
+    fmt = request.args.get('format') or IMPORT_FORMATS.get(request.mimetype)
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'message': 'Format must be csv or ndjson.'}), 400
+
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+    results = list(import_reservations(read_rows(stream, fmt), current_floor_plan()))
+    created = sum(1 for result in results if result['status'] == 'created')
+    return jsonify({
+        'created': created,
+        'failed': len(results) - created,
+        'results': results,
+    }), 200
+
+
+
+# This endpoint serves the admin dashboard: covers per day, occupancy per slot and repeat-customer
+# counts. It reads only the rollup tables kept up to date by every booking, so its latency depends
+# on the range requested and not on the size of the reservation history.
+
+@api_bp.get('/admin/stats')
+@require_admin
+def reservation_stats():
+    """
+    Reservation Stats Endpoint
+
+    Returns daily totals and per-slot occupancy for the days from 'from' to 'to', both inclusive.
+    Days and slots without reservations are left out. The occupancy rate is the share of the
+    current floor plan's tables in use during the slot.
+
+    **Request:**
+
+    GET /api/admin/stats?from=2025-12-01&to=2025-12-31  
+    Authorization: Bearer <admin token>
+
+    'from' defaults to today and 'to' to 30 days after 'from'.
+
+    **Responses:**
+
+    - 200: Returns the stats of the range.
+
+    {
+        "from": "2025-12-01",
+        "to": "2025-12-31",
+        "days": [
+            {"date": "2025-12-24", "reservations": 12, "covers": 41, "repeatReservations": 5}
+        ],
+        "slots": [
+            {"timeSlot": "2025-12-24T19:00:00", "reservations": 4, "covers": 14,
+             "tablesInUse": 9, "occupancyRate": 0.3}
+        ]
+    }
+
+    - 400: Invalid dates, or a range longer than MAX_STATS_DAYS.
+    - 401: Missing or invalid admin token.
+    """
+    try:
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else date.today()
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else start + timedelta(days=30)
+    except ValueError:
+        return jsonify({'message': "'from' and 'to' must be dates in YYYY-MM-DD format."}), 400
+    if end < start or (end - start).days >= MAX_STATS_DAYS:
+        return jsonify({'message': f"'to' must be on or after 'from' and at most {MAX_STATS_DAYS} days in total."}), 400
+
+    total_tables = current_floor_plan().total_tables
+    return jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'days': [
+            {
+                'date': row.day.isoformat(),
+                'reservations': row.reservations,
+                'covers': row.covers,
+                'repeatReservations': row.repeat_reservations,
+            }
+            for row in rollups.daily_stats(start, end)
+        ],
+        'slots': [
+            {
+                'timeSlot': row.time_slot.isoformat(),
+                'reservations': row.reservations,
+                'covers': row.covers,
+                'tablesInUse': row.tables_in_use,
+                'occupancyRate': round(row.tables_in_use / total_tables, 3),
+            }
+            for row in rollups.slot_stats(start, end)
+        ],
+    }), 200
@@ -0,0 +1,34 @@
+from datetime import date
+from flask import jsonify, request
+from .. import availability
+from . import api_bp
+
+# This file defines the availability endpoint for the API.
+# It reports the remaining tables of every slot of a day, so clients can offer only open slots
+# instead of probing POST /reservations until one succeeds.
+
+@api_bp.get('/availability')
+def get_availability():
+  """
+  Day Availability Endpoint
+
+  Returns, for every reservation slot of the requested day, the number of tables that are free
+  for a reservation of the default length starting at that slot. The day's bookings are loaded
+  with one range query and the result is cached for a few seconds; a new booking for the day
+  clears the cache.
+
+  **Request:**
+
+  GET /availability?date=YYYY-MM-DD
+
+  **Responses:**
+
+  - 200: Returns {"date": "<date>", "slots": [{"timeSlot": "<ISO 8601>", "remaining": <int>}, ...]}.
+  - 400: Missing or invalid date.
+  """
+  try:
+    day = date.fromisoformat(request.args.get('date', ''))
+  except ValueError:
+    return jsonify({'message': 'A date in YYYY-MM-DD format is required.'}), 400
+
+  return jsonify({'date': day.isoformat(), 'slots': availability.day_availability(day)}), 200
@@ -1,38 +1,89 @@
 # menu.py
-from flask import Flask, jsonify, request
-import json
+from flask import current_app, jsonify, request
 import os
+from .. import menu_repository
+from ..menu_cache import menu_cache
 from . import api_bp
 
 
 # modify the local menu.json file
 # This endpoint returns the menu data from the local menu.json file.
+# The serialized menu is served from an in-process cache that is rebuilt only when the file changes,
+# and clients that send a matching If-None-Match header get a 304 without a body.
+# With MENU_SOURCE=database the menu is read from the menu tables instead, and the section/limit/cursor
+# query parameters return a single page of items through indexed keyset queries.
 @api_bp.get('/menu')
 def get_menu():
     """
     Retrieves the menu data from the local menu.json file.
     Menu Retrieval Endpoint
-    
+
     Returns the contents of the menu stored in 'data/menu.json' as a JSON response.
     If the file does not exist, responds with a 404 error message.
-    
+    The response carries an ETag derived from the menu contents.
+
+    When the app runs with MENU_SOURCE=database, the menu is read from the database and the
+    optional query parameters return a filtered, paginated list of items instead.
+
     **Request:**
-    
+
       GET /menu
-    
+      If-None-Match: "<etag>"   (optional)
+
+      GET /menu?section=<title>&limit=<n>&cursor=<nextCursor>   (MENU_SOURCE=database only)
+
     **Response:**
-    
+
       - 200: Successfully retrieved menu, returns the JSON contents of menu.json.
+        For a filtered request, returns {"items": [...], "nextCursor": "<cursor>" | null}.
+      - 304: The menu has not changed since the ETag sent in If-None-Match.
+      - 400: Invalid limit or cursor, or filtering requested while serving the menu from file.
       - 404: menu.json file not found.
 
     Returns:
         JSON response containing the menu data if found,
         otherwise a JSON error message with a 404 status code.
     """
+    filtered = any(param in request.args for param in ('section', 'limit', 'cursor'))
+
+    if current_app.config.get('MENU_SOURCE') == 'database':
+        if filtered:
+            return _get_menu_page()
+        response = jsonify(menu_repository.menu_sections())
+        response.add_etag()
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    if filtered:
+        return jsonify({'error': 'Menu filtering requires MENU_SOURCE=database'}), 400
+
     menu_path = os.path.join(os.getcwd(), 'data', 'menu.json')
-    if not os.path.exists(menu_path):
+    entry = menu_cache.get(menu_path)
+    if entry is None:
         return jsonify({'error': 'menu.json not found'}), 404
-    with open(menu_path, 'r', encoding='utf-8') as f:
-        menu_data = json.load(f)
-    return jsonify(menu_data), 200
-    
+
+    response = current_app.response_class(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def _get_menu_page():
+    try:
+        limit = int(request.args.get('limit', menu_repository.MAX_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if not 1 <= limit <= menu_repository.MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {menu_repository.MAX_PAGE_SIZE}'}), 400
+
+    cursor = None
+    if request.args.get('cursor'):
+        try:
+            cursor = menu_repository.decode_cursor(request.args['cursor'])
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    items, next_cursor = menu_repository.menu_page(
+        section=request.args.get('section'), limit=limit, cursor=cursor
+    )
+    return jsonify({'items': items, 'nextCursor': next_cursor}), 200
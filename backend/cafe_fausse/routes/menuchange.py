@@ -1,20 +1,23 @@
 # routes/menuchange.py
-import json
 import os
-from flask import request, jsonify
+from flask import current_app, request, jsonify
+from .. import menu_repository
+from ..menu_store import menu_store
 from . import api_bp
 
 
 # This endpoint handles POST requests to /menuchange and allows updating an existing menu item's details.
 # It expects a JSON payload containing at least the item's 'name' and fields to update
 # (e.g., "description", "price", "image"). If the item with the specified name exists in menu.json,
-# it updates its fields, saves the menu, and returns the updated item.
+# it updates its fields, saves the menu, drops the cached copy served by /api/menu and returns the updated item.
 # If the item is not found, it returns a 404 error.
-# The current implementation only unpdates menu prices 
+# The current implementation only unpdates menu prices
+# Items are looked up through the in-process menu store, which indexes items by case-folded name.
+# With MENU_SOURCE=database the update is a single-row UPDATE on menu_items instead.
 
 @api_bp.post("/menuchange")
 def change_menu_item():
-    
+
     """
     Menu Item Update Endpoint
 
@@ -24,8 +27,8 @@ def change_menu_item():
 
     **Request:**
 
-    POST /menuchange  
-    Content-Type: application/json  
+    POST /menuchange
+    Content-Type: application/json
     Body:
 
     {
@@ -40,35 +43,87 @@ def change_menu_item():
     - 404: menu.json or specified item not found.
     - 500: Unable to write changes to file.
     """
-    
+
+    use_database = current_app.config.get("MENU_SOURCE") == "database"
     menu_path = os.path.join(os.getcwd(), "data", "menu.json")
-    if not os.path.exists(menu_path):
+    if not use_database and not os.path.exists(menu_path):
         return jsonify({"error": "menu.json not found"}), 404
 
-    # Load current menu
-    with open(menu_path, "r", encoding="utf-8") as f:
-        menu_sections = json.load(f)
-
     data = request.get_json()
     if not data or "name" not in data:
         return jsonify({"error": "Missing item name"}), 400
 
-    target_name = data["name"]
+    try:
+        if use_database:
+            result = menu_repository.apply_patches([data])[0]
+        else:
+            result = menu_store.apply_patches(menu_path, [data])[0]
+    except FileNotFoundError:
+        return jsonify({"error": "menu.json not found"}), 404
+    except Exception as e:
+        return jsonify({"error": f"Failed to save changes: {str(e)}"}), 500
+
+    if result["status"] != 200:
+        return jsonify({"error": result["error"]}), result["status"]
+    return jsonify({"success": True, "item": result["item"]}), 200
+
 
-    # Search through sections/items
-    for section in menu_sections:
-        for item in section["items"]:
-            if item["name"].lower() == target_name.lower():
-                # Update fields with whatever is in the request JSON
-                item.update(data)
+# This endpoint handles POST requests to /menuchange/batch and applies many item updates in one call.
+# Every patch is applied against the in-process menu store and menu.json is rewritten once for the
+# whole batch (or, with MENU_SOURCE=database, the updates share one transaction).
+# The response lists the outcome of each patch in request order.
 
-                # Persist changes back to file
-                try:
-                    with open(menu_path, "w", encoding="utf-8") as f:
-                        json.dump(menu_sections, f, indent=2, ensure_ascii=False)
-                except Exception as e:
-                    return jsonify({"error": f"Failed to save changes: {str(e)}"}), 500
+@api_bp.post("/menuchange/batch")
+def change_menu_items():
 
-                return jsonify({"success": True, "item": item}), 200
+    """
+    Batch Menu Update Endpoint
+
+    Receives a list of item patches, each shaped like the body of POST /menuchange, applies all of
+    them and saves 'menu.json' once. Patches that fail (unknown item, missing name) do not prevent
+    the others from being applied.
+
+    **Request:**
+
+    POST /menuchange/batch
+    Content-Type: application/json
+    Body:
 
-    return jsonify({"error": f"Item '{target_name}' not found"}), 404
\ No newline at end of file
+    {
+        "items": [
+            {"name": "<item_name>", "price": <new_price>},
+            ...
+        ]
+    }
+
+    **Responses:**
+
+    - 200: Batch processed, returns one result per patch with its own "status" (200, 400 or 404).
+    - 400: Missing or empty "items" list.
+    - 404: menu.json not found.
+    - 500: Unable to write changes to file.
+    """
+
+    menu_path = os.path.join(os.getcwd(), "data", "menu.json")
+
+    data = request.get_json(silent=True) or {}
+    patches = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(patches, list) or not patches:
+        return jsonify({"error": "Missing items list"}), 400
+
+    try:
+        if current_app.config.get("MENU_SOURCE") == "database":
+            results = menu_repository.apply_patches(patches)
+        else:
+            results = menu_store.apply_patches(menu_path, patches)
+    except FileNotFoundError:
+        return jsonify({"error": "menu.json not found"}), 404
+    except Exception as e:
+        return jsonify({"error": f"Failed to save changes: {str(e)}"}), 500
+
+    updated = sum(1 for result in results if result["status"] == 200)
+    return jsonify({
+        "success": updated == len(results),
+        "updated": updated,
+        "results": results,
+    }), 200
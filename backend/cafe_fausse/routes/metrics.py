@@ -0,0 +1,34 @@
+from flask import current_app, jsonify
+from .. import metrics
+from . import api_bp
+
+# This file defines the metrics endpoint for the API and the hooks that measure every API request.
+# Latency, status and database time of each request are recorded by the before/after-request hooks
+# below and exposed, summed over all worker processes, for a Prometheus server to scrape.
+
+api_bp.before_request(metrics.start_request)
+api_bp.after_request(metrics.finish_request)
+
+
+@api_bp.get('/metrics')
+def get_metrics():
+  """
+  Metrics Endpoint
+
+  Returns the API's metrics in the Prometheus text exposition format: per-route request latency
+  histograms and status counters, SQL statements and database time per request, and the duration
+  of every SQL statement. Under gunicorn the values of all worker processes are added up.
+
+  **Request:**
+
+  GET /metrics
+
+  **Responses:**
+
+  - 200: The metrics, as text/plain; version=0.0.4.
+  - 404: Metrics are disabled (METRICS_ENABLED=false).
+  """
+  if not current_app.config['METRICS_ENABLED']:
+    return jsonify({'error': 'Metrics are disabled'}), 404
+  body, content_type = metrics.exposition()
+  return current_app.response_class(body, content_type=content_type)
@@ -1,12 +1,21 @@
+import logging
 import re
-from flask import jsonify, request
+from datetime import datetime
+from flask import Response, jsonify, request, stream_with_context
+from .. import subscriber_export
 from ..extensions import db
-from ..models import Customer
+from ..subscriptions import subscribe, subscribe_many
 from . import api_bp
+from .admin import require_admin
+
+logger = logging.getLogger(__name__)
 
 # Simple regex for email validation
 EMAIL_REGEX = r"^[^@]+@[^@]+\.[^@]+$"
 
+# Most addresses accepted by one bulk subscribe request.
+MAX_BULK_SUBSCRIBERS = 10000
+
 @api_bp.post('/newsletter')
 def subscribe_newsletter():
     """
@@ -32,7 +41,6 @@ def subscribe_newsletter():
     payload = request.get_json() or {}
     email = (payload.get('email') or '').strip().lower()
     name = (payload.get('name') or '').strip() or None
-    print(db.get_engine())
 
     # ✅ Validate email presence
     if not email:
@@ -42,27 +50,122 @@ def subscribe_newsletter():
     if not re.match(EMAIL_REGEX, email):
         return jsonify({'message': 'Invalid email format.'}), 422
 
+    # One INSERT ... ON CONFLICT (email) DO UPDATE creates the subscriber or opts the customer in.
     try:
-        customer = Customer.query.filter_by(email=email).first()
-        if not customer:
-            customer = Customer(email=email, name=name, newsletter_opt_in=True)
-            db.session.add(customer)
-        else:
-            customer.newsletter_opt_in = True
-            if name:
-                customer.name = name
-
-        db.session.commit()
-    except Exception as e:
+        subscribe(email, name)
+    except Exception:
         db.session.rollback()
-        print("\n--- DATABASE ERROR ---")
-        print("TYPE:", type(e))
-        print("ERROR:", str(e))
-        print("ORIG:", getattr(e, "orig", None))  # raw psycopg error
-        print("----------------------\n")
-        return jsonify({'message': 'Unable to subscribe right now.'}), 500    
+        # The traceback includes the driver's own error (e.g. psycopg) as the cause.
+        logger.exception('Newsletter signup failed')
+        return jsonify({'message': 'Unable to subscribe right now.'}), 500
     # except Exception:
     #     db.session.rollback()
     #     return jsonify({'message': 'Unable to subscribe right now.'}), 500
 
-    return jsonify({'message': 'You are subscribed to the Café Fausse newsletter.'}), 201
\ No newline at end of file
+    return jsonify({'message': 'You are subscribed to the Café Fausse newsletter.'}), 201
+
+
+# This endpoint subscribes a batch of addresses at once, e.g. from a campaign import (admin only).
+# Valid addresses are written with batched upsert statements in one transaction; invalid ones are
+# reported back and skipped.
+
+@api_bp.post('/newsletter/bulk')
+@require_admin
+def subscribe_newsletter_bulk():
+    """
+    Subscribes many addresses to the Café Fausse newsletter.
+
+    Request:
+        JSON payload:
+            POST /newsletter/bulk
+            Authorization: Bearer <admin token>
+            Content-Type: application/json
+
+            Example payload (entries are email strings or objects with an optional name):
+            {
+                "subscribers": ["jane@example.com", {"email": "john@example.com", "name": "John"}]
+            }
+
+    Response:
+        - 200: Returns {"subscribed": <distinct addresses subscribed>, "rejected": [{"index", "email", "message"}, ...]}.
+        - 400: Missing subscriber list, or more than MAX_BULK_SUBSCRIBERS entries.
+        - 401: Missing or invalid admin token.
+        - 500: Server/database error, nothing is subscribed.
+    """
+    payload = request.get_json(silent=True) or {}
+    entries = payload.get('subscribers')
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'message': 'A non-empty "subscribers" list is required.'}), 400
+    if len(entries) > MAX_BULK_SUBSCRIBERS:
+        return jsonify({'message': f'At most {MAX_BULK_SUBSCRIBERS} subscribers per request.'}), 400
+
+    subscribers = []
+    rejected = []
+    for index, entry in enumerate(entries):
+        if isinstance(entry, dict):
+            email, name = entry.get('email'), entry.get('name')
+        else:
+            email, name = entry, None
+        email = (email or '').strip().lower() if isinstance(email, str) else ''
+        name = (name or '').strip() or None if isinstance(name, str) else None
+        if not re.match(EMAIL_REGEX, email):
+            rejected.append({'index': index, 'email': email, 'message': 'Invalid email format.'})
+            continue
+        subscribers.append((email, name))
+
+    try:
+        subscribed = subscribe_many(subscribers) if subscribers else 0
+    except Exception:
+        logger.exception('Bulk newsletter signup failed')
+        db.session.rollback()
+        return jsonify({'message': 'Unable to subscribe right now.'}), 500
+
+    return jsonify({'subscribed': subscribed, 'rejected': rejected}), 200
+
+
+# This endpoint exports newsletter subscribers as CSV or NDJSON (admin only).
+# Rows are streamed from a server-side cursor, so the response never holds the whole list in memory.
+# Exports can be incremental: the X-Export-Watermark response header is the 'since' value of the next export.
+
+@api_bp.get('/newsletter/subscribers')
+@require_admin
+def export_newsletter_subscribers():
+    """
+    Streams the newsletter subscribers.
+
+    Request:
+        GET /newsletter/subscribers?format=csv|ndjson&since=<ISO 8601 date/time>
+        Authorization: Bearer <admin token>
+
+        'format' defaults to csv. With 'since', only subscribers updated after that time are
+        exported; pass the X-Export-Watermark header of the previous export to get what changed.
+        The watermark is EXPORT_WATERMARK_LAG_SECONDS before the export, so changes made within
+        that time only appear in the next export.
+
+    Response:
+        - 200: Streams "email,name,updated_at" CSV rows, or one
+          {"email", "name", "updated_at"} object per line, oldest update first.
+        - 400: Unknown format or invalid 'since'.
+        - 401: Missing or invalid admin token.
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in subscriber_export.FORMATS:
+        return jsonify({'message': 'Format must be csv or ndjson.'}), 400
+
+    since = None
+    if request.args.get('since'):
+        try:
+            since = datetime.fromisoformat(request.args['since']).replace(tzinfo=None)
+        except ValueError:
+            return jsonify({'message': 'since must be an ISO 8601 date/time.'}), 400
+
+    until = subscriber_export.new_watermark()
+    lines = subscriber_export.export_lines(fmt, until, since)
+    return Response(
+        stream_with_context(lines),
+        mimetype=subscriber_export.MIMETYPES[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename=subscribers.{fmt}',
+            'X-Export-Watermark': until.isoformat(),
+        },
+    )
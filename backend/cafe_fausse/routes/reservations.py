@@ -1,9 +1,18 @@
-from datetime import datetime
-import random
-from flask import current_app, jsonify, request
+import json
+import logging
+from datetime import datetime, timedelta
+from flask import Response, current_app, jsonify, request, stream_with_context
 from ..extensions import db
-from ..models import Customer, Reservation
+from ..booking import BookingContentionError, SlotFullError, book_reservation
+from ..floor_plan import current_floor_plan
+from ..idempotency import idempotent
+from ..intervals import max_duration
+from ..rate_limit import rate_limited
+from .. import reservation_repository
 from . import api_bp
+from .admin import require_admin
+
+logger = logging.getLogger(__name__)
 
 # Parses an ISO-format string value into a datetime object for a reservation time slot.
 # Returns a datetime object if successful, or None if the value is invalid or missing.
@@ -21,10 +30,15 @@ def parse_time_slot(raw_value: str):
 
 # This endpoint handles POST requests to /reservations and creates a new reservation.
 # It expects a JSON payload containing at least the reservation time, number of guests, name, email, and phone.
-# It validates the input, checks table availability, assigns a random open table, and persists the reservation/customer records.
+# It validates the input, claims the smallest table that seats the party and is free for the whole reservation, and persists the reservation/customer records
+# in the same transaction as the occupancy update. A booking that loses a race to a concurrent request is retried,
+# so the caller gets either a table or a 409, never a constraint error.
+# Clients may send an Idempotency-Key header so that retries of the same request do not book a second table.
 # Returns a success message upon confirmation, otherwise an error message.
 
 @api_bp.post('/reservations')
+@rate_limited('RATE_LIMIT_RESERVATIONS')
+@idempotent
 def create_reservation():
   """
   Creates a new reservation for a specific time slot.
@@ -32,24 +46,33 @@ def create_reservation():
   **Request:**
       POST /reservations
       Content-Type: application/json
+      Idempotency-Key: <unique key per booking attempt>   (optional)
       Body:
       {
           "datetime": "<ISO 8601 date/time string>",   # Reservation time (required)
           "name": "<guest name>",                      # Name of the guest (required)
           "email": "<guest's email address>",          # Guest's email (required)
           "phone": "<guest's phone number>",           # Guest's phone (optional)
-          "guests": <number of guests>                 # Number of guests (required, int or numeric string)
+          "guests": <number of guests>,                # Number of guests (required, int or numeric string)
+          "duration": <minutes>                        # How long the table is held (optional, default RESERVATION_DURATION_MINUTES)
       }
   
-  Validates the time slot and required fields. Checks if there is at least one available table
-  for the requested time slot. If so, assigns a random available table and creates or updates
-  the customer, then saves the reservation. If the slot is full or input is invalid, an error is returned.
+  Validates the time slot and required fields. Looks up the tables whose bookings overlap the requested time
+  with an indexed range query. If a table is free for the whole duration, assigns the smallest free table of
+  the floor plan that seats the party and creates or updates the customer, then saves the reservation together
+  with the updated occupancy. If no table is free or input is invalid, an error is returned.
 
   Returns:
       - 201 and reservation details if successful.
-      - 400 if required details are missing or invalid.
-      - 409 if no tables are available at the requested time.
+      - 400 if required details are missing or invalid, the duration is out of range, or the party is larger than any table.
+      - 409 if no table for the party is available at the requested time, or concurrent bookings kept winning the slot.
       - 500 on server/database error.
+
+  With an Idempotency-Key, a repeat of a confirmed request returns the original 201 response without booking
+  again, and a repeat sent while the first is still running waits for it (409 if it takes too long). Reusing a
+  key with a different body returns 422.
+
+  Each client IP may book RATE_LIMIT_RESERVATIONS times; beyond that a 429 with a Retry-After header is returned.
   """
   
   payload = request.get_json() or {}
@@ -72,43 +95,35 @@ def create_reservation():
   except (TypeError, ValueError):
     return jsonify({'message': 'Number of guests must be numeric.'}), 400
 
-  total_tables = current_app.config.get('TOTAL_TABLES', 30)
-
-  occupied_tables = {
-    reservation.table_number
-    for reservation in Reservation.query.filter_by(time_slot=time_slot).all()
-  }
-  available_tables = [
-    table_number
-    for table_number in range(1, total_tables + 1)
-    if table_number not in occupied_tables
-  ]
-
-  if not available_tables:
-    return jsonify({'message': 'Selected time slot is fully booked, please pick another time slot!'}), 409
-
-  table_number = random.choice(available_tables)
+  floor_plan = current_floor_plan()
+  if party_size < 1:
+    return jsonify({'message': 'Number of guests must be at least 1.'}), 400
+  if party_size > floor_plan.largest_table:
+    return jsonify({'message': f'Parties of more than {floor_plan.largest_table} guests cannot be booked online.'}), 400
 
+  longest = max_duration()
   try:
-    customer = Customer.query.filter_by(email=email).first()
-    if not customer:
-      customer = Customer(name=name, email=email, phone=phone)
-      db.session.add(customer)
-    else:
-      customer.name = name
-      customer.phone = phone or customer.phone
-
-    reservation = Reservation(
-      customer=customer,
-      time_slot=time_slot,
-      party_size=party_size,
-      table_number=table_number,
-    )
-
-    db.session.add(reservation)
-    db.session.commit()
+    duration = int(payload.get('duration') or current_app.config['RESERVATION_DURATION_MINUTES'])
+  except (TypeError, ValueError):
+    return jsonify({'message': 'Duration must be a number of minutes.'}), 400
+  if not 1 <= duration <= longest:
+    return jsonify({'message': f'Duration must be between 1 and {longest} minutes.'}), 400
+  # Reservations are stored as restaurant wall-clock times, as SQLite already did; dropping the
+  # UTC offset keeps overlap checks comparable with the stored values.
+  time_slot = time_slot.replace(tzinfo=None)
+  end_time = time_slot + timedelta(minutes=duration)
+
+  # Overlapping bookings are found with an indexed range query under the occupancy row locks.
+  # Races with concurrent bookings are retried inside book_reservation.
+  try:
+    reservation = book_reservation(time_slot, end_time, party_size, name, email, phone, floor_plan)
+  except SlotFullError:
+    return jsonify({'message': 'Selected time slot is fully booked, please pick another time slot!'}), 409
+  except BookingContentionError:
+    return jsonify({'message': 'This time slot is in high demand right now, please try again.'}), 409
   except Exception:
     db.session.rollback()
+    logger.exception('Booking failed')
     return jsonify({'message': 'Unable to process reservation at this time.'}), 500
 
   return (
@@ -116,10 +131,78 @@ def create_reservation():
       {
         'message': 'Reservation confirmed.',
         'reservationId': reservation.id,
-        'tableNumber': table_number,
+        'tableNumber': reservation.table_number,
         'timeSlot': reservation.time_slot.isoformat(),
+        'endTime': reservation.end_time.isoformat(),
       }
     ),
     201,
   )
 
+
+
+# Parses the 'from'/'to' bounds of the reservation listing. A plain date (YYYY-MM-DD) means the
+# start of that day for 'from' and the end of that day for 'to', so ?from=2025-12-01&to=2025-12-31
+# covers all of December. Returns None if the value is invalid or missing.
+def parse_range_bound(raw_value: str, end_of_day: bool = False):
+  bound = parse_time_slot(raw_value)
+  if bound is None:
+    return None
+  if end_of_day and len(raw_value) == 10:
+    bound += timedelta(days=1)
+  return bound.replace(tzinfo=None)
+
+# This endpoint lists reservations for front-of-house staff (admin only).
+# Reservations are read together with their customer in one joined query, paged with a keyset cursor
+# on (time_slot, id), or streamed as NDJSON for large ranges without loading them into memory.
+
+@api_bp.get('/reservations')
+@require_admin
+def list_reservations():
+  """
+  Lists the reservations whose time slot falls in a range.
+
+  **Request:**
+      GET /reservations?from=<date or datetime>&to=<date or datetime>&limit=<n>&cursor=<nextCursor>
+      Authorization: Bearer <admin token>
+
+      'from' is inclusive and 'to' exclusive; a plain date as 'to' includes that whole day.
+      With ?format=ndjson (or Accept: application/x-ndjson) the whole range is streamed as one
+      JSON object per line, in (time slot, id) order, and limit/cursor are ignored.
+
+  Each reservation is returned as:
+      {
+          "reservationId": <id>, "timeSlot": "<ISO 8601>", "endTime": "<ISO 8601>",
+          "guests": <int>, "tableNumber": <int>, "name": "<guest>", "email": "<email>", "phone": "<phone>"
+      }
+
+  Returns:
+      - 200 and {"items": [...], "nextCursor": "<cursor>" | null}, or the NDJSON stream.
+      - 400 if the range, limit or cursor is missing or invalid.
+      - 401 without a valid admin token.
+  """
+  start = parse_range_bound(request.args.get('from'))
+  end = parse_range_bound(request.args.get('to'), end_of_day=True)
+  if not start or not end:
+    return jsonify({'message': 'from and to must be ISO 8601 dates or date/times.'}), 400
+
+  if request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson':
+    lines = (json.dumps(item) + '\n' for item in reservation_repository.stream_reservations(start, end))
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+  try:
+    limit = int(request.args.get('limit', reservation_repository.MAX_PAGE_SIZE))
+  except ValueError:
+    return jsonify({'message': 'limit must be an integer.'}), 400
+  if not 1 <= limit <= reservation_repository.MAX_PAGE_SIZE:
+    return jsonify({'message': f'limit must be between 1 and {reservation_repository.MAX_PAGE_SIZE}.'}), 400
+
+  cursor = None
+  if request.args.get('cursor'):
+    try:
+      cursor = reservation_repository.decode_cursor(request.args['cursor'])
+    except ValueError:
+      return jsonify({'message': 'Invalid cursor.'}), 400
+
+  items, next_cursor = reservation_repository.reservation_page(start, end, limit=limit, cursor=cursor)
+  return jsonify({'items': items, 'nextCursor': next_cursor}), 200
@@ -0,0 +1,163 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import NamedTuple
+
+from flask import Response, jsonify, request, send_file
+
+from .compression import COMPRESSIBLE_MIMETYPES
+
+# This file serves the built single-page app (frontend/dist) next to the API.
+# At startup AssetServer walks the dist directory once and records every file's content hash,
+# type and precompressed .gz sibling in a manifest, so requests never touch the disk to find or
+# validate a file. Vite's fingerprinted bundles (assets/<name>-<hash>.<ext>) never change under
+# the same name and are sent with a one-year immutable Cache-Control; other files carry the
+# content hash as ETag and are revalidated. index.html is held in memory and answers every
+# unknown non-API path, so client-side routes load the app. Unknown /api/ paths get a JSON 404.
+# The manifest reflects the build present at startup; restart the server after a new build.
+
+# Vite writes content-hashed bundles to assets/ as <name>-<8 character hash>.<ext>.
+FINGERPRINTED = re.compile(r'^assets/.+-[\w-]{8}\.\w+$')
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Files smaller than this are not worth precompressing.
+PRECOMPRESS_MIN_SIZE = 500
+
+
+class Asset(NamedTuple):
+    path: str
+    mimetype: str
+    etag: str
+    fingerprinted: bool
+    gzip_path: str | None
+
+
+def _content_hash(path: str):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()[:32]
+
+
+def build_manifest(dist_dir: str):
+    """
+    Scans ``dist_dir`` and returns {url path: Asset} for every file, without the .gz siblings.
+
+    A .gz sibling is only used if it is newer than its file, so a stale one from an earlier
+    build is never served.
+    """
+    manifest = {}
+    for root, _, files in os.walk(dist_dir):
+        names = set(files)
+        for name in files:
+            if name.endswith('.gz') and name[:-3] in names:
+                continue
+            path = os.path.join(root, name)
+            url_path = os.path.relpath(path, dist_dir).replace(os.sep, '/')
+            gzip_path = path + '.gz'
+            if name + '.gz' not in names or os.path.getmtime(gzip_path) < os.path.getmtime(path):
+                gzip_path = None
+            manifest[url_path] = Asset(
+                path=path,
+                mimetype=mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                etag=_content_hash(path),
+                fingerprinted=bool(FINGERPRINTED.match(url_path)),
+                gzip_path=gzip_path,
+            )
+    return manifest
+
+
+def precompress(dist_dir: str, level: int = 9):
+    """
+    Writes a .gz sibling next to every compressible file of ``dist_dir`` that lacks an up-to-date one.
+
+    Returns:
+        int: The number of files compressed.
+    """
+    count = 0
+    for asset in build_manifest(dist_dir).values():
+        if asset.gzip_path or asset.mimetype not in COMPRESSIBLE_MIMETYPES:
+            continue
+        if os.path.getsize(asset.path) < PRECOMPRESS_MIN_SIZE:
+            continue
+        with open(asset.path, 'rb') as f:
+            data = gzip.compress(f.read(), compresslevel=level, mtime=0)
+        with open(asset.path + '.gz', 'wb') as f:
+            f.write(data)
+        count += 1
+    return count
+
+
+class AssetServer:
+    """
+    Flask extension serving a Vite build from ``dist_dir`` at the site root.
+
+    Routes '/' and '/<path>' are added to the app, and its 404 handler is replaced: paths under
+    ``api_prefix`` get a JSON error, any other unknown path gets index.html.
+    """
+
+    def __init__(self, app=None, dist_dir: str | None = None, api_prefix: str = '/api/'):
+        self.api_prefix = api_prefix
+        if app is not None:
+            self.init_app(app, dist_dir)
+
+    def init_app(self, app, dist_dir: str):
+        self.manifest = build_manifest(dist_dir)
+        index = self.manifest.get('index.html')
+        self.index_etag = index.etag if index else None
+        self.index_html = b''
+        if index:
+            with open(index.path, 'rb') as f:
+                self.index_html = f.read()
+        app.extensions['assets'] = self
+        app.add_url_rule('/', 'spa_index', self.serve_index)
+        app.add_url_rule('/<path:path>', 'spa_asset', self.serve)
+        app.register_error_handler(404, self.not_found)
+
+    def serve_index(self):
+        """Returns index.html from memory; it is revalidated on every load so new builds show up."""
+        if self.index_etag is None:
+            return jsonify({'message': 'The frontend has not been built.'}), 404
+        response = Response(self.index_html, mimetype='text/html')
+        response.set_etag(self.index_etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+    def serve(self, path: str):
+        """Returns the build file at ``path``, or index.html for client-side routes."""
+        if path == 'index.html':
+            return self.serve_index()
+        asset = self.manifest.get(path)
+        if asset is None:
+            return self.not_found(None)
+
+        use_gzip = asset.gzip_path and request.accept_encodings['gzip']
+        response = send_file(
+            asset.gzip_path if use_gzip else asset.path,
+            mimetype=asset.mimetype,
+            etag=f'{asset.etag}-gz' if use_gzip else asset.etag,
+            conditional=True,
+        )
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+        if asset.gzip_path:
+            response.vary.add('Accept-Encoding')
+        if asset.fingerprinted:
+            response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def not_found(self, error):
+        """404 handler: JSON for the API and for missing files, index.html for anything else."""
+        path = request.path
+        if path.startswith(self.api_prefix) or path == self.api_prefix.rstrip('/'):
+            return jsonify({'message': 'Not found.'}), 404
+        # A missing file (e.g. a bundle of an older build) must not be answered with HTML.
+        if '.' in path.rsplit('/', 1)[-1]:
+            return jsonify({'message': 'Not found.'}), 404
+        return self.serve_index()
@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+from datetime import UTC, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select
+
+from .extensions import db
+from .models import Customer
+
+# This file exports newsletter subscribers for marketing.
+# Subscribers are read in (updated_at, id) order through a streaming cursor that fetches
+# STREAM_BATCH_SIZE rows at a time, and are formatted line by line as CSV or NDJSON, so an export
+# holds one batch in memory however many subscribers there are. Incremental exports only
+# include customers updated after the watermark returned by the previous export.
+# updated_at is set by the application before its transaction commits, so a row can become visible
+# after an export that ran later than its updated_at. The watermark therefore lags the export by
+# EXPORT_WATERMARK_LAG_SECONDS, longer than any signup transaction: every row stamped at or before
+# it has committed by the time of the export. Rows updated within the lag are left to the next
+# export, so consecutive exports neither overlap nor miss rows, at the cost of that delay.
+
+FORMATS = ('csv', 'ndjson')
+FIELDS = ('email', 'name', 'updated_at')
+MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# Rows fetched from the database per round trip.
+STREAM_BATCH_SIZE = 1000
+
+
+def new_watermark():
+    """
+    Returns the upper bound of an export starting now, EXPORT_WATERMARK_LAG_SECONDS in the past;
+    pass it as ``since`` to the next export.
+    """
+    lag = timedelta(seconds=current_app.config['EXPORT_WATERMARK_LAG_SECONDS'])
+    return datetime.now(UTC).replace(tzinfo=None) - lag
+
+
+def subscriber_rows(until: datetime, since: datetime | None = None):
+    """Yields (email, name, updated_at) of subscribers updated after ``since`` and up to ``until``."""
+    query = (
+        select(Customer.email, Customer.name, Customer.updated_at)
+        .where(Customer.newsletter_opt_in.is_(True), Customer.updated_at <= until)
+        .order_by(Customer.updated_at, Customer.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    if since is not None:
+        query = query.where(Customer.updated_at > since)
+    yield from db.session.execute(query)
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        # Hand out what the writer produced and reuse the buffer for the next row.
+        writer.writerow(values)
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    yield line(FIELDS)
+    for email, name, updated_at in rows:
+        yield line((email, name or '', updated_at.isoformat()))
+
+
+def _ndjson_lines(rows):
+    for email, name, updated_at in rows:
+        yield json.dumps({'email': email, 'name': name, 'updated_at': updated_at.isoformat()}) + '\n'
+
+
+def export_lines(fmt: str, until: datetime, since: datetime | None = None):
+    """Yields the export as text chunks in ``csv`` or ``ndjson`` format."""
+    rows = subscriber_rows(until, since)
+    return _csv_lines(rows) if fmt == 'csv' else _ndjson_lines(rows)
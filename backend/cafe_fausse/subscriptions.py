@@ -0,0 +1,31 @@
+from . import outbox
+from .customer_repository import upsert_customer, upsert_customers
+from .extensions import db
+
+# This file writes newsletter signups.
+# Signups go through the customer repository's upsert, so creating a new subscriber and opting in
+# an existing customer are one INSERT ... ON CONFLICT (email) DO UPDATE statement, and
+# simultaneous signups for one email cannot collide on the unique constraint. Bulk signups send the
+# same statement for a whole batch of addresses with executemany. A single signup also queues a
+# welcome email in the outbox, in the same transaction; bulk campaign imports do not.
+
+
+def subscribe_many(subscribers):
+    """
+    Opts the given (email, name) pairs in to the newsletter and commits.
+
+    Emails must already be normalized. A signup without a name keeps the customer's name.
+
+    Returns:
+        int: The number of distinct addresses subscribed.
+    """
+    count = len(upsert_customers((email, name, None, True) for email, name in subscribers))
+    db.session.commit()
+    return count
+
+
+def subscribe(email: str, name: str | None = None):
+    """Opts one normalized email address in to the newsletter, queues the welcome email and commits."""
+    upsert_customer(email, name=name, newsletter_opt_in=True)
+    outbox.enqueue('newsletter_welcome', email, {'name': name})
+    db.session.commit()
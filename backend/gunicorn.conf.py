@@ -0,0 +1,100 @@
+# Production server configuration (Linux/macOS): run from the backend directory with
+#
+#     gunicorn -c gunicorn.conf.py
+#
+# The app from app.py (API plus the SPA build) is loaded once in the master process and forked
+# into WORKERS processes of THREADS threads each. Every worker drops the database connections
+# and logging thread it inherited and starts its own, so no pooled connection is shared across
+# processes.
+#
+# Reloading:
+#   kill -HUP <master pid>     re-reads this file and replaces the workers gracefully; with
+#                               preload the application code itself is not re-imported.
+#   kill -USR2 <master pid>     starts a new master with new code next to the old one; then
+#                               kill -WINCH <old pid> and kill -QUIT <old pid> once it serves.
+#   kill -TERM <master pid>     finishes in-flight requests (up to graceful_timeout) and exits.
+#
+# Every setting can be overridden from the environment (below) or with GUNICORN_CMD_ARGS.
+# Windows has no fork(); there, run `python app.py` as before.
+import glob
+import multiprocessing
+import os
+import sys
+import tempfile
+
+cores = multiprocessing.cpu_count()
+
+wsgi_app = 'app:app'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:80')
+
+# Threads let a worker overlap requests waiting on the database; processes use every core.
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2 * cores + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import the app once in the master: workers start faster and share its memory copy-on-write.
+preload_app = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then to bound memory growth; the jitter keeps them from restarting together.
+# Not with multi-process metrics (below): a worker's metric files outlive it, since they still hold
+# its counts, so every recycled worker would leave another set behind for as long as the server runs.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+# Worker heartbeats in memory rather than on a possibly slow disk.
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# Requests are logged by the app itself (cafe_fausse.log); gunicorn only logs its own events.
+accesslog = None
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
+
+# This is the production server; rate limits must hold across all workers, not per process.
+os.environ.setdefault('FLASK_ENV', 'production')
+os.environ.setdefault('RATE_LIMIT_STORAGE', 'shared')
+# Workers write their metrics to files in PROMETHEUS_MULTIPROC_DIR, and /api/metrics in any worker
+# adds them all up. It must be set before the app (and prometheus_client) is imported. Unless it is
+# already set, each master creates its own directory and on_exit removes it again; a master started
+# by USR2 runs with the environment gunicorn was started with, so it creates another. A directory
+# set from outside is used as it is and never cleared: give every server start an empty one.
+METRICS_DIR_CREATED = 'CAFE_FAUSSE_METRICS_DIR_CREATED'
+metrics_enabled = os.environ.get('FLASK_METRICS_ENABLED', os.environ.get('METRICS_ENABLED', 'true')).lower() in ('1', 'true', 'yes')
+if metrics_enabled and not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = os.environ[METRICS_DIR_CREATED] = tempfile.mkdtemp(prefix='cafe-fausse-metrics-')
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    max_requests = 0
+
+
+def on_exit(server):
+    # Only the metric files of a directory created above, once this master's workers have exited.
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not directory or os.environ.get(METRICS_DIR_CREATED) != directory:
+        return
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(path)
+    try:
+        os.rmdir(directory)
+    except OSError:
+        pass
+
+
+def post_fork(server, worker):
+    # The preloaded module only exists in workers forked from a master that imported it.
+    module = sys.modules.get('app')
+    if module is None:
+        return
+    from cafe_fausse import database, log
+
+    database.dispose_after_fork(module.app)
+    log.after_fork()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -7,7 +7,10 @@ from cafe_fausse.extensions import db
 # import sys, os
 # sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 @pytest.fixture()
-def app():
+def app(monkeypatch):
+  # create_app binds the engine at init time, so the test database has to be
+  # supplied through the environment rather than via app.config.update below.
+  monkeypatch.setenv('FLASK_SQLALCHEMY_DATABASE_URI', 'sqlite:///:memory:')
   app = create_app('development')
   app.config.update(
     {
@@ -181,3 +181,1092 @@ def test_menuchange_update_bruschetta(tmp_path, client, monkeypatch):
     assert brusch["image"] == "/some/new/path/bruschetta.png"
 
 
+
+def test_get_menu_etag_not_modified(client, tmp_path, monkeypatch):
+    import os
+
+    menu_dir = tmp_path / "data"
+    menu_dir.mkdir()
+    (menu_dir / "menu.json").write_text(json.dumps([{"name": "Espresso", "price": 3.5}]), encoding="utf-8")
+    monkeypatch.setattr(os, "getcwd", lambda: str(tmp_path))
+
+    response = client.get('/api/menu')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert etag
+
+    response = client.get('/api/menu', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+def test_get_menu_reflects_file_and_menuchange_updates(client, tmp_path, monkeypatch):
+    import os
+
+    menu_dir = tmp_path / "data"
+    menu_dir.mkdir()
+    menu_path = menu_dir / "menu.json"
+    menu_data = [{"title": "Starters", "items": [{"name": "Bruschetta", "price": "$8.99"}]}]
+    menu_path.write_text(json.dumps(menu_data), encoding="utf-8")
+    monkeypatch.setattr(os, "getcwd", lambda: str(tmp_path))
+
+    first = client.get('/api/menu')
+    assert first.get_json()[0]["items"][0]["price"] == "$8.99"
+
+    response = client.post('/api/menuchange', json={"name": "bruschetta", "price": "$9.50"})
+    assert response.status_code == 200
+
+    second = client.get('/api/menu', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.get_json()[0]["items"][0]["price"] == "$9.50"
+
+    # Edits made outside the API are picked up through the file signature.
+    menu_data[0]["items"].append({"name": "Caesar Salad", "price": "$9.00"})
+    menu_path.write_text(json.dumps(menu_data), encoding="utf-8")
+    third = client.get('/api/menu')
+    assert [item["name"] for item in third.get_json()[0]["items"]] == ["Bruschetta", "Caesar Salad"]
+
+def test_menuchange_batch_updates_with_single_write(client, tmp_path, monkeypatch):
+    import os
+
+    menu_dir = tmp_path / "data"
+    menu_dir.mkdir()
+    menu_path = menu_dir / "menu.json"
+    menu_data = [
+        {"title": "Starters", "items": [{"name": "Bruschetta", "price": "$8.99"}, {"name": "Caesar Salad", "price": "$9.00"}]},
+        {"title": "Desserts", "items": [{"name": "Tiramisu", "price": "$7.50"}]},
+    ]
+    menu_path.write_text(json.dumps(menu_data), encoding="utf-8")
+    monkeypatch.setattr(os, "getcwd", lambda: str(tmp_path))
+
+    from cafe_fausse.menu_store import menu_store
+    writes = []
+    original_persist = menu_store._persist
+    monkeypatch.setattr(menu_store, "_persist", lambda path, state: (writes.append(path), original_persist(path, state)))
+
+    response = client.post('/api/menuchange/batch', json={"items": [
+        {"name": "BRUSCHETTA", "price": "$9.25"},
+        {"name": "tiramisu", "price": "$8.00"},
+        {"name": "Gelato", "price": "$5.00"},
+        {"price": "$1.00"},
+    ]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["success"] is False
+    assert body["updated"] == 2
+    assert [result["status"] for result in body["results"]] == [200, 200, 404, 400]
+    assert len(writes) == 1
+
+    reloaded = json.loads(menu_path.read_text(encoding="utf-8"))
+    assert reloaded[0]["items"][0]["price"] == "$9.25"
+    assert reloaded[0]["items"][1]["price"] == "$9.00"
+    assert reloaded[1]["items"][0]["price"] == "$8.00"
+
+    response = client.post('/api/menuchange/batch', json={"items": []})
+    assert response.status_code == 400
+
+def test_menuchange_unknown_item(client, tmp_path, monkeypatch):
+    import os
+
+    menu_dir = tmp_path / "data"
+    menu_dir.mkdir()
+    (menu_dir / "menu.json").write_text(json.dumps([{"title": "Starters", "items": [{"name": "Bruschetta"}]}]), encoding="utf-8")
+    monkeypatch.setattr(os, "getcwd", lambda: str(tmp_path))
+
+    response = client.post('/api/menuchange', json={"name": "Gelato", "price": "$5.00"})
+    assert response.status_code == 404
+    assert "not found" in response.get_json()["error"].lower()
+
+def test_database_menu_filtering_pagination_and_updates(app, client):
+    from cafe_fausse import menu_repository
+
+    app.config['MENU_SOURCE'] = 'database'
+    menu_repository.import_menu([
+        {"title": "Starters", "description": "Begin.", "items": [
+            {"name": "Bruschetta", "price": "$8.99"},
+            {"name": "Caesar Salad", "price": "$9.00"},
+            {"name": "Soup", "price": "$6.00"},
+        ]},
+        {"title": "Desserts", "items": [{"name": "Tiramisu", "price": "$7.50"}]},
+    ])
+
+    full = client.get('/api/menu')
+    assert full.status_code == 200
+    assert [section["title"] for section in full.get_json()] == ["Starters", "Desserts"]
+    assert client.get('/api/menu', headers={'If-None-Match': full.headers['ETag']}).status_code == 304
+
+    first = client.get('/api/menu?section=starters&limit=2').get_json()
+    assert [item["name"] for item in first["items"]] == ["Bruschetta", "Caesar Salad"]
+    assert first["nextCursor"]
+    second = client.get(f'/api/menu?section=starters&limit=2&cursor={first["nextCursor"]}').get_json()
+    assert [item["name"] for item in second["items"]] == ["Soup"]
+    assert second["nextCursor"] is None
+
+    everything = client.get('/api/menu?limit=10').get_json()
+    assert [item["section"] for item in everything["items"]] == ["Starters"] * 3 + ["Desserts"]
+    assert client.get('/api/menu?limit=0').status_code == 400
+    assert client.get('/api/menu?cursor=nope').status_code == 400
+
+    # Moving a section moves its items: pages follow section positions, not section ids.
+    menu_repository.import_menu([
+        {"title": "Desserts", "items": [{"name": "Tiramisu", "price": "$7.50"}]},
+        {"title": "Starters", "items": [
+            {"name": "Bruschetta", "price": "$8.99"},
+            {"name": "Caesar Salad", "price": "$9.00"},
+            {"name": "Soup", "price": "$6.00"},
+        ]},
+    ])
+    page = client.get('/api/menu?limit=2').get_json()
+    assert [item["name"] for item in page["items"]] == ["Tiramisu", "Bruschetta"]
+    page = client.get(f'/api/menu?limit=2&cursor={page["nextCursor"]}').get_json()
+    assert [item["name"] for item in page["items"]] == ["Caesar Salad", "Soup"]
+    assert page["nextCursor"] is None
+
+    response = client.post('/api/menuchange', json={"name": "tiramisu", "price": "$8.25"})
+    assert response.status_code == 200
+    assert response.get_json()["item"]["price"] == "$8.25"
+    assert client.post('/api/menuchange', json={"name": "Gelato", "price": "$1"}).status_code == 404
+
+    desserts = client.get('/api/menu?section=Desserts').get_json()
+    assert desserts["items"][0]["price"] == "$8.25"
+
+def test_menu_filtering_requires_database_source(client):
+    response = client.get('/api/menu?section=Starters')
+    assert response.status_code == 400
+
+def test_menu_response_is_compressed_and_cached(app, client, tmp_path, monkeypatch):
+    import gzip
+    import os
+    from cafe_fausse import compression
+
+    menu_dir = tmp_path / "data"
+    menu_dir.mkdir()
+    menu_data = [{"title": "Starters", "items": [{"name": f"Dish {index}", "description": "x" * 40} for index in range(30)]}]
+    (menu_dir / "menu.json").write_text(json.dumps(menu_data), encoding="utf-8")
+    monkeypatch.setattr(os, "getcwd", lambda: str(tmp_path))
+
+    calls = []
+    original_gzip = compression.ENCODERS['gzip']
+    monkeypatch.setitem(compression.ENCODERS, 'gzip', lambda data, level: (calls.append(1), original_gzip(data, level))[1])
+
+    plain = client.get('/api/menu')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    first = client.get('/api/menu', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(first.data)) == menu_data
+    assert first.headers['ETag'].startswith('W/')
+
+    second = client.get('/api/menu', headers={'Accept-Encoding': 'gzip'})
+    assert second.data == first.data
+    assert len(calls) == 1
+
+    revalidated = client.get('/api/menu', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304
+
+    deflated = client.get('/api/menu', headers={'Accept-Encoding': 'deflate'})
+    assert deflated.headers['Content-Encoding'] == 'deflate'
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get('/api/health', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_reservation_uses_slot_occupancy(app, client):
+  from cafe_fausse.extensions import db
+  from cafe_fausse.models import Customer, Reservation, SlotOccupancy
+
+  slot = datetime(2030, 5, 17, 19, 0)
+  # A booking made before the slot had an occupancy row.
+  customer = Customer(name='Earlier Guest', email='earlier@example.com')
+  db.session.add(Reservation(
+    customer=customer, time_slot=slot, end_time=slot + timedelta(minutes=90), party_size=2, table_number=1,
+  ))
+  db.session.commit()
+
+  response = client.post(
+    '/api/reservations',
+    json={'datetime': slot.isoformat(), 'guests': 2, 'name': 'New Guest', 'email': 'new@example.com'},
+  )
+  assert response.status_code == 201
+  assert response.get_json()['tableNumber'] == 2
+
+  occupancy = db.session.get(SlotOccupancy, slot)
+  assert occupancy.remaining == 3
+  assert occupancy.free_mask == 0b11100
+
+def test_availability_reports_remaining_tables(app, client):
+  day = (datetime.now(UTC) + timedelta(days=3)).date()
+  slot = datetime(day.year, day.month, day.day, 19, 0)
+
+  response = client.get(f'/api/availability?date={day.isoformat()}')
+  assert response.status_code == 200
+  slots = {entry['timeSlot']: entry['remaining'] for entry in response.get_json()['slots']}
+  assert slots[slot.isoformat()] == 5
+  assert slots[f'{day.isoformat()}T17:00:00'] == 5
+  assert slots[f'{day.isoformat()}T22:00:00'] == 5
+
+  for index in range(2):
+    client.post('/api/reservations', json={
+      'datetime': slot.isoformat(), 'guests': 2, 'name': 'Guest', 'email': f'avail{index}@example.com',
+    })
+
+  # The booking commits invalidate the cached day.
+  response = client.get(f'/api/availability?date={day.isoformat()}')
+  slots = {entry['timeSlot']: entry['remaining'] for entry in response.get_json()['slots']}
+  assert slots[slot.isoformat()] == 3
+  # The 90-minute bookings also hold their tables for the next two slots and for the slots
+  # whose bookings would run into them.
+  assert slots[f'{day.isoformat()}T17:30:00'] == 5
+  assert slots[f'{day.isoformat()}T18:00:00'] == 3
+  assert slots[f'{day.isoformat()}T20:00:00'] == 3
+  assert slots[f'{day.isoformat()}T20:30:00'] == 5
+
+def test_availability_requires_valid_date(client):
+  assert client.get('/api/availability').status_code == 400
+  assert client.get('/api/availability?date=tomorrow').status_code == 400
+
+def test_floor_plan_best_fit():
+  from cafe_fausse.floor_plan import FloorPlan, parse_floor_plan
+
+  plan = FloorPlan(parse_floor_plan('2x2, 4x2, 8'))
+  assert plan.seats == (2, 2, 4, 4, 8)
+  everything_free = 0b11111
+  assert plan.best_fit(everything_free, 2) == 1
+  assert plan.best_fit(everything_free, 3) == 3
+  assert plan.best_fit(everything_free, 5) == 5
+  assert plan.best_fit(everything_free, 9) is None
+  # With the 2-tops gone, a couple moves up to the smallest free 4-top.
+  assert plan.best_fit(0b11100, 2) == 3
+  assert plan.best_fit(0b00011, 4) is None
+
+def test_booking_retries_only_lost_races(app, client, monkeypatch):
+  import sqlite3
+  from sqlalchemy.exc import IntegrityError, OperationalError
+  from cafe_fausse import booking
+  from cafe_fausse.database import is_contention
+
+  def error(kind, message):
+    return kind('INSERT ...', {}, sqlite3.OperationalError(message))
+
+  assert is_contention(error(OperationalError, 'database is locked'))
+  assert is_contention(error(IntegrityError, 'UNIQUE constraint failed: slot_occupancy.time_slot'))
+  assert is_contention(error(IntegrityError, 'UNIQUE constraint failed: reservations.time_slot, reservations.table_number'))
+  assert not is_contention(error(IntegrityError, 'NOT NULL constraint failed: reservations.customer_id'))
+  assert not is_contention(error(OperationalError, 'unable to open database file'))
+
+  calls = []
+  def broken_claim(*args):
+    calls.append(args)
+    raise error(OperationalError, 'disk I/O error')
+  monkeypatch.setattr(booking, 'claim_table', broken_claim)
+  response = client.post('/api/reservations', json={
+    'datetime': _future_slot(), 'guests': 2, 'name': 'Down', 'email': 'down@example.com',
+  })
+  assert response.status_code == 500 and len(calls) == 1
+
+def test_reservation_assigns_smallest_fitting_table(app, client):
+  app.config['FLOOR_PLAN'] = '2x2,4x2,8x1'
+  slot = datetime(2030, 6, 1, 20, 0).isoformat()
+
+  def book(guests, index):
+    return client.post('/api/reservations', json={
+      'datetime': slot, 'guests': guests, 'name': 'Guest', 'email': f'fit{index}@example.com',
+    })
+
+  assert book(6, 0).get_json()['tableNumber'] == 5
+  assert book(2, 1).get_json()['tableNumber'] == 1
+  assert book(3, 2).get_json()['tableNumber'] == 3
+  assert book(8, 3).status_code == 409
+  assert book(9, 4).status_code == 400
+  assert book(0, 5).status_code == 400
+
+def test_bulk_import_requires_admin_token(client):
+  response = client.post('/api/admin/reservations/import?format=csv', data='datetime,guests,name,email\n')
+  assert response.status_code == 401
+
+def test_bulk_import_csv_reports_each_row(app, client):
+  app.config['FLOOR_PLAN'] = '2x2,4x1'
+  slot = datetime(2030, 7, 1, 19, 0).isoformat()
+  client.post('/api/reservations', json={
+    'datetime': slot, 'guests': 2, 'name': 'Walk In', 'email': 'walkin@example.com',
+  })
+  body = '\n'.join([
+    'datetime,guests,name,email,phone',
+    f'{slot},2,Ann,ann@example.com,202-555-0100',
+    f'{slot},3,Bob,bob@example.com,',
+    f'{slot},2,Cat,cat@example.com,',
+    'not-a-date,2,Dan,dan@example.com,',
+    f'{slot},2,,eve@example.com,',
+  ])
+  response = client.post(
+    '/api/admin/reservations/import',
+    data=body,
+    content_type='text/csv',
+    headers={'Authorization': 'Bearer fake-jwt-token'},
+  )
+  assert response.status_code == 200
+  result = response.get_json()
+  assert (result['created'], result['failed']) == (2, 3)
+  rows = result['results']
+  assert [row['row'] for row in rows] == [1, 2, 3, 4, 5]
+  # Table 1 went to the walk-in, so the import gets table 2 and the 4-top.
+  assert rows[0]['tableNumber'] == 2
+  assert rows[1]['tableNumber'] == 3
+  assert rows[2]['status'] == 'error'
+  assert rows[3]['message'] == 'Invalid or missing time slot.'
+  assert rows[4]['message'] == 'Guest name is required.'
+
+  # The imported bookings are visible to regular bookings of the same slot.
+  response = client.post('/api/reservations', json={
+    'datetime': slot, 'guests': 1, 'name': 'Late', 'email': 'late@example.com',
+  })
+  assert response.status_code == 409
+
+def test_bulk_import_ndjson_updates_existing_customer(app, client):
+  from cafe_fausse.models import Customer
+
+  lines = [
+    json.dumps({'datetime': '2030-07-02T18:00:00', 'guests': 2, 'name': 'Ann', 'email': 'ann@example.com'}),
+    '{broken',
+    json.dumps({'datetime': '2030-07-03T18:00:00', 'guests': 2, 'name': 'Ann Lee', 'email': 'ANN@example.com', 'phone': '555'}),
+  ]
+  response = client.post(
+    '/api/admin/reservations/import?format=ndjson',
+    data='\n'.join(lines) + '\n',
+    headers={'Authorization': 'Bearer fake-jwt-token'},
+  )
+  result = response.get_json()
+  assert (result['created'], result['failed']) == (2, 1)
+  assert result['results'][1] == {'row': 2, 'status': 'error', 'message': 'Row could not be parsed.'}
+  with app.app_context():
+    customers = Customer.query.all()
+    assert [(c.name, c.email, c.phone) for c in customers] == [('Ann Lee', 'ann@example.com', '555')]
+
+def test_overlapping_reservations_do_not_share_a_table(app, client):
+  app.config['FLOOR_PLAN'] = '2x2'
+  day = '2030-08-01'
+
+  def book(start, index, **extra):
+    return client.post('/api/reservations', json={
+      'datetime': f'{day}T{start}', 'guests': 2, 'name': 'Guest', 'email': f'overlap{index}@example.com', **extra,
+    })
+
+  first = book('19:00:00', 0)
+  assert first.status_code == 201
+  assert first.get_json()['endTime'] == f'{day}T20:30:00'
+  # 19:30 overlaps the 19:00 booking, so it gets the other table.
+  assert book('19:30:00', 1).get_json()['tableNumber'] == 2
+  assert book('20:00:00', 2).status_code == 409
+  # Once the first booking ends its table is free again.
+  assert book('20:30:00', 3).get_json()['tableNumber'] == 1
+  # An off-grid booking that ends before 19:00 fits in front of it.
+  assert book('17:40:00', 4, duration=80).get_json()['tableNumber'] == 1
+  assert book('18:00:00', 5, duration=61).get_json()['tableNumber'] == 2
+  # A missing or zero duration means the default length.
+  assert book('12:00:00', 6, duration=0).get_json()['endTime'] == f'{day}T13:30:00'
+  assert book('12:00:00', 7, duration=241).status_code == 400
+  assert book('12:00:00', 8, duration='long').status_code == 400
+
+def test_lowering_the_max_duration_keeps_longer_bookings_visible(app, client):
+  app.config.update({'FLOOR_PLAN': '2x1', 'RESERVATION_MAX_DURATION_MINUTES': 600})
+
+  def book(start, index, **extra):
+    return client.post('/api/reservations', json={
+      'datetime': f'2030-08-02T{start}', 'guests': 2, 'name': 'Guest', 'email': f'long{index}@example.com', **extra,
+    })
+
+  assert book('12:00:00', 0, duration=600).status_code == 201
+  app.config['RESERVATION_MAX_DURATION_MINUTES'] = 90
+  # 12:00 + 600 minutes still holds the only table at 21:00.
+  assert book('21:00:00', 1).status_code == 409
+  assert book('22:00:00', 2).status_code == 201
+  app.config['RESERVATION_MAX_DURATION_MINUTES'] = 10 ** 6
+  assert book('12:00:00', 3, duration=24 * 60 + 1).status_code == 400
+
+def test_invalid_floor_plan_stops_the_app_at_startup(monkeypatch):
+  import pytest
+
+  from cafe_fausse import create_app
+  from cafe_fausse.floor_plan import current_floor_plan
+
+  monkeypatch.setenv('FLASK_SQLALCHEMY_DATABASE_URI', 'sqlite:///:memory:')
+  monkeypatch.setenv('FLASK_FLOOR_PLAN', '2x8,fourx2')
+  with pytest.raises(ValueError, match='Invalid floor plan'):
+    create_app('development')
+  monkeypatch.setenv('FLASK_FLOOR_PLAN', '0x2')
+  with pytest.raises(ValueError):
+    create_app('development')
+  monkeypatch.delenv('FLASK_FLOOR_PLAN')
+  monkeypatch.setenv('FLASK_TOTAL_TABLES', '64')
+  with pytest.raises(ValueError, match='at most 63 tables'):
+    create_app('development')
+  monkeypatch.delenv('FLASK_TOTAL_TABLES')
+  monkeypatch.setenv('FLASK_FLOOR_PLAN', '2x64')
+  with pytest.raises(ValueError, match='at most 63 tables'):
+    create_app('development')
+  # A bare number is one table of that size.
+  monkeypatch.setenv('FLASK_FLOOR_PLAN', '6')
+  app = create_app('development')
+  with app.app_context():
+    assert current_floor_plan().seats == (6,)
+
+def test_table_intervals_overlap():
+  from cafe_fausse.intervals import TableIntervals
+
+  intervals = TableIntervals(3)
+  intervals.add(1, datetime(2030, 1, 1, 19), datetime(2030, 1, 1, 20))
+  intervals.add(1, datetime(2030, 1, 1, 17), datetime(2030, 1, 1, 18))
+  intervals.add(2, datetime(2030, 1, 1, 18), datetime(2030, 1, 1, 21))
+  intervals.add(4, datetime(2030, 1, 1, 18), datetime(2030, 1, 1, 21))
+
+  assert intervals.is_free(1, datetime(2030, 1, 1, 18), datetime(2030, 1, 1, 19))
+  assert not intervals.is_free(1, datetime(2030, 1, 1, 17, 30), datetime(2030, 1, 1, 18, 30))
+  assert intervals.busy_mask(datetime(2030, 1, 1, 19, 59), datetime(2030, 1, 1, 20, 30)) == 0b011
+  assert intervals.busy_mask(datetime(2030, 1, 1, 21), datetime(2030, 1, 1, 22)) == 0
+  assert intervals.starts(datetime(2030, 1, 1, 17), datetime(2030, 1, 1, 19)) == {
+    datetime(2030, 1, 1, 17), datetime(2030, 1, 1, 18),
+  }
+
+def test_admin_reservation_listing_pages_with_cursor(app, client):
+  from sqlalchemy import event
+  from cafe_fausse.extensions import db
+
+  for index in range(5):
+    client.post('/api/reservations', json={
+      'datetime': f'2030-09-0{index + 1}T19:00:00', 'guests': 2, 'name': f'Guest {index}',
+      'email': f'list{index}@example.com',
+    })
+  client.post('/api/reservations', json={
+    'datetime': '2030-10-01T19:00:00', 'guests': 2, 'name': 'Later', 'email': 'later@example.com',
+  })
+  headers = {'Authorization': 'Bearer fake-jwt-token'}
+  assert client.get('/api/reservations?from=2030-09-01&to=2030-09-30').status_code == 401
+  assert client.get('/api/reservations?from=2030-09-01', headers=headers).status_code == 400
+  assert client.get('/api/reservations?from=2030-09-01&to=2030-09-30&cursor=x', headers=headers).status_code == 400
+
+  statements = []
+  event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+  pages = []
+  url = '/api/reservations?from=2030-09-01&to=2030-09-30&limit=2'
+  cursor = None
+  while True:
+    response = client.get(url + (f'&cursor={cursor}' if cursor else ''), headers=headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    pages.append(body['items'])
+    cursor = body['nextCursor']
+    if not cursor:
+      break
+
+  # One joined query per page; customers are not loaded one by one.
+  assert len(statements) == 3
+  assert [len(page) for page in pages] == [2, 2, 1]
+  items = [item for page in pages for item in page]
+  assert [item['name'] for item in items] == [f'Guest {index}' for index in range(5)]
+  assert items[0]['email'] == 'list0@example.com'
+  assert items[0]['endTime'] == '2030-09-01T20:30:00'
+
+def test_admin_reservation_listing_streams_ndjson(client):
+  for index in range(3):
+    client.post('/api/reservations', json={
+      'datetime': f'2030-11-01T{17 + index * 2}:00:00', 'guests': 2, 'name': f'Guest {index}',
+      'email': f'stream{index}@example.com',
+    })
+  response = client.get(
+    '/api/reservations?from=2030-11-01T18:00:00&to=2030-11-02',
+    headers={'Authorization': 'Bearer fake-jwt-token', 'Accept': 'application/x-ndjson'},
+  )
+  assert response.status_code == 200
+  assert response.mimetype == 'application/x-ndjson'
+  lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+  assert [line['timeSlot'] for line in lines] == ['2030-11-01T19:00:00', '2030-11-01T21:00:00']
+
+def test_idempotency_key_replays_confirmed_reservation(app, client):
+  from cafe_fausse.extensions import db
+  from cafe_fausse.models import Reservation
+
+  payload = {'datetime': '2030-12-01T19:00:00', 'guests': 2, 'name': 'Retry', 'email': 'retry@example.com'}
+  headers = {'Idempotency-Key': 'booking-1'}
+  first = client.post('/api/reservations', json=payload, headers=headers)
+  assert first.status_code == 201
+
+  # Replayed from the in-memory cache, then from the table once the cache is gone.
+  second = client.post('/api/reservations', json=payload, headers=headers)
+  app.extensions.pop('idempotency')
+  third = client.post('/api/reservations', json=payload, headers=headers)
+  for repeat in (second, third):
+    assert repeat.status_code == 201
+    assert repeat.headers['Idempotent-Replayed'] == 'true'
+    assert repeat.get_json() == first.get_json()
+  assert db.session.query(Reservation).count() == 1
+
+  other = client.post('/api/reservations', json={**payload, 'guests': 3}, headers=headers)
+  assert other.status_code == 422
+  assert client.post('/api/reservations', json=payload, headers={'Idempotency-Key': ''}).status_code == 400
+
+def test_idempotency_key_is_released_after_a_failed_request(client):
+  headers = {'Idempotency-Key': 'booking-2'}
+  payload = {'datetime': '2030-12-02T19:00:00', 'guests': 2, 'name': '', 'email': 'fix@example.com'}
+  assert client.post('/api/reservations', json=payload, headers=headers).status_code == 400
+  response = client.post('/api/reservations', json={**payload, 'name': 'Fixed'}, headers=headers)
+  assert response.status_code == 201
+
+def test_idempotency_key_of_a_slow_request_is_not_taken_over(app, client):
+  from datetime import timedelta
+  from cafe_fausse import idempotency
+  from cafe_fausse.extensions import db
+  from cafe_fausse.models import IdempotencyKey, Reservation
+
+  app.config['IDEMPOTENCY_WAIT_SECONDS'] = 0.1
+  payload = {'datetime': '2030-12-03T19:00:00', 'guests': 2, 'name': 'Slow', 'email': 'slow@example.com'}
+  headers = {'Idempotency-Key': 'booking-3'}
+  with app.test_request_context('/api/reservations', method='POST', json=payload):
+    fingerprint = idempotency._fingerprint()
+  # The first request has been running for longer than a duplicate waits, but is within its lease.
+  claimed_at = idempotency._now() - timedelta(seconds=60)
+  db.session.add(IdempotencyKey(key='booking-3', fingerprint=fingerprint, created_at=claimed_at))
+  db.session.commit()
+  assert client.post('/api/reservations', json=payload, headers=headers).status_code == 409
+  assert db.session.query(Reservation).count() == 0
+
+  # Past the lease the key is taken over, and the original request can no longer store its result.
+  app.config['IDEMPOTENCY_LEASE_SECONDS'] = 30
+  retry = client.post('/api/reservations', json=payload, headers=headers)
+  assert retry.status_code == 201
+  stale = idempotency.StoredResponse(fingerprint, 201, '{"reservationId": 999}')
+  assert not idempotency._store('booking-3', claimed_at, stale)
+  row = db.session.get(IdempotencyKey, 'booking-3')
+  assert row.response_body == retry.get_data(as_text=True)
+
+def test_newsletter_signup_upserts_existing_customer(app, client):
+  from cafe_fausse.models import Customer
+
+  client.post('/api/reservations', json={
+    'datetime': '2031-01-05T19:00:00', 'guests': 2, 'name': 'Diner', 'email': 'diner@example.com',
+  })
+  assert client.post('/api/newsletter', json={'email': 'Diner@Example.com'}).status_code == 201
+  assert client.post('/api/newsletter', json={'email': 'diner@example.com'}).status_code == 201
+  customers = Customer.query.all()
+  assert [(c.email, c.name, c.newsletter_opt_in) for c in customers] == [('diner@example.com', 'Diner', True)]
+
+def test_newsletter_bulk_subscribe(client):
+  from cafe_fausse.models import Customer
+
+  subscribers = [f'bulk{index}@example.com' for index in range(2500)]
+  subscribers += [{'email': 'BULK1@example.com', 'name': 'Named'}, 'broken', {'name': 'No Email'}]
+  assert client.post('/api/newsletter/bulk', json={'subscribers': subscribers}).status_code == 401
+
+  response = client.post(
+    '/api/newsletter/bulk', json={'subscribers': subscribers}, headers={'Authorization': 'Bearer fake-jwt-token'},
+  )
+  assert response.status_code == 200
+  body = response.get_json()
+  assert body['subscribed'] == 2500
+  assert [entry['index'] for entry in body['rejected']] == [2501, 2502]
+  assert Customer.query.filter_by(newsletter_opt_in=True).count() == 2500
+  assert Customer.query.filter_by(email='bulk1@example.com').one().name == 'Named'
+
+def test_newsletter_bulk_subscribe_logs_database_failures(client, monkeypatch, caplog):
+  from cafe_fausse.routes import newsletter
+
+  def failing_subscribe_many(subscribers):
+    raise RuntimeError('database is down')
+
+  monkeypatch.setattr(newsletter, 'subscribe_many', failing_subscribe_many)
+  response = client.post(
+    '/api/newsletter/bulk', json={'subscribers': ['a@example.com']}, headers={'Authorization': 'Bearer fake-jwt-token'},
+  )
+  assert response.status_code == 500
+  record = next(record for record in caplog.records if record.getMessage() == 'Bulk newsletter signup failed')
+  assert 'database is down' in str(record.exc_info[1])
+
+def test_subscriber_export_streams_and_supports_watermarks(app, client):
+  import csv
+  import io
+
+  app.config['EXPORT_WATERMARK_LAG_SECONDS'] = 0
+  headers = {'Authorization': 'Bearer fake-jwt-token'}
+  client.post('/api/newsletter', json={'email': 'first@example.com', 'name': 'First, Reader'})
+  client.post('/api/reservations', json={
+    'datetime': '2031-01-06T19:00:00', 'guests': 2, 'name': 'Not Subscribed', 'email': 'diner@example.com',
+  })
+  assert client.get('/api/newsletter/subscribers').status_code == 401
+  assert client.get('/api/newsletter/subscribers?format=xml', headers=headers).status_code == 400
+
+  response = client.get('/api/newsletter/subscribers', headers=headers)
+  assert response.status_code == 200
+  assert response.mimetype == 'text/csv'
+  rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+  assert [(row['email'], row['name']) for row in rows] == [('first@example.com', 'First, Reader')]
+  watermark = response.headers['X-Export-Watermark']
+
+  client.post('/api/newsletter', json={'email': 'second@example.com'})
+  response = client.get(f'/api/newsletter/subscribers?format=ndjson&since={watermark}', headers=headers)
+  lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+  assert [line['email'] for line in lines] == ['second@example.com']
+
+def test_subscriber_export_picks_up_rows_committed_after_it(app, client):
+  from datetime import timedelta
+  from cafe_fausse.extensions import db
+  from cafe_fausse.models import Customer
+
+  headers = {'Authorization': 'Bearer fake-jwt-token'}
+  app.config['EXPORT_WATERMARK_LAG_SECONDS'] = 30
+  exported_at = datetime.now(UTC).replace(tzinfo=None)
+  watermark = client.get('/api/newsletter/subscribers', headers=headers).headers['X-Export-Watermark']
+
+  # A signup stamped just before that export whose transaction only commits after it.
+  stamped = exported_at - timedelta(seconds=1)
+  db.session.add(Customer(email='late@example.com', newsletter_opt_in=True, created_at=stamped, updated_at=stamped))
+  db.session.commit()
+
+  response = client.get(f'/api/newsletter/subscribers?format=ndjson&since={watermark}', headers=headers)
+  assert response.get_data(as_text=True) == ''
+  app.config['EXPORT_WATERMARK_LAG_SECONDS'] = 0
+  response = client.get(f'/api/newsletter/subscribers?format=ndjson&since={watermark}', headers=headers)
+  assert [json.loads(line)['email'] for line in response.get_data(as_text=True).splitlines()] == ['late@example.com']
+
+def _record_statements(app):
+  from sqlalchemy import event
+  from cafe_fausse.extensions import db
+
+  statements = []
+  event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2].split()[0:3]))
+  return statements
+
+def test_booking_writes_customer_with_one_statement(app, client):
+  statements = _record_statements(app)
+  payload = {'datetime': '2031-04-01T19:00:00', 'guests': 2, 'name': 'Counted', 'email': 'counted@example.com'}
+  assert client.post('/api/reservations', json=payload).status_code == 201
+  customer_statements = [s for s in statements if 'customers' in s]
+  assert customer_statements == [['INSERT', 'INTO', 'customers']]
+  # SQLite write lock, cell rows, overlap range query, new cell rows (one executemany), customer
+  # upsert, reservation, outbox message, daily and slot rollups.
+  assert len(statements) == 9
+
+  statements.clear()
+  payload = {**payload, 'datetime': '2031-04-02T19:00:00', 'phone': '555-0101'}
+  assert client.post('/api/reservations', json=payload).status_code == 201
+  assert [s for s in statements if 'customers' in s] == [['INSERT', 'INTO', 'customers']]
+
+def test_newsletter_signup_is_one_statement_per_request(app, client):
+  from cafe_fausse.models import Customer
+
+  client.post('/api/reservations', json={
+    'datetime': '2031-04-03T19:00:00', 'guests': 2, 'name': 'Guest', 'email': 'both@example.com', 'phone': '555',
+  })
+  statements = _record_statements(app)
+  assert client.post('/api/newsletter', json={'email': 'both@example.com'}).status_code == 201
+  # Customer upsert and the welcome email in the outbox.
+  assert statements == [['INSERT', 'INTO', 'customers'], ['INSERT', 'INTO', 'outbox']]
+  customer = Customer.query.filter_by(email='both@example.com').one()
+  assert (customer.name, customer.phone, customer.newsletter_opt_in) == ('Guest', '555', True)
+
+def test_customer_upsert_memoizes_within_a_request(app):
+  from cafe_fausse.customer_repository import upsert_customer
+  from cafe_fausse.extensions import db
+
+  statements = _record_statements(app)
+  with app.test_request_context():
+    first = upsert_customer('memo@example.com', name='Memo')
+    assert upsert_customer('memo@example.com') == first
+    assert upsert_customer('memo@example.com', name='Memo') == first
+    assert len(statements) == 1
+    assert upsert_customer('memo@example.com', newsletter_opt_in=True) == first
+    assert len(statements) == 2
+    # A rollback may undo the insert, so the next upsert goes to the database again.
+    db.session.rollback()
+    upsert_customer('memo@example.com', name='Memo')
+    assert len(statements) == 3
+
+def test_stats_are_updated_by_bookings_and_imports(app, client):
+  headers = {'Authorization': 'Bearer fake-jwt-token'}
+  client.post('/api/reservations', json={
+    'datetime': '2031-05-01T19:00:00', 'guests': 2, 'name': 'Ann', 'email': 'ann@example.com',
+  })
+  client.post('/api/reservations', json={
+    'datetime': '2031-05-01T19:30:00', 'guests': 4, 'name': 'Bob', 'email': 'bob@example.com', 'duration': 30,
+  })
+  body = '\n'.join([
+    'datetime,guests,name,email,phone',
+    '2031-05-01T20:00:00,3,Ann,ann@example.com,',
+    '2031-05-02T19:00:00,2,Cat,cat@example.com,',
+    '2031-05-02T20:00:00,2,Cat,cat@example.com,',
+  ])
+  client.post('/api/admin/reservations/import?format=csv', data=body, headers=headers)
+
+  assert client.get('/api/admin/stats?from=2031-05-01&to=2031-05-02').status_code == 401
+  statements = _record_statements(app)
+  response = client.get('/api/admin/stats?from=2031-05-01&to=2031-05-02', headers=headers)
+  assert response.status_code == 200
+  # Only the rollup tables are read.
+  assert [s[0] for s in statements] == ['SELECT', 'SELECT']
+  stats = response.get_json()
+  assert stats['days'] == [
+    {'date': '2031-05-01', 'reservations': 3, 'covers': 9, 'repeatReservations': 1},
+    {'date': '2031-05-02', 'reservations': 2, 'covers': 4, 'repeatReservations': 1},
+  ]
+  slots = {slot['timeSlot']: slot for slot in stats['slots']}
+  assert slots['2031-05-01T19:30:00']['tablesInUse'] == 2
+  assert slots['2031-05-01T19:30:00']['occupancyRate'] == 0.4
+  assert (slots['2031-05-01T20:00:00']['reservations'], slots['2031-05-01T20:00:00']['covers']) == (1, 3)
+  assert slots['2031-05-01T20:00:00']['tablesInUse'] == 2
+
+def test_backfill_rebuilds_stats(app, client):
+  from cafe_fausse import rollups
+  from cafe_fausse.extensions import db
+  from cafe_fausse.models import Customer, DailyStats, SlotStats
+
+  for day in (1, 2):
+    client.post('/api/reservations', json={
+      'datetime': f'2031-06-0{day}T19:00:00', 'guests': 2, 'name': 'Ann', 'email': 'ann@example.com',
+    })
+  expected = [(row.day, row.reservations, row.covers, row.repeat_reservations) for row in DailyStats.query.all()]
+  cells = [(row.time_slot, row.tables_in_use) for row in SlotStats.query.order_by(SlotStats.time_slot)]
+  DailyStats.query.delete()
+  db.session.execute(db.update(Customer).values(reservation_count=0))
+  db.session.commit()
+
+  assert app.test_cli_runner().invoke(args=['backfill-rollups']).exit_code == 0
+  assert [(row.day, row.reservations, row.covers, row.repeat_reservations) for row in DailyStats.query.all()] == expected
+  assert [(row.time_slot, row.tables_in_use) for row in SlotStats.query.order_by(SlotStats.time_slot)] == cells
+  assert Customer.query.filter_by(email='ann@example.com').one().reservation_count == 2
+  assert rollups.backfill() == 2
+
+def test_stats_rejects_bad_ranges(client):
+  headers = {'Authorization': 'Bearer fake-jwt-token'}
+  assert client.get('/api/admin/stats?from=tomorrow', headers=headers).status_code == 400
+  assert client.get('/api/admin/stats?from=2031-01-02&to=2031-01-01', headers=headers).status_code == 400
+  assert client.get('/api/admin/stats?from=2031-01-01&to=2032-06-01', headers=headers).status_code == 400
+
+def test_production_admin_credentials_come_from_the_environment(monkeypatch):
+  import pytest
+
+  from cafe_fausse import create_app
+
+  monkeypatch.setenv('FLASK_SQLALCHEMY_DATABASE_URI', 'sqlite:///:memory:')
+  monkeypatch.setenv('FLASK_ADMIN_PASSWORD', 's3cret')
+  with pytest.raises(ValueError, match='ADMIN_TOKEN must be set'):
+    create_app('production')
+
+  monkeypatch.setenv('FLASK_ADMIN_TOKEN', 'tok-123')
+  client = create_app('production').test_client()
+  assert client.post('/api/admin', json={'username': 'admin', 'password': 'admin'}).status_code == 401
+  response = client.post('/api/admin', json={'username': 'admin', 'password': 's3cret'})
+  assert response.get_json()['token'] == 'tok-123'
+  stats = '/api/admin/stats?from=2031-01-01&to=2031-01-02'
+  assert client.get(stats, headers={'Authorization': 'Bearer fake-jwt-token'}).status_code == 401
+  assert client.get(stats, headers={'Authorization': 'Bearer tok-123'}).status_code != 401
+
+def test_login_is_rate_limited_per_client(app, client):
+  app.config['RATE_LIMIT_LOGIN'] = '3/minute'
+  credentials = {'username': 'admin', 'password': 'wrong'}
+  assert [client.post('/api/admin', json=credentials).status_code for _ in range(3)] == [401] * 3
+  response = client.post('/api/admin', json=credentials)
+  assert response.status_code == 429
+  assert 1 <= int(response.headers['Retry-After']) <= 20
+  # Other clients and other endpoints have their own buckets.
+  assert client.post('/api/admin', json=credentials, environ_base={'REMOTE_ADDR': '10.0.0.2'}).status_code == 401
+  assert client.post('/api/reservations', json={}).status_code == 400
+
+def test_rate_limits_behind_a_proxy_apply_per_forwarded_client(app, client, monkeypatch):
+  from cafe_fausse import create_app
+
+  app.config['RATE_LIMIT_LOGIN'] = '1/minute'
+  credentials = {'username': 'admin', 'password': 'wrong'}
+
+  def login(client, forwarded_for):
+    return client.post('/api/admin', json=credentials, headers={'X-Forwarded-For': forwarded_for}).status_code
+
+  # Without trusted proxies the header is ignored: both requests come from the proxy's address.
+  assert [login(client, '203.0.113.1'), login(client, '203.0.113.2')] == [401, 429]
+
+  monkeypatch.setenv('FLASK_SQLALCHEMY_DATABASE_URI', 'sqlite:///:memory:')
+  monkeypatch.setenv('FLASK_TRUSTED_PROXIES', '1')
+  monkeypatch.setenv('FLASK_RATE_LIMIT_LOGIN', '1/minute')
+  proxied = create_app('development').test_client()
+  assert [login(proxied, '203.0.113.1'), login(proxied, '203.0.113.2'), login(proxied, '203.0.113.1')] == [401, 401, 429]
+
+def test_shared_rate_limit_backend_is_shared_between_processes(tmp_path):
+  from cafe_fausse.rate_limit import SharedBackend, parse_limit
+
+  assert parse_limit('6/minute') == (6, 0.1)
+  # Two backends on one file stand in for two workers.
+  first = SharedBackend(str(tmp_path / 'buckets'), slots=64)
+  second = SharedBackend(str(tmp_path / 'buckets'), slots=64)
+  try:
+    assert first.take('login|10.0.0.1', 2, 0.1) == 0
+    assert second.take('login|10.0.0.1', 2, 0.1) == 0
+    assert 9 < first.take('login|10.0.0.1', 2, 0.1) <= 10
+    assert second.take('login|10.0.0.2', 2, 0.1) == 0
+  finally:
+    first.close()
+    second.close()
+
+def test_shared_rate_limit_backend_locks_with_msvcrt_without_fcntl(tmp_path, monkeypatch):
+  import os
+  import types
+
+  from cafe_fausse import rate_limit
+
+  calls = []
+  fake_msvcrt = types.SimpleNamespace(
+    LK_LOCK=1, LK_UNLCK=0, locking=lambda fd, mode, length: calls.append((mode, os.lseek(fd, 0, os.SEEK_CUR), length)),
+  )
+  monkeypatch.setattr(rate_limit, 'fcntl', None)
+  monkeypatch.setattr(rate_limit, 'msvcrt', fake_msvcrt, raising=False)
+  backend = rate_limit.SharedBackend(str(tmp_path / 'buckets'), slots=64)
+  try:
+    assert backend.take('login|10.0.0.1', 1, 0.1) == 0
+    assert backend.take('login|10.0.0.1', 1, 0.1) > 0
+  finally:
+    backend.close()
+  offset = calls[0][1]
+  assert calls == [(1, offset, rate_limit.SLOT.size), (0, offset, rate_limit.SLOT.size)] * 2
+
+def test_shared_rate_limit_bucket_from_a_future_refill_time_is_not_drained(tmp_path):
+  import hashlib
+  import time
+
+  from cafe_fausse.rate_limit import SLOT, SharedBackend
+
+  backend = SharedBackend(str(tmp_path / 'buckets'), slots=64)
+  try:
+    # A slot written by a clock that was ahead (e.g. monotonic time before a reboot).
+    digest = int.from_bytes(hashlib.blake2b(b'login|10.0.0.1', digest_size=8).digest(), 'little')
+    SLOT.pack_into(backend._map, digest % 64 * SLOT.size, digest, 1.0, time.time() + 10 ** 6)
+    assert backend.take('login|10.0.0.1', 2, 0.1) == 0
+    assert 9 < backend.take('login|10.0.0.1', 2, 0.1) <= 10
+  finally:
+    backend.close()
+
+def test_asset_server_serves_build_from_manifest(app, tmp_path):
+  import gzip
+  from cafe_fausse.static_assets import AssetServer
+
+  (tmp_path / 'assets').mkdir()
+  (tmp_path / 'index.html').write_text('<html>app</html>')
+  bundle = 'console.log("cafe");' * 100
+  (tmp_path / 'assets' / 'index-B2x_k9Qa.js').write_text(bundle)
+  (tmp_path / 'assets' / 'index-B2x_k9Qa.js.gz').write_bytes(gzip.compress(bundle.encode()))
+  (tmp_path / 'vite.svg').write_text('<svg/>')
+  AssetServer(app, str(tmp_path))
+  (tmp_path / 'index.html').write_text('<html>changed on disk</html>')
+  client = app.test_client()
+
+  response = client.get('/assets/index-B2x_k9Qa.js', headers={'Accept-Encoding': 'gzip'})
+  assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+  assert response.headers['Content-Encoding'] == 'gzip'
+  assert gzip.decompress(response.data).decode() == bundle
+  response.close()
+  plain = client.get('/assets/index-B2x_k9Qa.js', headers={'Accept-Encoding': 'identity'})
+  assert plain.get_data(as_text=True) == bundle and 'Content-Encoding' not in plain.headers
+  plain.close()
+
+  svg = client.get('/vite.svg')
+  assert svg.headers['Cache-Control'] == 'no-cache'
+  assert client.get('/vite.svg', headers={'If-None-Match': svg.headers['ETag']}).status_code == 304
+  svg.close()
+
+  # index.html is read once at startup and answers client-side routes.
+  for path in ('/', '/index.html', '/reservations/confirm'):
+    response = client.get(path)
+    assert (response.status_code, response.get_data(as_text=True)) == (200, '<html>app</html>')
+
+  for path in ('/api/reservationz', '/api', '/assets/index-Old00000.js'):
+    response = client.get(path)
+    assert response.status_code == 404
+    assert response.get_json() == {'message': 'Not found.'}
+
+def test_logs_are_structured_and_carry_the_request_id(monkeypatch, tmp_path):
+  from cafe_fausse import create_app, log
+  from cafe_fausse.routes import newsletter
+
+  monkeypatch.setenv('FLASK_SQLALCHEMY_DATABASE_URI', 'sqlite:///:memory:')
+  monkeypatch.setenv('FLASK_LOG_FORMAT', 'json')
+  monkeypatch.setenv('FLASK_LOG_FILE', str(tmp_path / 'app.log'))
+  app = create_app('development')
+
+  def failing_subscribe(email, name):
+    raise RuntimeError('database is down')
+
+  monkeypatch.setattr(newsletter, 'subscribe', failing_subscribe)
+  client = app.test_client()
+  response = client.post('/api/newsletter', json={'email': 'a@example.com'}, headers={'X-Request-ID': 'req-42'})
+  assert response.status_code == 500
+  assert response.headers['X-Request-ID'] == 'req-42'
+  assert len(client.get('/api/health').headers['X-Request-ID']) == 32
+  log.stop_listener()
+
+  records = [json.loads(line) for line in (tmp_path / 'app.log').read_text().splitlines()]
+  failure = next(record for record in records if record['message'].startswith('Newsletter signup failed'))
+  assert failure['request_id'] == 'req-42' and 'database is down' in failure['exception']
+  access = [record for record in records if record['logger'] == 'cafe_fausse.requests']
+  assert [(record['path'], record['status']) for record in access] == [('/api/newsletter', 500), ('/api/health', 200)]
+  assert access[0]['request_id'] == 'req-42' and access[0]['duration_ms'] >= 0
+
+def test_sqlite_connections_get_wal_and_pragmas(monkeypatch, tmp_path):
+  from sqlalchemy import text
+  from cafe_fausse import create_app
+  from cafe_fausse.extensions import db
+
+  monkeypatch.setenv('FLASK_SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'wal.db'}")
+  monkeypatch.setenv('FLASK_SQLITE_BUSY_TIMEOUT_MS', '2500')
+  app = create_app('development')
+  with app.app_context():
+    pragma = lambda name: db.session.execute(text(f'PRAGMA {name}')).scalar()
+    assert (pragma('journal_mode'), pragma('synchronous'), pragma('busy_timeout')) == ('wal', 1, 2500)
+    assert pragma('mmap_size') == 256 * 1024 * 1024
+    assert db.engine.pool.size() == 5
+    db.session.remove()
+    db.engine.dispose()
+
+def test_engine_options_follow_the_environment_config():
+  from cafe_fausse.config import DevelopmentConfig, ProductionConfig
+  from cafe_fausse.database import engine_options
+
+  def options(config_class, uri, **overrides):
+    config = {key: getattr(config_class, key) for key in dir(config_class) if key.isupper()}
+    return engine_options({**config, 'SQLALCHEMY_DATABASE_URI': uri, **overrides})
+
+  production = options(ProductionConfig, 'postgresql+psycopg://cafe@db/cafe')
+  assert (production['pool_size'], production['pool_pre_ping'], production['pool_recycle']) == (10, True, 1800)
+  assert options(DevelopmentConfig, 'postgresql+psycopg://cafe@db/cafe')['pool_size'] == 5
+  assert options(DevelopmentConfig, 'sqlite:///:memory:') == {}
+  assert options(ProductionConfig, 'sqlite:///:memory:', SQLALCHEMY_ENGINE_OPTIONS={'echo': True}) == {'echo': True}
+
+def test_forked_worker_opens_its_own_connections(monkeypatch, tmp_path):
+  import os
+  from sqlalchemy import text
+  from cafe_fausse import create_app, database, log
+  from cafe_fausse.extensions import db
+
+  monkeypatch.setenv('FLASK_SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'fork.db'}")
+  monkeypatch.setenv('FLASK_ADMIN_PASSWORD', 'secret')
+  monkeypatch.setenv('FLASK_ADMIN_TOKEN', 'token')
+  app = create_app('production')
+  with app.app_context():
+    parent_connection = db.session.connection().connection.dbapi_connection
+    db.session.commit()
+
+  pid = os.fork()
+  if pid == 0:
+    # As gunicorn's post_fork hook does in every worker.
+    ok = False
+    try:
+      database.dispose_after_fork(app)
+      log.after_fork()
+      with app.app_context():
+        child_connection = db.session.connection().connection.dbapi_connection
+        ok = child_connection is not parent_connection and db.session.execute(text('SELECT 1')).scalar() == 1
+        ok = ok and log._listener._thread.is_alive()
+    finally:
+      os._exit(0 if ok else 1)
+  _, status = os.waitpid(pid, 0)
+  assert os.waitstatus_to_exitcode(status) == 0
+  with app.app_context():
+    # The parent's pooled connection was left open for it.
+    assert db.session.connection().connection.dbapi_connection is parent_connection
+    db.session.remove()
+    db.engine.dispose()
+
+def test_asgi_mode_serves_async_and_flask_routes(monkeypatch, tmp_path):
+  import pytest
+  pytest.importorskip('starlette')
+  pytest.importorskip('aiosqlite')
+  from sqlalchemy import select
+  from starlette.testclient import TestClient
+  from cafe_fausse import create_app
+  from cafe_fausse.asgi import create_asgi_app
+  from cafe_fausse.database import async_database_url
+  from cafe_fausse.extensions import db
+  from cafe_fausse.models import Customer, OutboxMessage
+
+  assert str(async_database_url({'SQLALCHEMY_DATABASE_URI': 'postgresql+psycopg://cafe@db/cafe'})) == 'postgresql+psycopg_async://cafe@db/cafe'
+  assert str(async_database_url({'SQLALCHEMY_DATABASE_URI': 'sqlite:///x.db', 'ASYNC_DATABASE_URI': None})) == 'sqlite+aiosqlite:///x.db'
+
+  monkeypatch.setenv('FLASK_SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'asgi.db'}")
+  app = create_app('development')
+  app.config.update({'TESTING': True, 'TOTAL_TABLES': 5, 'RATE_LIMIT_ENABLED': False})
+  with app.app_context():
+    db.create_all()
+
+  slot = _future_slot(72)
+  day = slot[:10]
+  with TestClient(create_asgi_app(app)) as client:
+    health = client.get('/api/health', headers={'X-Request-ID': 'req-7'})
+    assert health.json() == {'status': 'ok'} and health.headers['X-Request-ID'] == 'req-7'
+
+    menu = client.get('/api/menu')
+    assert menu.status_code == 200 and menu.json() == app.test_client().get('/api/menu').get_json()
+    assert client.get('/api/menu', headers={'If-None-Match': menu.headers['ETag']}).status_code == 304
+
+    def remaining():
+      slots = client.get('/api/availability', params={'date': day}).json()['slots']
+      return next(entry['remaining'] for entry in slots if entry['timeSlot'] == slot[:19])
+
+    assert remaining() == 5
+    # Bookings go through the Flask route, which clears the availability cache the async route reads.
+    booking = client.post('/api/reservations', json={'datetime': slot, 'guests': 2, 'name': 'Ann', 'email': 'ann@example.com'})
+    assert booking.status_code == 201 and 'X-Request-ID' in booking.headers
+    assert remaining() == 4
+
+    assert client.post('/api/newsletter', json={'email': 'bad'}).status_code == 422
+    assert client.post('/api/newsletter', json={'email': 'Ann@Example.com', 'name': 'Ann'}).status_code == 201
+
+  with app.app_context():
+    customer = db.session.execute(select(Customer).filter_by(email='ann@example.com')).scalar_one()
+    assert customer.newsletter_opt_in and customer.reservation_count == 1
+    assert db.session.execute(select(OutboxMessage.kind).order_by(OutboxMessage.id)).scalars().all()[-1] == 'newsletter_welcome'
+    db.session.remove()
+    db.engine.dispose()
+
+def test_metrics_record_route_latency_status_and_queries(client):
+  from prometheus_client import REGISTRY
+
+  def value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+  route = '/api/availability'
+  before = (
+    value('cafe_fausse_http_requests_total', method='GET', route=route, status='200'),
+    value('cafe_fausse_http_requests_total', method='GET', route=route, status='400'),
+    value('cafe_fausse_http_request_duration_seconds_count', method='GET', route=route),
+    value('cafe_fausse_db_queries_per_request_sum', route=route),
+  )
+  assert client.get('/api/availability?date=2031-03-01').status_code == 200
+  assert client.get('/api/availability').status_code == 400
+  after = (
+    value('cafe_fausse_http_requests_total', method='GET', route=route, status='200'),
+    value('cafe_fausse_http_requests_total', method='GET', route=route, status='400'),
+    value('cafe_fausse_http_request_duration_seconds_count', method='GET', route=route),
+    value('cafe_fausse_db_queries_per_request_sum', route=route),
+  )
+  assert [b - a for a, b in zip(before, after)] == [1, 1, 2, 1]
+
+  response = client.get('/api/metrics')
+  assert response.status_code == 200 and response.mimetype == 'text/plain'
+  assert 'cafe_fausse_http_requests_total{method="GET",route="/api/availability",status="200"}' in response.text
+  assert 'route="/api/metrics"' not in response.text
+
+def test_metrics_are_summed_over_worker_processes(client, monkeypatch, tmp_path):
+  import os
+  import subprocess
+  import sys
+
+  # Each process stands in for a gunicorn worker writing to the shared directory.
+  worker = (
+    "from cafe_fausse import create_app\n"
+    "client = create_app('development').test_client()\n"
+    "for _ in range(3): client.get('/api/health')\n"
+  )
+  env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': str(tmp_path), 'FLASK_SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'}
+  for _ in range(2):
+    subprocess.run([sys.executable, '-c', worker], env=env, check=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+
+  monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+  text = client.get('/api/metrics').text
+  assert 'cafe_fausse_http_requests_total{method="GET",route="/api/health",status="200"} 6.0' in text
+  assert 'cafe_fausse_http_request_duration_seconds_count{method="GET",route="/api/health"} 6.0' in text
@@ -0,0 +1,98 @@
+import json
+import multiprocessing
+import threading
+
+from cafe_fausse.menu_store import MenuStore
+
+WRITERS = 8
+ROUNDS = 15
+
+
+def _writer(path, writer_id, rounds, start):
+  # Each writer owns two items, so a lost update shows up as a stale price in the final file.
+  store = MenuStore()
+  start.wait()
+  for round_number in range(1, rounds + 1):
+    store.apply_patches(path, [
+      {'name': f'Dish {writer_id}-a', 'price': round_number},
+      {'name': f'Dish {writer_id}-b', 'price': round_number},
+    ])
+
+
+def _reader(path, stop, failures):
+  while not stop.is_set():
+    try:
+      with open(path, 'r', encoding='utf-8') as f:
+        json.load(f)
+    except (OSError, ValueError):
+      with failures.get_lock():
+        failures.value += 1
+
+
+def test_parallel_writers_lose_no_updates(tmp_path):
+  menu_path = tmp_path / 'menu.json'
+  menu_path.write_text(json.dumps([
+    {
+      'title': f'Section {writer_id}',
+      'items': [
+        {'name': f'Dish {writer_id}-a', 'price': 0},
+        {'name': f'Dish {writer_id}-b', 'price': 0},
+      ],
+    }
+    for writer_id in range(WRITERS)
+  ]), encoding='utf-8')
+
+  ctx = multiprocessing.get_context('spawn')
+  start = ctx.Event()
+  stop = ctx.Event()
+  failures = ctx.Value('i', 0)
+
+  reader = ctx.Process(target=_reader, args=(str(menu_path), stop, failures))
+  writers = [
+    ctx.Process(target=_writer, args=(str(menu_path), writer_id, ROUNDS, start))
+    for writer_id in range(WRITERS)
+  ]
+  reader.start()
+  for process in writers:
+    process.start()
+  start.set()
+  for process in writers:
+    process.join(timeout=120)
+  stop.set()
+  reader.join(timeout=30)
+
+  assert all(process.exitcode == 0 for process in writers)
+  assert failures.value == 0
+
+  menu = json.loads(menu_path.read_text(encoding='utf-8'))
+  prices = [item['price'] for section in menu for item in section['items']]
+  assert prices == [ROUNDS] * (WRITERS * 2)
+  assert not list(tmp_path.glob('.menu-*.tmp'))
+
+
+def test_concurrent_batches_are_coalesced(tmp_path, monkeypatch):
+  menu_path = tmp_path / 'menu.json'
+  menu_path.write_text(json.dumps([
+    {'title': 'Starters', 'items': [{'name': f'Dish {index}', 'price': 0} for index in range(10)]},
+  ]), encoding='utf-8')
+
+  store = MenuStore(coalesce_window=0.05)
+  writes = []
+  original_persist = store._persist
+  monkeypatch.setattr(store, '_persist', lambda path, state: (writes.append(path), original_persist(path, state)))
+
+  results = {}
+
+  def update(index):
+    results[index] = store.apply_patches(str(menu_path), [{'name': f'dish {index}', 'price': index}])
+
+  threads = [threading.Thread(target=update, args=(index,)) for index in range(10)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  assert all(results[index][0]['status'] == 200 for index in range(10))
+  assert len(writes) < 10
+  menu = json.loads(menu_path.read_text(encoding='utf-8'))
+  assert [item['price'] for item in menu[0]['items']] == list(range(10))
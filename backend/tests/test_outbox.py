@@ -0,0 +1,107 @@
+import json
+from datetime import timedelta
+
+from cafe_fausse import outbox
+from cafe_fausse.extensions import db
+from cafe_fausse.mail import FileSender
+from cafe_fausse.models import OutboxMessage
+
+
+def _book(client, index=0):
+  return client.post('/api/reservations', json={
+    'datetime': '2031-03-01T19:00:00', 'guests': 3, 'name': 'Ada', 'email': f'ada{index}@example.com',
+  })
+
+
+def test_booking_and_signup_queue_messages_in_their_transaction(client):
+  assert _book(client).status_code == 201
+  assert client.post('/api/newsletter', json={'email': 'reader@example.com', 'name': 'Reader'}).status_code == 201
+  # A failed signup queues nothing.
+  assert client.post('/api/newsletter', json={'email': 'not-an-email'}).status_code == 422
+
+  messages = OutboxMessage.query.order_by(OutboxMessage.id).all()
+  assert [(m.kind, m.recipient, m.status) for m in messages] == [
+    ('reservation_confirmation', 'ada0@example.com', 'pending'),
+    ('newsletter_welcome', 'reader@example.com', 'pending'),
+  ]
+  assert json.loads(messages[0].payload)['tableNumber'] == 1
+
+
+def test_worker_delivers_due_messages_to_the_file_sender(app, client, tmp_path):
+  for index in range(3):
+    _book(client, index)
+  sink = tmp_path / 'mail.ndjson'
+
+  assert outbox.deliver_batch(FileSender(str(sink)), limit=2) == {'sent': 2, 'retried': 0, 'failed': 0}
+  assert outbox.deliver_batch(FileSender(str(sink)), limit=2) == {'sent': 1, 'retried': 0, 'failed': 0}
+  assert outbox.deliver_batch(FileSender(str(sink)), limit=2) == {'sent': 0, 'retried': 0, 'failed': 0}
+
+  emails = [json.loads(line) for line in sink.read_text(encoding='utf-8').splitlines()]
+  assert [email['to'] for email in emails] == [f'ada{index}@example.com' for index in range(3)]
+  assert 'table for 3' in emails[0]['body']
+  assert {m.status for m in OutboxMessage.query} == {'sent'}
+
+
+def test_each_outcome_is_committed_as_soon_as_the_message_is_tried(app, client):
+  for index in range(2):
+    _book(client, index)
+  sent = []
+
+  def dying_sender(recipient, subject, body):
+    if sent:
+      raise SystemExit('worker killed')
+    sent.append(recipient)
+
+  try:
+    outbox.deliver_batch(dying_sender, limit=10)
+  except SystemExit:
+    db.session.rollback()
+  statuses = db.session.execute(db.select(OutboxMessage.recipient, OutboxMessage.status).order_by(OutboxMessage.id))
+  assert statuses.all() == [('ada0@example.com', 'sent'), ('ada1@example.com', 'pending')]
+
+
+def test_messages_not_tried_within_half_the_lease_are_given_back(app, client):
+  _book(client)
+  app.config['OUTBOX_LEASE_SECONDS'] = 0
+
+  def sender(recipient, subject, body):
+    raise AssertionError('sent after the lease')
+
+  assert outbox.deliver_batch(sender, limit=10) == {'sent': 0, 'retried': 0, 'failed': 0}
+  message = db.session.scalars(db.select(OutboxMessage)).one()
+  db.session.refresh(message)
+  assert (message.status, message.attempts) == ('pending', 0)
+  assert message.available_at <= outbox._now()
+
+
+def test_failed_deliveries_back_off_and_give_up(app, client):
+  app.config.update({'OUTBOX_MAX_ATTEMPTS': 2, 'OUTBOX_RETRY_BASE_SECONDS': 60})
+  _book(client)
+
+  def broken_sender(recipient, subject, body):
+    raise ConnectionRefusedError('smtp down')
+
+  assert outbox.deliver_batch(broken_sender, limit=10) == {'sent': 0, 'retried': 1, 'failed': 0}
+  message = db.session.scalars(db.select(OutboxMessage)).one()
+  db.session.refresh(message)
+  assert message.attempts == 1
+  assert message.status == 'pending'
+  assert message.available_at - outbox._now() > timedelta(seconds=25)
+  # Not due yet, so nothing is claimed.
+  assert outbox.deliver_batch(broken_sender, limit=10) == {'sent': 0, 'retried': 0, 'failed': 0}
+
+  message.available_at = outbox._now()
+  db.session.commit()
+  assert outbox.deliver_batch(broken_sender, limit=10) == {'sent': 0, 'retried': 0, 'failed': 1}
+  db.session.refresh(message)
+  assert (message.status, message.attempts) == ('failed', 2)
+  assert 'smtp down' in message.last_error
+
+
+def test_outbox_worker_command_drains_once(app, client, tmp_path):
+  _book(client)
+  app.config.update({'OUTBOX_SENDER': 'file', 'OUTBOX_FILE': str(tmp_path / 'mail.ndjson')})
+  result = app.test_cli_runner().invoke(args=['outbox-worker', '--once'])
+  assert result.exit_code == 0, result.output
+  assert 'Sent 1' in result.output
+  assert (tmp_path / 'mail.ndjson').exists()
@@ -0,0 +1,201 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+
+from cafe_fausse import create_app
+from cafe_fausse.extensions import db
+from cafe_fausse.models import Customer, Reservation, SlotOccupancy
+
+TABLES = 10
+SLOTS = 3
+THREADS = 8
+REQUESTS_PER_THREAD = 6
+
+
+@pytest.fixture()
+def file_app(tmp_path, monkeypatch):
+  monkeypatch.setenv('FLASK_SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'stress.db'}")
+  app = create_app('development')
+  # Every thread books from the same address, which the rate limiter would otherwise throttle.
+  app.config.update({'TESTING': True, 'TOTAL_TABLES': TABLES, 'RATE_LIMIT_ENABLED': False})
+  with app.app_context():
+    db.create_all()
+  yield app
+  with app.app_context():
+    db.session.remove()
+    db.engine.dispose()
+
+
+def test_concurrent_bookings_never_double_book(file_app, record_property):
+  base = datetime(2031, 2, 14, 19, 0)
+  # Slots are further apart than a reservation lasts, so each has all tables to itself.
+  slots = [(base + timedelta(hours=2 * index)).isoformat() for index in range(SLOTS)]
+  statuses = Counter()
+  lock = threading.Lock()
+  start = threading.Barrier(THREADS)
+
+  def book(thread_id):
+    client = file_app.test_client()
+    start.wait()
+    for request_number in range(REQUESTS_PER_THREAD):
+      response = client.post('/api/reservations', json={
+        'datetime': slots[request_number % SLOTS],
+        'guests': 2,
+        'name': f'Guest {thread_id}',
+        'email': f'guest{thread_id}-{request_number}@example.com',
+      })
+      with lock:
+        statuses[response.status_code] += 1
+
+  threads = [threading.Thread(target=book, args=(thread_id,)) for thread_id in range(THREADS)]
+  started = time.perf_counter()
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  elapsed = time.perf_counter() - started
+  # Reported in the JUnit XML (pytest --junitxml=...) rather than printed.
+  record_property('bookings_per_second', round(statuses[201] / elapsed, 1))
+  record_property('statuses', dict(statuses))
+
+  assert set(statuses) <= {201, 409}
+  # 48 requests over 3 slots of 10 tables: every table gets booked exactly once.
+  assert statuses[201] == SLOTS * TABLES
+
+  with file_app.app_context():
+    duplicates = db.session.execute(
+      select(Reservation.time_slot, Reservation.table_number)
+      .group_by(Reservation.time_slot, Reservation.table_number)
+      .having(func.count() > 1)
+    ).all()
+    assert duplicates == []
+    assert db.session.scalar(select(func.count()).select_from(Reservation)) == SLOTS * TABLES
+    for occupancy in db.session.scalars(select(SlotOccupancy)):
+      assert occupancy.remaining == 0
+      assert occupancy.free_mask == 0
+
+
+def test_concurrent_overlapping_bookings_never_share_a_table(file_app):
+  base = datetime(2031, 2, 15, 19, 0)
+  # Half-hour apart, so every booking overlaps the bookings of the neighbouring slots.
+  slots = [(base + timedelta(minutes=30 * index)).isoformat() for index in range(SLOTS)]
+  statuses = Counter()
+  lock = threading.Lock()
+  start = threading.Barrier(THREADS)
+
+  def book(thread_id):
+    client = file_app.test_client()
+    start.wait()
+    for request_number in range(REQUESTS_PER_THREAD):
+      response = client.post('/api/reservations', json={
+        'datetime': slots[(thread_id + request_number) % SLOTS],
+        'guests': 2,
+        'name': f'Guest {thread_id}',
+        'email': f'overlap{thread_id}-{request_number}@example.com',
+      })
+      with lock:
+        statuses[response.status_code] += 1
+
+  threads = [threading.Thread(target=book, args=(thread_id,)) for thread_id in range(THREADS)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  assert set(statuses) <= {201, 409}
+  with file_app.app_context():
+    first, second = aliased(Reservation), aliased(Reservation)
+    overlaps = db.session.scalar(
+      select(func.count())
+      .select_from(first)
+      .join(second, (first.table_number == second.table_number) & (first.id < second.id))
+      .where(first.time_slot < second.end_time, first.end_time > second.time_slot)
+    )
+    assert overlaps == 0
+    # All slots overlap the middle one, so each table is booked exactly once.
+    assert db.session.scalar(select(func.count()).select_from(Reservation)) == TABLES
+
+
+def test_concurrent_duplicates_with_idempotency_key_book_once(file_app):
+  payload = {'datetime': '2031-02-16T19:00:00', 'guests': 2, 'name': 'Flaky', 'email': 'flaky@example.com'}
+  responses = []
+  lock = threading.Lock()
+  start = threading.Barrier(THREADS)
+
+  def book():
+    client = file_app.test_client()
+    start.wait()
+    response = client.post('/api/reservations', json=payload, headers={'Idempotency-Key': 'flaky-retry'})
+    with lock:
+      responses.append((response.status_code, response.get_json()))
+
+  threads = [threading.Thread(target=book) for _ in range(THREADS)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  assert [status for status, _ in responses] == [201] * THREADS
+  assert len({body['reservationId'] for _, body in responses}) == 1
+  with file_app.app_context():
+    assert db.session.scalar(select(func.count()).select_from(Reservation)) == 1
+
+
+def test_concurrent_newsletter_signups_for_one_email(file_app):
+  statuses = Counter()
+  lock = threading.Lock()
+  start = threading.Barrier(THREADS)
+
+  def signup(thread_id):
+    client = file_app.test_client()
+    start.wait()
+    response = client.post('/api/newsletter', json={'email': 'same@example.com', 'name': f'Reader {thread_id}'})
+    with lock:
+      statuses[response.status_code] += 1
+
+  threads = [threading.Thread(target=signup, args=(thread_id,)) for thread_id in range(THREADS)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  assert statuses == {201: THREADS}
+  with file_app.app_context():
+    assert db.session.scalar(select(func.count()).select_from(Customer)) == 1
+
+
+def test_bookings_during_a_backfill_are_counted_once(file_app, monkeypatch):
+  from cafe_fausse import rollups
+  from cafe_fausse.models import DailyStats
+
+  def book(index):
+    return file_app.test_client().post('/api/reservations', json={
+      'datetime': '2031-02-17T19:00:00', 'guests': 2, 'name': 'Guest', 'email': f'backfill{index}@example.com',
+    })
+
+  assert book(0).status_code == 201
+  statuses = []
+  booking = threading.Thread(target=lambda: statuses.append(book(1).status_code))
+  counts = rollups._counts
+
+  def counts_while_booking(bookings):
+    if threading.current_thread() is booking:
+      return counts(bookings)
+    # A booking starts once the backfill has begun and would commit while it reads.
+    booking.start()
+    booking.join(timeout=0.5)
+    return counts(bookings)
+
+  monkeypatch.setattr(rollups, '_counts', counts_while_booking)
+  with file_app.app_context():
+    assert rollups.backfill() == 1
+  booking.join()
+
+  assert statuses == [201]
+  with file_app.app_context():
+    assert db.session.scalars(select(DailyStats.reservations)).all() == [2]